@@ -6,7 +6,7 @@ if __name__ == "__main__":
     os.chdir(os.environ.get('PROJECT_DIR_FRM')) 
 
 from frm.utils.daycount import day_count, year_fraction
-from frm.utils.schedule import get_schedule, get_payment_dates, get_fixing_dates
+from frm.utils.schedule import get_schedule_cached, get_payment_dates, get_fixing_dates
 from frm.enums.utils import DayCountBasis, DayRoll, PeriodFrequency, StubType, RollConvention, TimingConvention
 from frm.term_structures.swap_curve import SwapCurve
 
@@ -122,7 +122,8 @@ class SwapLeg:
             assert self.spread is not None
 
 
-        schedule = get_schedule(
+        # Trades with the same schedule parameters share one cached schedule
+        schedule = get_schedule_cached(
             start_date=self.start_date,
             end_date=self.end_date,
             frequency=self.payment_frequency,
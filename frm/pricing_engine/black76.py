@@ -3,9 +3,27 @@ import os
 if __name__ == "__main__":
     os.chdir(os.environ.get('PROJECT_DIR_FRM'))
 
+import numpy as np
+from scipy.stats import norm
 
 
+def black76_price(F, K, σ, T, cp, discount_factor=1.0):
+    """
+    Black (1976) price of a European option on a forward, vectorised over all inputs.
 
+    Parameters:
+    F (np.array): Forward (e.g. forward swap rate or forward rate).
+    K (np.array): Strike.
+    σ (np.array): Lognormal (Black) volatility.
+    T (np.array): Time to expiry, in years.
+    cp (np.array): 1 for a call (payer), -1 for a put (receiver).
+    discount_factor (np.array, optional): Discount factor, or annuity for swaptions. Default is 1.0.
+    """
+    F, K, σ, T, cp = np.broadcast_arrays(*[np.asarray(v, dtype=np.float64) for v in (F, K, σ, T, cp)])
+    σ_sqrt_T = σ * np.sqrt(T)
+    d1 = (np.log(F / K) + 0.5 * σ_sqrt_T**2) / σ_sqrt_T
+    d2 = d1 - σ_sqrt_T
+    return discount_factor * cp * (F * norm.cdf(cp * d1) - K * norm.cdf(cp * d2))
 
 
     # def price_cap_floor(self, d1, d2, K, σ):
@@ -17,4 +35,4 @@ if __name__ == "__main__":
     #     d2 = d1 - σ*np.sqrt(T)
     #
     #     bought_cap = F * norm.cdf(d1) - K * norm.cdf(d2)
-    #     bought_put = K * norm.cdf(d2) - F * norm.cdf(d1)
\ No newline at end of file
+    #     bought_put = K * norm.cdf(d2) - F * norm.cdf(d1)
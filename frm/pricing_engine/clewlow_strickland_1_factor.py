@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import numpy as np
+from numba import njit, prange
 from scipy.interpolate import interp1d
 from frm.pricing_engine.monte_carlo_generic import generate_rand_nbs, MAX_SIMULATIONS_PER_LOOP
 
@@ -32,6 +33,9 @@ def clewlow_strickland_1_factor_simulate(forward_curve, nb_simulations, segments
     (https://www.mathworks.com/matlabcentral/fileexchange/26969-clewlow-and-strickland-commodity-one-factor-spot-model), 
     MATLAB Central File Exchange. Retrieved April 28, 2024.        
     
+    See clewlow_strickland_1_factor_simulate_exact() for an unbiased simulation that steps on the (possibly non-uniform)
+    forward curve grid and does not require sub-steps.
+
     ##### To do #####
     Currently the code assumes the forward curve step has a constant increment.
     Want it to support a generic structure where the increment may change and may be denomintated in days, months or years. 
@@ -100,16 +104,174 @@ def clewlow_strickland_1_factor_simulate(forward_curve, nb_simulations, segments
             spot_px_result[:, idx] = spot_px[index_spot_2d, mask]
 
     return spot_px_result
-    
 
 
-            
-    
+def clewlow_strickland_1_factor_simulate_exact(forward_curve: np.array,
+                                               nb_simulations: int,
+                                               alpha: float,
+                                               sigma: float,
+                                               T: float=None,
+                                               nb_simulations_per_chunk: int=None,
+                                               flag_apply_antithetic_variates: bool=False,
+                                               random_seed: int=0) -> np.array:
+    """
+    Simulates spot prices under the Clewlow-Strickland one-factor model using the exact transition of the model.
+
+    Under the model, ln(S(t)) = ln(F(0,t)) + X(t) - 0.5 * Var[X(t)] where X is an Ornstein-Uhlenbeck process,
+    dX = -α X dt + σ dW, X(0) = 0. The transition of X over a step of length Δ is Gaussian with
+        X(t+Δ) = X(t) * exp(-α Δ) + σ * sqrt((1 - exp(-2 α Δ)) / (2 α)) * Z,
+    hence the simulation is exact for any step length, and steps directly on the forward curve grid, which need not be
+    uniform. E[S(t)] = F(0,t) holds at each step.
+
+    Parameters
+    ----------
+    forward_curve : numpy.ndarray
+        A two-dimensional array where the first column contains the (increasing) times, in the same units as alpha and
+        sigma, and the second column contains the corresponding forward prices. The first row is the spot (t=0).
+    nb_simulations : int
+        Number of simulation paths to generate.
+    alpha : float
+        Mean reversion speed of the model. alpha=0 (no mean reversion) gives ln(S) a Brownian motion with variance σ²t.
+    sigma : float
+        Volatility of the underlying asset.
+    T : float, optional
+        Time horizon of the simulation. If specified, only the forward curve times <= T are simulated.
+    nb_simulations_per_chunk : int, optional
+        Number of simulations per chunk of random numbers. Defaults to the most that fit in MAX_SIMULATIONS_PER_LOOP.
+    flag_apply_antithetic_variates : bool, optional
+        Flag to apply antithetic variates. Default is False.
+    random_seed : int, optional
+        Seed of the random number generator. Default is 0.
+
+    Returns
+    -------
+    spot_px_result : numpy.ndarray
+        A two-dimensional array of simulated spot prices, shape=(nb of forward curve times, nb_simulations).
+    """
+
+    spot_px_result = None
+    for idx_start, idx_end, spot_px in clewlow_strickland_1_factor_simulate_exact_chunks(
+            forward_curve=forward_curve,
+            nb_simulations=nb_simulations,
+            alpha=alpha,
+            sigma=sigma,
+            T=T,
+            nb_simulations_per_chunk=nb_simulations_per_chunk,
+            flag_apply_antithetic_variates=flag_apply_antithetic_variates,
+            random_seed=random_seed):
+        if spot_px_result is None:
+            spot_px_result = np.empty((spot_px.shape[0], int(nb_simulations)))
+        spot_px_result[:, idx_start:idx_end] = spot_px
+
+    return spot_px_result
+
 
+def clewlow_strickland_1_factor_simulate_exact_chunks(forward_curve: np.array,
+                                                      nb_simulations: int,
+                                                      alpha: float,
+                                                      sigma: float,
+                                                      T: float=None,
+                                                      nb_simulations_per_chunk: int=None,
+                                                      flag_apply_antithetic_variates: bool=False,
+                                                      random_seed: int=0):
+    """
+    Generator version of clewlow_strickland_1_factor_simulate_exact() (see it for the parameters), yielding one chunk of
+    simulations at a time so that the paths can be reduced (e.g. to payoffs) without keeping all of them.
+
+    Yields
+    ------
+    tuple
+        (idx_start, idx_end, spot_px) where spot_px are the simulated spot prices of simulations idx_start:idx_end,
+        shape=(nb of forward curve times, idx_end - idx_start).
+    """
+
+    nb_simulations = int(nb_simulations)
+    tau, forward_prices = get_simulation_grid(forward_curve, T)
+
+    a = alpha
+    σ = sigma
+
+    # These terms evaluate to constants hence can be calculated outside the monte carlo loop
+    dt = np.diff(tau)
+    decay = np.exp(-a * dt)
+    step_vol = σ * np.sqrt(_ou_variance_factor(a, dt))
+    convexity = 0.5 * σ**2 * _ou_variance_factor(a, tau) # 0.5 * Var[X(t)]
+    ln_forward_prices = np.log(forward_prices)
+
+    nb_steps = len(dt)
+    if nb_simulations_per_chunk is None:
+        nb_simulations_per_chunk = MAX_SIMULATIONS_PER_LOOP // nb_steps
+    nb_simulations_per_loop = int(min(nb_simulations, nb_simulations_per_chunk))
+    nb_loops = (nb_simulations + nb_simulations_per_loop - 1) // nb_simulations_per_loop
+    seed_sequences = np.random.SeedSequence(random_seed).spawn(nb_loops)
 
+    for j in range(nb_loops):
+        idx_start = j * nb_simulations_per_loop
+        idx_end = min((j+1) * nb_simulations_per_loop, nb_simulations)
+        rand_nbs = generate_rand_nbs(nb_steps=nb_steps,
+                                     nb_rand_vars=1,
+                                     nb_simulations=idx_end-idx_start,
+                                     flag_apply_antithetic_variates=flag_apply_antithetic_variates,
+                                     rng=np.random.default_rng(seed_sequences[j]))
+        spot_px = np.empty((nb_steps+1, idx_end-idx_start))
+        _cs1f_exact_kernel(ln_forward_prices, decay, step_vol, convexity, rand_nbs[:,0,:], spot_px)
+        yield idx_start, idx_end, spot_px
 
 
+def _ou_variance_factor(a, t):
+    # (1 - exp(-2 a t)) / (2 a), the variance of the Ornstein-Uhlenbeck process over t per unit σ², with the limit t
+    # (Brownian motion) for a = 0
+    t = np.asarray(t, dtype=np.float64)
+    if a == 0:
+        return t.copy()
+    return -np.expm1(-2.0 * a * t) / (2.0 * a)
 
 
+def get_simulation_grid(forward_curve: np.array, T: float=None) -> (np.array, np.array):
+    """
+    The simulation times and forward prices of clewlow_strickland_1_factor_simulate_exact(), i.e. the rows of the forward
+    curve up to T, e.g. to reduce the simulated paths with the times they are simulated at.
+
+    Parameters
+    ----------
+    forward_curve : numpy.ndarray
+        Times (first column, starting at 0) and forward prices (second column), see
+        clewlow_strickland_1_factor_simulate_exact().
+    T : float, optional
+        Time horizon of the simulation. If specified, only the forward curve times <= T are kept.
+
+    Returns
+    -------
+    tuple
+        (tau, forward_prices), the simulation times and the forward prices at them.
+
+    Raises
+    ------
+    ValueError
+        If the first time is not 0, there are fewer than 2 times or the times are not strictly increasing.
+    """
+    tau = np.asarray(forward_curve[:,0], dtype=np.float64)
+    forward_prices = np.asarray(forward_curve[:,1], dtype=np.float64)
+    if T is not None:
+        mask = tau <= T
+        tau, forward_prices = tau[mask], forward_prices[mask]
+
+    if tau[0] != 0:
+        raise ValueError("The first time of 'forward_curve' must be 0 (the spot)")
+    if len(tau) < 2:
+        raise ValueError("'forward_curve' must have at least 2 times")
+    if (np.diff(tau) <= 0).any():
+        raise ValueError("The times of 'forward_curve' must be strictly increasing")
+    return tau, forward_prices
 
 
+@njit(parallel=True, fastmath=True, cache=True)
+def _cs1f_exact_kernel(ln_forward_prices, decay, step_vol, convexity, rand_nbs, spot_px):
+    # Auxiliary function for clewlow_strickland_1_factor_simulate_exact(), separated so @njit can be used.
+    nb_steps, nb_simulations = rand_nbs.shape
+    for s in prange(nb_simulations):
+        x = 0.0
+        spot_px[0, s] = np.exp(ln_forward_prices[0])
+        for i in range(nb_steps):
+            x = x * decay[i] + step_vol[i] * rand_nbs[i, s]
+            spot_px[i+1, s] = np.exp(ln_forward_prices[i+1] + x - convexity[i+1])
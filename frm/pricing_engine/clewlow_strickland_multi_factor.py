@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+from typing import Iterator, Tuple
+import time
+
+from frm.pricing_engine.monte_carlo_generic import generate_rand_nbs
+from frm.pricing_engine.monte_carlo_multiprocessing import get_chunk_sizes
+
+DEFAULT_NB_SIMULATIONS_PER_CHUNK = 10 * 1000
+
+
+def forward_curve_pca(log_returns: np.array,
+                      nb_factors: int,
+                      dt: float) -> Tuple[np.array, np.array]:
+    """
+    Derive the factor loadings (volatility functions) of the multi-factor Clewlow-Strickland model from a principal
+    component analysis of historical forward curve log returns.
+
+    Parameters:
+    log_returns (np.array): Log returns of the forward prices at fixed times to maturity, shape=(nb of observations, nb of tenors).
+    nb_factors (int): Number of factors to keep.
+    dt (float): Length of the return period, in years (e.g. 1/252 for daily returns). The loadings are annualised.
+
+    Returns:
+    factor_loadings (np.array): Annualised factor loadings per tenor, shape=(nb of tenors, nb_factors).
+                                The sum of squares over factors is the (explained) variance per tenor.
+    explained_variance_ratio (np.array): Share of the total variance explained by each factor, shape=(nb_factors,).
+
+    References:
+    [1] Clewlow, L., Strickland, C. (2000). Energy Derivatives: Pricing and Risk Management. Chapter 8.
+    """
+    log_returns = np.atleast_2d(log_returns)
+    assert 1 <= nb_factors <= log_returns.shape[1], nb_factors
+
+    covariance = np.cov(log_returns, rowvar=False) / dt
+    eigenvalues, eigenvectors = np.linalg.eigh(np.atleast_2d(covariance))
+    order = np.argsort(eigenvalues)[::-1][:nb_factors]
+    eigenvalues = np.maximum(eigenvalues[order], 0)
+    eigenvectors = eigenvectors[:, order]
+
+    # Eigenvectors are unique up to sign; choose the sign so that each factor has a positive sum of loadings
+    eigenvectors *= np.where(eigenvectors.sum(axis=0) < 0, -1.0, 1.0)
+
+    factor_loadings = eigenvectors * np.sqrt(eigenvalues)
+    explained_variance_ratio = eigenvalues / np.trace(np.atleast_2d(covariance))
+    return factor_loadings, explained_variance_ratio
+
+
+def _step_volatilities(simulation_times: np.array,
+                       maturities: np.array,
+                       loading_times_to_maturity: np.array,
+                       factor_loadings: np.array) -> np.array:
+    # Per step, maturity and factor, the signed root of the integrated variance ∫σ_k(T-s)² ds over the step,
+    # truncated at the maturity of the contract. Integrated with Simpson's rule over the (linearly interpolated) loadings.
+    # shape=(nb_steps, nb_maturities, nb_factors)
+    t_start = simulation_times[:-1, np.newaxis]
+    t_end = np.minimum(simulation_times[1:, np.newaxis], maturities[np.newaxis, :])
+    length = np.maximum(t_end - t_start, 0)
+    t_mid = t_start + 0.5 * length
+
+    def loading(t, k):
+        return np.interp(maturities[np.newaxis, :] - t, loading_times_to_maturity, factor_loadings[:, k])
+
+    nb_factors = factor_loadings.shape[1]
+    step_vol = np.zeros(length.shape + (nb_factors,))
+    for k in range(nb_factors):
+        σ_start, σ_mid, σ_end = loading(t_start, k), loading(t_mid, k), loading(t_end, k)
+        variance = length / 6 * (σ_start ** 2 + 4 * σ_mid ** 2 + σ_end ** 2)
+        step_vol[:, :, k] = np.sign(σ_mid) * np.sqrt(variance)
+    return step_vol
+
+
+def clewlow_strickland_multi_factor_simulate_chunks(forward_curve: np.array,
+                                                    simulation_times: np.array,
+                                                    loading_times_to_maturity: np.array,
+                                                    factor_loadings: np.array,
+                                                    nb_simulations: int,
+                                                    maturity_indices: np.array=None,
+                                                    nb_simulations_per_chunk: int=DEFAULT_NB_SIMULATIONS_PER_CHUNK,
+                                                    flag_apply_antithetic_variates: bool=False,
+                                                    random_seed: int=0) -> Iterator[Tuple[int, int, np.array]]:
+    """
+    Simulate the forward curve under the multi-factor Clewlow-Strickland model, streaming the simulated prices of the
+    selected contract maturities one chunk of simulations at a time.
+
+    Each forward price follows
+        dF(t,T) / F(t,T) = Σ_k σ_k(T-t) dW_k(t),
+    where the factor loadings σ_k are functions of the time to maturity (e.g. from forward_curve_pca()) and the factors
+    W_k are independent Brownian motions. All maturities are driven by the same factors, so the simulated curves have
+    consistent dynamics. A contract's price is held constant after its maturity.
+
+    The log price is stepped with the integrated variance of each factor over the step (Simpson's rule over the linearly
+    interpolated loadings) and the matching -0.5 * variance drift, so E[F(t,T)] = F(0,T) on any time grid.
+    The correlation between maturities within a step is approximated by the loadings over the step.
+
+    Parameters:
+    forward_curve (np.array): Two-dimensional array; the first column contains the contract maturities (in years),
+                              the second column the forward prices.
+    simulation_times (np.array): Increasing simulation times, in years, starting at 0.
+    loading_times_to_maturity (np.array): Increasing times to maturity (in years) at which the loadings are specified.
+                                          The loadings are linearly interpolated and flat extrapolated.
+    factor_loadings (np.array): Annualised factor loadings, shape=(len(loading_times_to_maturity), nb of factors).
+    nb_simulations (int): Number of simulations.
+    maturity_indices (np.array, optional): Indices of the forward_curve contracts to simulate. Default is all.
+    nb_simulations_per_chunk (int, optional): Number of simulations per chunk. Default is 10,000.
+    flag_apply_antithetic_variates (bool, optional): Flag to apply antithetic variates within each chunk. Default is False.
+    random_seed (int, optional): Seed of the root np.random.SeedSequence; each chunk draws from its own spawned stream.
+
+    Yields:
+    tuple: (idx_start, idx_end, forward_px) where forward_px are the simulated prices of simulations idx_start:idx_end,
+           shape=(len(simulation_times), nb of selected maturities, idx_end - idx_start).
+    """
+
+    simulation_times = np.asarray(simulation_times, dtype=np.float64)
+    loading_times_to_maturity = np.atleast_1d(np.asarray(loading_times_to_maturity, dtype=np.float64))
+    factor_loadings = np.asarray(factor_loadings, dtype=np.float64).reshape(len(loading_times_to_maturity), -1)
+    maturities = np.asarray(forward_curve[:,0], dtype=np.float64)
+    forward_prices = np.asarray(forward_curve[:,1], dtype=np.float64)
+    if maturity_indices is not None:
+        maturities = maturities[maturity_indices]
+        forward_prices = forward_prices[maturity_indices]
+
+    if simulation_times[0] != 0:
+        raise ValueError("'simulation_times' must start at 0")
+    if (np.diff(simulation_times) <= 0).any():
+        raise ValueError("'simulation_times' must be strictly increasing")
+    if (np.diff(loading_times_to_maturity) <= 0).any():
+        raise ValueError("'loading_times_to_maturity' must be strictly increasing")
+
+    # These terms evaluate to constants hence can be calculated outside the monte carlo loop
+    step_vol = _step_volatilities(simulation_times, maturities, loading_times_to_maturity, factor_loadings)
+    step_drift = -0.5 * (step_vol ** 2).sum(axis=2) # shape=(nb_steps, nb_maturities)
+    ln_forward_prices = np.log(forward_prices)
+
+    nb_steps = len(simulation_times) - 1
+    nb_factors = factor_loadings.shape[1]
+    chunk_sizes = get_chunk_sizes(int(nb_simulations), int(nb_simulations_per_chunk))
+    seed_sequences = np.random.SeedSequence(random_seed).spawn(len(chunk_sizes))
+
+    idx_start = 0
+    for chunk_size, seed_sequence in zip(chunk_sizes, seed_sequences):
+        chunk_size = int(chunk_size)
+        idx_end = idx_start + chunk_size
+        forward_px = np.empty((nb_steps+1, len(maturities), chunk_size))
+        ln_forward_px = np.tile(ln_forward_prices[:, np.newaxis], (1, chunk_size))
+        forward_px[0] = forward_prices[:, np.newaxis]
+
+        if nb_steps >= 1:
+            rand_nbs = generate_rand_nbs(nb_steps=nb_steps,
+                                         nb_rand_vars=nb_factors,
+                                         nb_simulations=chunk_size,
+                                         flag_apply_antithetic_variates=flag_apply_antithetic_variates,
+                                         rng=np.random.default_rng(seed_sequence))
+            for i in range(nb_steps):
+                ln_forward_px += step_drift[i][:, np.newaxis]
+                ln_forward_px += step_vol[i] @ rand_nbs[i]
+                np.exp(ln_forward_px, out=forward_px[i+1])
+
+        yield idx_start, idx_end, forward_px
+        idx_start = idx_end
+
+
+def clewlow_strickland_multi_factor_simulate(forward_curve: np.array,
+                                             simulation_times: np.array,
+                                             loading_times_to_maturity: np.array,
+                                             factor_loadings: np.array,
+                                             nb_simulations: int,
+                                             maturity_indices: np.array=None,
+                                             nb_simulations_per_chunk: int=DEFAULT_NB_SIMULATIONS_PER_CHUNK,
+                                             flag_apply_antithetic_variates: bool=False,
+                                             random_seed: int=0) -> np.array:
+    """
+    Simulate the forward curve under the multi-factor Clewlow-Strickland model, returning all simulations.
+    See clewlow_strickland_multi_factor_simulate_chunks() for the parameters, and to stream the results for large runs.
+
+    Returns:
+    np.array: Simulated forward prices, shape=(len(simulation_times), nb of selected maturities, nb_simulations).
+    """
+    nb_maturities = len(forward_curve) if maturity_indices is None else len(np.atleast_1d(maturity_indices))
+    result = np.empty((len(simulation_times), nb_maturities, int(nb_simulations)))
+    for idx_start, idx_end, forward_px in clewlow_strickland_multi_factor_simulate_chunks(
+            forward_curve=forward_curve,
+            simulation_times=simulation_times,
+            loading_times_to_maturity=loading_times_to_maturity,
+            factor_loadings=factor_loadings,
+            nb_simulations=nb_simulations,
+            maturity_indices=maturity_indices,
+            nb_simulations_per_chunk=nb_simulations_per_chunk,
+            flag_apply_antithetic_variates=flag_apply_antithetic_variates,
+            random_seed=random_seed):
+        result[:, :, idx_start:idx_end] = forward_px
+    return result
+
+
+if __name__ == "__main__":
+
+    # Monthly contracts over 3 years with 3 factors: level, slope and curvature (Samuelson effect on the 1st factor)
+    maturities = np.arange(1, 37) / 12
+    forward_curve = np.stack([maturities, 50 + 5 * np.cos(2 * np.pi * maturities)], axis=1)
+    loading_times_to_maturity = np.linspace(0, 3, 37)
+    factor_loadings = np.stack([0.20 + 0.30 * np.exp(-2.0 * loading_times_to_maturity),
+                                0.10 * np.cos(np.pi * loading_times_to_maturity / 3),
+                                0.05 * np.cos(2 * np.pi * loading_times_to_maturity / 3)], axis=1)
+    simulation_times = np.arange(0, 3 * 252 + 1) / 252
+
+    t1 = time.time()
+    nb_simulations = 0
+    for idx_start, idx_end, forward_px in clewlow_strickland_multi_factor_simulate_chunks(forward_curve=forward_curve,
+                                                                                        simulation_times=simulation_times,
+                                                                                        loading_times_to_maturity=loading_times_to_maturity,
+                                                                                        factor_loadings=factor_loadings,
+                                                                                        nb_simulations=50 * 1000,
+                                                                                        maturity_indices=np.arange(0, 36, 3)):
+        nb_simulations = idx_end
+    t2 = time.time()
+    print('Simulations:', nb_simulations, 'Time:', round(t2-t1, 2), 'seconds')
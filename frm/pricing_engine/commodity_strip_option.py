@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+from numba import njit, prange
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+import time
+
+from frm.pricing_engine.clewlow_strickland_1_factor import clewlow_strickland_1_factor_simulate_exact_chunks, get_simulation_grid
+from frm.pricing_engine.monte_carlo_statistics import merge_mean_and_m2
+
+DEFAULT_NB_SIMULATIONS_PER_CHUNK = 10 * 1000
+VALID_PAYOFF_TYPES = ['call', 'put', 'swap']
+
+
+@dataclass
+class AveragingPeriod:
+    """
+    One period of a commodity strip: a payoff on the arithmetic average of the simulated prices at the simulation
+    times within [start, end] (inclusive).
+
+    payoff_type:
+    - 'call': volume * discount_factor * max(average - strike, 0). A cap is a strip of calls on the period averages.
+    - 'put':  volume * discount_factor * max(strike - average, 0). A floor is a strip of puts on the period averages.
+    - 'swap': volume * discount_factor * (average - strike).
+    A single period, or a period with one fixing, is an Asian, or a European, option respectively.
+    """
+    start: float
+    end: float
+    strike: float
+    payoff_type: str = 'call'
+    volume: float = 1.0
+    discount_factor: float = 1.0
+
+    def __post_init__(self):
+        if self.payoff_type not in VALID_PAYOFF_TYPES:
+            raise ValueError(f"'payoff_type' must be one of {VALID_PAYOFF_TYPES}, got {self.payoff_type}")
+        if self.end < self.start:
+            raise ValueError(f"'end' ({self.end}) must be >= 'start' ({self.start})")
+
+
+def _compile_periods(periods: List[AveragingPeriod],
+                     simulation_times: np.array) -> Tuple[np.array, ...]:
+    # Converts the periods to the flat arrays used by the payoff kernel. The averaging window of each period is the
+    # half-open index range [start_idx, end_idx) of the simulation times within [start, end].
+    simulation_times = np.asarray(simulation_times, dtype=np.float64)
+    start = np.array([p.start for p in periods], dtype=np.float64)
+    end = np.array([p.end for p in periods], dtype=np.float64)
+    start_idx = np.searchsorted(simulation_times, start, side='left').astype(np.int64)
+    end_idx = np.searchsorted(simulation_times, end, side='right').astype(np.int64)
+    if (end_idx <= start_idx).any():
+        i = int(np.argmax(end_idx <= start_idx))
+        raise ValueError(f"No simulation time within the averaging period {periods[i]}")
+
+    strike = np.array([p.strike for p in periods], dtype=np.float64)
+    omega = np.array([-1.0 if p.payoff_type == 'put' else 1.0 for p in periods])
+    is_option = np.array([p.payoff_type != 'swap' for p in periods])
+    weight = np.array([p.volume * p.discount_factor for p in periods], dtype=np.float64)
+    return start_idx, end_idx, strike, omega, is_option, weight
+
+
+def price_strip_option(path_chunks: Iterable[Tuple[int, int, np.array]],
+                       simulation_times: np.array,
+                       periods: List[AveragingPeriod]) -> dict:
+    """
+    Price a strip of averaging periods from chunks of simulated price paths. Each chunk is reduced to the period
+    payoffs by a compiled kernel and merged into running means and variances, so the paths are not kept.
+
+    Parameters:
+    path_chunks (Iterable): Chunks of simulated paths, as yielded by the *_simulate_chunks functions, i.e.
+                            (idx_start, idx_end, paths) with paths.shape=(len(simulation_times), idx_end - idx_start).
+    simulation_times (np.array): Increasing simulation times of the paths, in the same units as the periods.
+    periods (list): The AveragingPeriod's of the strip.
+
+    Returns:
+    dict:
+        'price' (float): Monte Carlo price of the strip (sum of the periods).
+        'standard_error' (float): Standard error of the price.
+        'period_prices' (np.array): Monte Carlo price of each period.
+        'period_standard_errors' (np.array): Standard error of the price of each period.
+        'nb_simulations' (int): Number of simulations.
+    """
+    if len(periods) == 0:
+        raise ValueError("'periods' is empty")
+    start_idx, end_idx, strike, omega, is_option, weight = _compile_periods(periods, simulation_times)
+    nb_periods = len(periods)
+
+    nb, mean, m2 = 0, np.zeros(nb_periods + 1), np.zeros(nb_periods + 1)
+    for idx_start, idx_end, paths in path_chunks:
+        if paths.shape[0] != len(simulation_times):
+            raise ValueError(f"The paths have {paths.shape[0]} steps, expected {len(simulation_times)}")
+        payoffs = np.empty((nb_periods + 1, paths.shape[1])) # Last row is the strip payoff
+        _strip_payoff_kernel(paths, start_idx, end_idx, strike, omega, is_option, weight, payoffs)
+
+        chunk_mean = payoffs.mean(axis=1)
+        chunk_m2 = ((payoffs - chunk_mean[:, np.newaxis]) ** 2).sum(axis=1)
+        if nb == 0:
+            nb, mean, m2 = paths.shape[1], chunk_mean, chunk_m2
+        else:
+            nb, mean, m2 = merge_mean_and_m2(nb, mean, m2, paths.shape[1], chunk_mean, chunk_m2)
+    if nb == 0:
+        raise ValueError("'path_chunks' yielded no simulations")
+
+    variance = m2 / (nb - 1) if nb > 1 else np.full(m2.shape, np.nan)
+    standard_error = np.sqrt(variance / nb)
+    return {'price': mean[-1],
+            'standard_error': standard_error[-1],
+            'period_prices': mean[:-1],
+            'period_standard_errors': standard_error[:-1],
+            'nb_simulations': nb}
+
+
+def clewlow_strickland_1_factor_price_strip_option(forward_curve: np.array,
+                                                   alpha: float,
+                                                   sigma: float,
+                                                   periods: List[AveragingPeriod],
+                                                   nb_simulations: int,
+                                                   nb_simulations_per_chunk: int=DEFAULT_NB_SIMULATIONS_PER_CHUNK,
+                                                   flag_apply_antithetic_variates: bool=False,
+                                                   random_seed: int=0) -> dict:
+    """
+    Price a strip of averaging periods (Asian options, caps, floors, swaps) on spot prices simulated under the
+    Clewlow-Strickland one-factor model. The simulation times are the forward curve times, up to the last period end.
+    See clewlow_strickland_1_factor_simulate_exact() for the model parameters and price_strip_option() for the result.
+    """
+    T = max(p.end for p in periods)
+    simulation_times, _ = get_simulation_grid(forward_curve, T)
+    path_chunks = clewlow_strickland_1_factor_simulate_exact_chunks(forward_curve=forward_curve,
+                                                                    nb_simulations=nb_simulations,
+                                                                    alpha=alpha,
+                                                                    sigma=sigma,
+                                                                    T=T,
+                                                                    nb_simulations_per_chunk=nb_simulations_per_chunk,
+                                                                    flag_apply_antithetic_variates=flag_apply_antithetic_variates,
+                                                                    random_seed=random_seed)
+    return price_strip_option(path_chunks, simulation_times, periods)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _strip_payoff_kernel(paths, start_idx, end_idx, strike, omega, is_option, weight, payoffs):
+    # Auxiliary function for price_strip_option(), separated so @njit can be used.
+    nb_periods = start_idx.shape[0]
+    nb_simulations = paths.shape[1]
+    for s in prange(nb_simulations):
+        total = 0.0
+        for p in range(nb_periods):
+            average = 0.0
+            for i in range(start_idx[p], end_idx[p]):
+                average += paths[i, s]
+            average /= end_idx[p] - start_idx[p]
+            payoff = omega[p] * (average - strike[p])
+            if is_option[p] and payoff < 0.0:
+                payoff = 0.0
+            payoffs[p, s] = weight[p] * payoff
+            total += payoffs[p, s]
+        payoffs[nb_periods, s] = total
+
+
+if __name__ == "__main__":
+
+    # Daily forward curve over 2 years, with a monthly strip of calls (a cap) on the average spot price
+    tau = np.arange(0, 731, dtype=np.float64)
+    forward_curve = np.stack([tau, 50 + 5 * np.cos(2 * np.pi * tau / 365)], axis=1)
+    periods = [AveragingPeriod(start=30*i+1, end=30*(i+1), strike=50.0, payoff_type='call') for i in range(24)]
+
+    t1 = time.time()
+    result = clewlow_strickland_1_factor_price_strip_option(forward_curve=forward_curve,
+                                                            alpha=0.06,
+                                                            sigma=0.04,
+                                                            periods=periods,
+                                                            nb_simulations=1000 * 1000)
+    t2 = time.time()
+    print('Strip price:', result['price'], '+/-', result['standard_error'], 'Time:', round(t2-t1, 2), 'seconds')
@@ -4,6 +4,7 @@ if __name__ == "__main__":
     os.chdir(os.environ.get('PROJECT_DIR_FRM'))
 
 import numpy as np
+from numba import njit, prange
 import time
 
 from frm.pricing_engine.monte_carlo_generic import generate_rand_nbs
@@ -87,6 +88,135 @@ def simulate_gbm_path(initial_px: np.array,
     return x
 
 
+def simulate_gbm_path_log_space(initial_px: np.array,
+                                drift: np.array,
+                                forward_volatility: np.array,
+                                timestep_length: np.array,
+                                rand_nbs: np.array,
+                                observation_indices: np.array=None,
+                                dtype=np.float64,
+                                method: str='numba'):
+    """
+    Simulates the path of a Geometric Brownian Motion (GBM) in log space, returning only the requested observations.
+
+    The per-step log drift, (μ - 0.5σ²)Δt, and log volatility, σ√Δt, are precomputed once and the log prices are
+    accumulated step by step, over contiguous blocks of simulations. Only the observation indices requested by the
+    caller are stored and exponentiated, so the output is (nb of observations, nb of random variables, nb of
+    simulations) rather than every timestep.
+
+    Parameters:
+    initial_px (np.array): An array of initial prices for each random variable.
+    drift (np.array): An array of drift rates for each time step; shape=(number of time steps, number of random variables)
+    forward_volatility (np.array): An array of volatilities for each time step; shape=(number of time steps, number of random variables)
+    timestep_length (np.array): An array representing the length of each step
+    rand_nbs (np.array): A 3D array of random numbers; shape=(number of time steps, number of random variables, number of simulations)
+    observation_indices (np.array, optional): Indices of the path (0 is the initial price, i is after the i-th step) to return.
+                                              Defaults to all nb_timesteps + 1 indices.
+    dtype (optional): np.float32 or np.float64 (or their names). Dtype of the returned array. Default is np.float64.
+    method (str, optional): 'numba' (default) accumulates each path in a numba kernel parallelised over simulations.
+                            'cumsum' uses np.cumsum over the time axis.
+
+    Returns:
+    np.array: A 3D array of shape (number of observations, number of random variables, number of simulations).
+
+    Notes:
+    - Results align with simulate_gbm_path() at the observation indices (up to floating point rounding).
+    - The 'numba' method never materialises the full (timesteps, random variables, simulations) path array.
+    - An empty observation_indices returns an empty (0, random variables, simulations) array.
+    """
+
+    assert timestep_length.ndim == 1
+    dtype = np.dtype(dtype)
+    if dtype not in {np.dtype(np.float32), np.dtype(np.float64)}:
+        raise ValueError(f"'dtype' must be np.float32 or np.float64, not {dtype}")
+
+    nb_timesteps = timestep_length.shape[0]
+    nb_rand_vars = rand_nbs.shape[1]
+
+    drift = np.asarray(drift, dtype=np.float64).reshape(nb_timesteps, -1)
+    forward_volatility = np.asarray(forward_volatility, dtype=np.float64).reshape(nb_timesteps, -1)
+    initial_px = np.asarray(initial_px, dtype=np.float64).reshape(-1)
+
+    # Shape checks
+    assert nb_timesteps == rand_nbs.shape[0]
+    assert drift.shape[1] in {1, nb_rand_vars}
+    assert forward_volatility.shape[1] in {1, nb_rand_vars}
+    assert initial_px.shape[0] in {1, nb_rand_vars}
+
+    if observation_indices is None:
+        observation_indices = np.arange(nb_timesteps + 1)
+    observation_indices = np.atleast_1d(np.asarray(observation_indices, dtype=np.int64))
+    if observation_indices.size == 0:
+        return np.empty((0, nb_rand_vars, rand_nbs.shape[2]), dtype=dtype)
+    if observation_indices.min() < 0 or observation_indices.max() > nb_timesteps:
+        raise ValueError(f"'observation_indices' must be in [0, {nb_timesteps}]")
+
+    # Fused drift/volatility terms, evaluated once rather than per step per simulation
+    log_drift = np.broadcast_to((drift - 0.5 * forward_volatility ** 2) * timestep_length[:, np.newaxis],
+                                (nb_timesteps, nb_rand_vars))
+    log_vol = np.broadcast_to(forward_volatility * np.sqrt(timestep_length)[:, np.newaxis],
+                              (nb_timesteps, nb_rand_vars))
+    ln_initial_px = np.broadcast_to(np.log(initial_px), (nb_rand_vars,))
+
+    if method == 'cumsum':
+        ln_x = np.empty((nb_timesteps + 1, nb_rand_vars, rand_nbs.shape[2]))
+        ln_x[0, :, :] = ln_initial_px[:, np.newaxis]
+        np.cumsum(log_drift[:, :, np.newaxis] + log_vol[:, :, np.newaxis] * rand_nbs, axis=0, out=ln_x[1:])
+        ln_x[1:] += ln_initial_px[:, np.newaxis]
+        return np.exp(ln_x[observation_indices]).astype(dtype, copy=False)
+    elif method == 'numba':
+        # Map each path index to its (first) position in the output, -1 if not observed.
+        # Repeated observation indices are written once by the kernel and copied after.
+        unique_indices, first_position = np.unique(observation_indices, return_index=True)
+        output_position = np.full(nb_timesteps + 1, -1, dtype=np.int64)
+        output_position[unique_indices] = first_position
+
+        x = np.empty((len(observation_indices), nb_rand_vars, rand_nbs.shape[2]), dtype=dtype)
+        _gbm_log_space_kernel(np.ascontiguousarray(ln_initial_px),
+                              np.ascontiguousarray(log_drift),
+                              np.ascontiguousarray(log_vol),
+                              rand_nbs,
+                              output_position,
+                              x)
+        np.exp(x, out=x)
+        if len(unique_indices) < len(observation_indices):
+            x = x[output_position[observation_indices]]
+        return x
+    else:
+        raise ValueError(f"Invalid 'method': {method}")
+
+
+SIMULATION_BLOCK_SIZE = 4096
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _gbm_log_space_kernel(ln_initial_px, log_drift, log_vol, rand_nbs, output_position, x):
+    # Auxiliary function for simulate_gbm_path_log_space(), separated so @njit can be used.
+    # The simulations are split in blocks run in parallel. Within a block, the log prices are accumulated step by step
+    # with the simulation axis innermost, so rand_nbs and x are read and written contiguously (C order).
+    # Only the log prices of observed steps are written to x, the caller exponentiates x (np.exp is vectorised).
+    nb_timesteps, nb_rand_vars, nb_simulations = rand_nbs.shape
+    nb_blocks = (nb_simulations + SIMULATION_BLOCK_SIZE - 1) // SIMULATION_BLOCK_SIZE
+    for b in prange(nb_blocks):
+        start = b * SIMULATION_BLOCK_SIZE
+        stop = min(start + SIMULATION_BLOCK_SIZE, nb_simulations)
+        ln_x = np.empty((nb_rand_vars, stop - start))
+        for j in range(nb_rand_vars):
+            ln_x[j, :] = ln_initial_px[j]
+            position = output_position[0]
+            if position >= 0:
+                x[position, j, start:stop] = ln_x[j, :]
+        for i in range(nb_timesteps):
+            position = output_position[i + 1]
+            for j in range(nb_rand_vars):
+                drift_ij = log_drift[i, j]
+                vol_ij = log_vol[i, j]
+                for k in range(start, stop):
+                    ln_x[j, k - start] += drift_ij + vol_ij * rand_nbs[i, j, k]
+                if position >= 0:
+                    x[position, j, start:stop] = ln_x[j, :]
+
+
 if __name__ == "__main__":
 
     initial_px = np.array([0.6629])
@@ -111,6 +241,23 @@ if __name__ == "__main__":
     
     print("GBM:", t2-t1)
 
+    # Default path (every step observed), 252 daily steps x 100k simulations
+    timestep_length = np.full(252, 1 / 252)
+    drift = np.full(252, 0.02)
+    forward_volatility = np.full(252, 0.2)
+    rand_nbs = generate_rand_nbs(nb_steps=252, nb_rand_vars=1, nb_simulations=100 * 1000)
+    simulate_gbm_path_log_space(initial_px, drift, forward_volatility, timestep_length, np.ascontiguousarray(rand_nbs[:, :, :10])) # Compile
+
+    t1 = time.time()
+    simulate_gbm_path(initial_px, drift, forward_volatility, timestep_length, rand_nbs)
+    t2 = time.time()
+    simulate_gbm_path_log_space(initial_px, drift, forward_volatility, timestep_length, rand_nbs)
+    t3 = time.time()
+    simulate_gbm_path_log_space(initial_px, drift, forward_volatility, timestep_length, rand_nbs, observation_indices=[63, 126, 252])
+    t4 = time.time()
+    print("252 steps x 100k simulations. simulate_gbm_path:", round(t2-t1, 3), "s, log space (all steps):",
+          round(t3-t2, 3), "s, log space (3 observations):", round(t4-t3, 3), "s")
+
 
 
 
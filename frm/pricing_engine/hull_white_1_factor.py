@@ -1,7 +1,33 @@
 # -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
 
 import numpy as np
+import pandas as pd
 import scipy 
+from scipy.stats import qmc, norm
+from typing import Iterator, Optional, Tuple
+import time
+
+from frm.utils.daycount import year_fraction
+from frm.pricing_engine.monte_carlo_generic import generate_rand_nbs
+from frm.pricing_engine.monte_carlo_multiprocessing import get_chunk_sizes
+
+DEFAULT_NB_SIMULATIONS_PER_CHUNK = 10 * 1000
+
+
+def _discount_factor(zero_curve, years):
+    # Discount factor P(0,t) from the zero curve, for an array of any shape
+    years = np.asarray(years, dtype=np.float64)
+    return zero_curve.get_discount_factor(years=years.ravel()).reshape(years.shape)
+
+
+def _instantaneous_forward_rate(zero_curve, years):
+    # Instantaneous forward rate f(0,t) from the zero curve, for an array of any shape
+    years = np.asarray(years, dtype=np.float64)
+    return np.asarray(zero_curve.instantaneous_forward_rate(years=years.ravel())).reshape(years.shape)
+
 
 def calc_theta(zero_curve,
                mean_reversion_level: float,
@@ -31,18 +57,24 @@ def calc_theta(zero_curve,
         [1] Damiano Brigo, Fabio Mercurio - Interest Rate Models Theory and Practice (2001, Springer) 
     """
     
-    dt = 1e-5
     α = mean_reversion_level
     σ = volatility
     
-    years_grid = np.linspace(zero_curve.zero_data['years'].min(),
-                             zero_curve.zero_data['years'].max(),n)
+    years_grid = np.linspace(zero_curve.data['years'].min(),
+                             zero_curve.data['years'].max(),n)
     
-    # Calculate the 2nd derivative by numerical differentiation
-    f = zero_curve.instantaneous_forward_rate(years=years_grid)
-    f_plus_dt = zero_curve.instantaneous_forward_rate(years=years_grid+dt)
-    f_minus_dt = zero_curve.instantaneous_forward_rate(years=years_grid-dt)
-    df_dt = (f_plus_dt - f_minus_dt) / (2 * dt)
+    f = _instantaneous_forward_rate(zero_curve, years_grid)
+    if zero_curve.interpolation_method == 'cubic_spline_on_zero_rates':
+        # f(0,t) = z(t) + t z'(t), hence df/dt = 2 z'(t) + t z''(t), from the derivatives of the zero rate spline
+        z_1st_deriv = scipy.interpolate.splev(years_grid, zero_curve.cubic_spline_definition, der=1)
+        z_2nd_deriv = scipy.interpolate.splev(years_grid, zero_curve.cubic_spline_definition, der=2)
+        df_dt = 2 * z_1st_deriv + years_grid * z_2nd_deriv
+    elif zero_curve.piecewise_definition is not None:
+        # The local interpolators define F(t) = -ln P(0,t) piecewise, so df/dt = F''(t)
+        df_dt = zero_curve.piecewise_definition(years_grid, der=2)
+    else:
+        # The instantaneous forward rate is piecewise constant
+        df_dt = np.zeros(years_grid.shape)
 
     # Equation (3.34), in Section 3.3.1 'The Short-Rate Dynamics' on page 73 of [1] (page 121 of the pdf)
     θ_grid = df_dt + α * f + (σ**2) * (1-np.exp(-2*α*years_grid)) / (2*α)
@@ -56,25 +88,260 @@ def calc_B(t, T, α):
     # [1] Damiano Brigo, Fabio Mercurio - Interest Rate Models Theory and Practice (2001, Springer) 
     #     In section 3.3.2 'Bond and Option Pricing', page 75 (page 123 of the pdf) in [1]
     # [2] MAFS525 – Computational Methods for Pricing Structured Products, Slide 3/41
-    return (1/α) *(1-np.exp(-α*(T- t)))
+    t = np.asarray(t, dtype=np.float64)
+    T = np.asarray(T, dtype=np.float64)
+    return -np.expm1(-α * (T - t)) / α
 
 
-def calc_A(t, T, θ_spline_definition, α, σ):         
-    # MAFS525 – Computational Methods for Pricing Structured Products, Slide 3/41            
-    def integrand_1(t, T): 
-        return calc_B(t, T)**2    
-    def integrand_2(t, T):
-        θ_values = scipy.interpolate.splev(t, θ_spline_definition)
-        return θ_values * calc_B(t, T)
+def calc_A(t, T, zero_curve, α, σ):
+    """
+    Closed form of the log term A(t,T) of the Hull-White zero-coupon bond price P(t,T) = exp(A(t,T) - B(t,T) * r(t)),
+    fitted to the zero curve. Vectorised (with broadcasting) over t and T.
         
-    integrand_1_res = scipy.integrate.quad(integrand_1, t, T)[0]
-    integrand_2_res = scipy.integrate.quad(integrand_2, t, T)[0]
+        A(t,T) = ln(P(0,T) / P(0,t)) + B(t,T) f(0,t) - σ² / (4α) * (1 - exp(-2αt)) * B(t,T)²
     
-    return 0.5*(σ**2) * integrand_1_res - integrand_2_res
+    where P(0,.) are the zero curve discount factors and f(0,t) the instantaneous forward rate.
+
+    References:
+        [1] Damiano Brigo, Fabio Mercurio - Interest Rate Models Theory and Practice (2001, Springer)
+            Equation (3.39), in section 3.3.2 'Bond and Option Pricing', page 75 (page 123 of the pdf)
+    """
+    t = np.asarray(t, dtype=np.float64)
+    T = np.asarray(T, dtype=np.float64)
+    B = calc_B(t, T, α)
+    ln_P_0_T = np.log(_discount_factor(zero_curve, T))
+    ln_P_0_t = np.log(_discount_factor(zero_curve, t))
+    f_0_t = _instantaneous_forward_rate(zero_curve, t)
+    return ln_P_0_T - ln_P_0_t + B * f_0_t - (σ**2) / (4*α) * (-np.expm1(-2*α*t)) * B**2
         
 
-def calc_discount_factor(t, T, θ, α, σ, r0):
-    # MAFS525 – Computational Methods for Pricing Structured Products, Slide 3/41 (Hull Whi)
+def calc_discount_factor(t, T, zero_curve, α, σ, r):
+    """
+    Hull-White zero-coupon bond price P(t,T) = exp(A(t,T) - B(t,T) * r(t)) given the short rate r(t).
+    t, T and r are broadcast, e.g. t.shape=(nb_dates,1,1), T.shape=(1,nb_bonds,1) and r.shape=(nb_dates,1,nb_simulations)
+    prices a grid of bonds at every simulation node in one expression.
+    """
     B = calc_B(t, T, α)
-    A = calc_A(t, T, θ, α, σ)
-    return np.exp(A - r0*B)
+    A = calc_A(t, T, zero_curve, α, σ)
+    return np.exp(A - r*B)
+
+
+def calc_short_rate_mean(t, zero_curve, α, σ):
+    """
+    φ(t) = E[r(t)] - the deterministic shift of the short rate r(t) = x(t) + φ(t), where x is the zero-mean
+    Ornstein-Uhlenbeck process dx = -α x dt + σ dW, x(0)=0.
+
+    References:
+        [1] Damiano Brigo, Fabio Mercurio - Interest Rate Models Theory and Practice (2001, Springer)
+            Equation (3.37), in section 3.3.1 'The Short-Rate Dynamics', page 73
+    """
+    t = np.asarray(t, dtype=np.float64)
+    return _instantaneous_forward_rate(zero_curve, t) + (σ**2) / (2*α**2) * np.expm1(-α*t)**2
+
+
+def calc_short_rate_variance_weights(t, α, volatility_grid_years):
+    """
+    Weights w_j(t) = ∫ exp(-2α(t-u)) du over [g_{j-1}, g_j) ∩ [0, t], with g_0 = 0 and the last segment extended to t,
+    so the variance of the short rate for a piecewise constant volatility is Var[r(t)] = Σ_j σ_j² w_j(t).
+    Returns shape=t.shape + (len(volatility_grid_years),).
+    """
+    t = np.asarray(t, dtype=np.float64)[..., np.newaxis]
+    grid = np.asarray(volatility_grid_years, dtype=np.float64)
+    segment_start = np.minimum(t, np.concatenate([[0.0], grid[:-1]]))
+    segment_end = np.minimum(t, grid)
+    segment_end[..., -1] = t[..., 0] # The last volatility applies beyond the grid
+    return (np.exp(-2*α*(t - segment_end)) - np.exp(-2*α*(t - segment_start))) / (2*α)
+
+
+def calc_short_rate_variance(t, α, σ, volatility_grid_years=None):
+    """
+    Var[r(t)] = ∫_0^t σ(u)² exp(-2α(t-u)) du. σ is either a constant, or piecewise constant with σ[j] applying over
+    [volatility_grid_years[j-1], volatility_grid_years[j]) (from t=0 for j=0, and beyond the grid for the last σ).
+    """
+    if volatility_grid_years is None:
+        t = np.asarray(t, dtype=np.float64)
+        return (σ**2) * calc_B(0, t, 2*α)
+    return calc_short_rate_variance_weights(t, α, volatility_grid_years) @ (np.asarray(σ, dtype=np.float64)**2)
+
+
+def _integrated_variance(t, α, σ):
+    # V(0,t) = Var[∫_0^t x(s) ds]
+    return (σ**2) / (α**2) * (t - 2 * calc_B(0, t, α) + calc_B(0, t, 2*α))
+
+
+def hull_white_1_factor_simulate_chunks(zero_curve,
+                                        α: float,
+                                        σ: float,
+                                        nb_simulations: int,
+                                        years: Optional[np.array]=None,
+                                        dates: Optional[pd.DatetimeIndex]=None,
+                                        bond_tenors: Optional[np.array]=None,
+                                        nb_simulations_per_chunk: int=DEFAULT_NB_SIMULATIONS_PER_CHUNK,
+                                        flag_apply_antithetic_variates: bool=False,
+                                        flag_use_sobol: bool=False,
+                                        random_seed: int=0) -> Iterator[Tuple[int, int, dict]]:
+    """
+    Simulate the Hull-White 1 factor model, fitted to the zero curve, streaming the results one chunk of simulations
+    at a time.
+
+    The short rate is r(t) = x(t) + φ(t) (see calc_short_rate_mean()). Over each step the pair (x, ∫x ds) is drawn from
+    its exact bivariate Gaussian transition, so the simulation has no discretisation bias on any date grid, and
+    E[1 / bank_account(t)] = P(0,t).
+
+    Parameters:
+    zero_curve (ZeroCurve): The zero curve the model is fitted to.
+    α (float): Mean reversion parameter.
+    σ (float): Annualised volatility parameter.
+    nb_simulations (int): Number of simulations.
+    years (np.array, optional): Increasing simulation times, in years from the curve date.
+    dates (pd.DatetimeIndex, optional): Increasing simulation dates; converted to years with the curve's day count basis.
+                                        Exactly one of years and dates must be specified.
+    bond_tenors (np.array, optional): Tenors τ, in years, of the zero-coupon bonds P(t, t+τ) to price at each date.
+    nb_simulations_per_chunk (int, optional): Number of simulations per chunk. Default is 10,000.
+    flag_apply_antithetic_variates (bool, optional): Flag to apply antithetic variates within each chunk. Default is False.
+    flag_use_sobol (bool, optional): Flag to use scrambled Sobol quasi random numbers (2 dimensions per step) instead of
+                                     pseudo random numbers. Powers of 2 for the chunk size are recommended. Default is False.
+    random_seed (int, optional): Seed of the random numbers (or of the Sobol scrambling). Default is 0.
+
+    Yields:
+    tuple: (idx_start, idx_end, result) for simulations idx_start:idx_end where result is a dict of:
+        'short_rate' (np.array): r(t), shape=(nb of dates, idx_end - idx_start).
+        'bank_account' (np.array): exp(∫_0^t r(s) ds), shape=(nb of dates, idx_end - idx_start).
+        'discount_factor' (np.array): The stochastic discount factor 1 / bank_account(t).
+        'bond_price' (np.array): Only if bond_tenors is specified, P(t, t+τ), shape=(nb of dates, nb of tenors, idx_end - idx_start).
+    """
+
+    if (years is None) == (dates is None):
+        raise ValueError("Exactly one of 'years' and 'dates' must be specified")
+    if dates is not None:
+        years = year_fraction(zero_curve.curve_date, dates, zero_curve.day_count_basis)
+    years = np.atleast_1d(np.asarray(years, dtype=np.float64))
+    if (years < 0).any() or (np.diff(years) <= 0).any():
+        raise ValueError("The simulation times must be non-negative and strictly increasing")
+    if flag_apply_antithetic_variates and flag_use_sobol:
+        raise ValueError("Antithetic variates and Sobol numbers can not be combined")
+
+    # Prefix t=0 if required, the step from t=0 is dropped from the results
+    flag_prefix_t0 = years[0] > 0
+    t = np.concatenate([[0.0], years]) if flag_prefix_t0 else years
+    nb_steps = len(t) - 1
+
+    # These terms evaluate to constants hence can be calculated outside the monte carlo loop
+    Δt = np.diff(t)
+    decay = np.exp(-α * Δt)
+    B_Δt = calc_B(0, Δt, α)
+    var_x = (σ**2) / (2*α) * (-np.expm1(-2*α*Δt))
+    var_I = _integrated_variance(Δt, α, σ)
+    cov_x_I = 0.5 * (σ**2) * B_Δt**2
+    sd_x = np.sqrt(var_x)
+    beta_I = np.divide(cov_x_I, sd_x, out=np.zeros(nb_steps), where=sd_x > 0)
+    sd_I = np.sqrt(np.maximum(var_I - beta_I**2, 0))
+
+    φ = calc_short_rate_mean(t, zero_curve, α, σ)
+    # ln(bank_account(t)) = I(t) - ln(P(0,t)) + 0.5 V(0,t)
+    ln_bank_account_shift = -np.log(_discount_factor(zero_curve, t)) + 0.5 * _integrated_variance(t, α, σ)
+    if bond_tenors is not None:
+        bond_tenors = np.atleast_1d(np.asarray(bond_tenors, dtype=np.float64))
+        bond_B = calc_B(t[:, np.newaxis], t[:, np.newaxis] + bond_tenors[np.newaxis, :], α)
+        bond_A = calc_A(t[:, np.newaxis], t[:, np.newaxis] + bond_tenors[np.newaxis, :], zero_curve, α, σ)
+
+    chunk_sizes = get_chunk_sizes(int(nb_simulations), int(nb_simulations_per_chunk))
+    seed_sequences = np.random.SeedSequence(random_seed).spawn(len(chunk_sizes))
+    if flag_use_sobol:
+        sobol = qmc.Sobol(d=2*nb_steps, scramble=True, seed=random_seed)
+
+    idx_start = 0
+    for chunk_size, seed_sequence in zip(chunk_sizes, seed_sequences):
+        chunk_size = int(chunk_size)
+        idx_end = idx_start + chunk_size
+
+        if nb_steps == 0:
+            rand_nbs = np.zeros((0, 2, chunk_size))
+        elif flag_use_sobol:
+            rand_nbs = norm.ppf(sobol.random(chunk_size)).reshape(chunk_size, nb_steps, 2).transpose(1, 2, 0)
+        else:
+            rand_nbs = generate_rand_nbs(nb_steps=nb_steps,
+                                         nb_rand_vars=2,
+                                         nb_simulations=chunk_size,
+                                         flag_apply_antithetic_variates=flag_apply_antithetic_variates,
+                                         rng=np.random.default_rng(seed_sequence))
+
+        x = np.zeros((nb_steps+1, chunk_size))
+        I = np.zeros((nb_steps+1, chunk_size))
+        for i in range(nb_steps):
+            Z_x, Z_I = rand_nbs[i, 0], rand_nbs[i, 1]
+            x[i+1] = x[i] * decay[i] + sd_x[i] * Z_x
+            I[i+1] = I[i] + x[i] * B_Δt[i] + beta_I[i] * Z_x + sd_I[i] * Z_I
+
+        short_rate = x + φ[:, np.newaxis]
+        bank_account = np.exp(I + ln_bank_account_shift[:, np.newaxis])
+        result = {'short_rate': short_rate,
+                  'bank_account': bank_account,
+                  'discount_factor': 1 / bank_account}
+        if bond_tenors is not None:
+            result['bond_price'] = np.exp(bond_A[:, :, np.newaxis] - bond_B[:, :, np.newaxis] * short_rate[:, np.newaxis, :])
+
+        if flag_prefix_t0:
+            result = {k: v[1:] for k, v in result.items()}
+
+        yield idx_start, idx_end, result
+        idx_start = idx_end
+
+
+def hull_white_1_factor_simulate(zero_curve,
+                                 α: float,
+                                 σ: float,
+                                 nb_simulations: int,
+                                 years: Optional[np.array]=None,
+                                 dates: Optional[pd.DatetimeIndex]=None,
+                                 bond_tenors: Optional[np.array]=None,
+                                 nb_simulations_per_chunk: int=DEFAULT_NB_SIMULATIONS_PER_CHUNK,
+                                 flag_apply_antithetic_variates: bool=False,
+                                 flag_use_sobol: bool=False,
+                                 random_seed: int=0) -> dict:
+    """
+    Simulate the Hull-White 1 factor model, returning all simulations. See hull_white_1_factor_simulate_chunks() for
+    the parameters and results, and to stream the results for large runs.
+    """
+    result = {}
+    for idx_start, idx_end, chunk in hull_white_1_factor_simulate_chunks(
+            zero_curve=zero_curve,
+            α=α,
+            σ=σ,
+            nb_simulations=nb_simulations,
+            years=years,
+            dates=dates,
+            bond_tenors=bond_tenors,
+            nb_simulations_per_chunk=nb_simulations_per_chunk,
+            flag_apply_antithetic_variates=flag_apply_antithetic_variates,
+            flag_use_sobol=flag_use_sobol,
+            random_seed=random_seed):
+        for k, v in chunk.items():
+            if k not in result:
+                result[k] = np.empty(v.shape[:-1] + (int(nb_simulations),))
+            result[k][..., idx_start:idx_end] = v
+    return result
+
+
+if __name__ == "__main__":
+
+    from frm.term_structures.zero_curve import ZeroCurve
+    from frm.enums.utils import CompoundingFrequency
+
+    years = np.array([0.25, 0.5, 1, 2, 3, 5, 7, 10, 15, 20, 30])
+    zero_curve = ZeroCurve(curve_date=pd.Timestamp(2024, 1, 2),
+                           data=pd.DataFrame({'years': years, 'zero_rate': 0.03 + 0.01 * (1 - np.exp(-years / 5))}),
+                           compounding_frequency=CompoundingFrequency.CONTINUOUS)
+
+    # 100k simulations x 500 dates, reduced to the expected discount factors chunk by chunk
+    simulation_years = np.linspace(0.02, 10, 500)
+    t1 = time.time()
+    sum_discount_factor = np.zeros(len(simulation_years))
+    for idx_start, idx_end, result in hull_white_1_factor_simulate_chunks(zero_curve, α=0.05, σ=0.01,
+                                                                          nb_simulations=100 * 1000,
+                                                                          years=simulation_years):
+        sum_discount_factor += result['discount_factor'].sum(axis=1)
+    t2 = time.time()
+    print('Time:', round(t2-t1, 2), 'seconds')
+    print('Max abs error of E[1/bank_account] vs P(0,t):',
+          np.abs(sum_discount_factor / (100 * 1000) - zero_curve.get_discount_factor(years=simulation_years)).max())
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import scipy
+from scipy.stats import norm
+from typing import Optional
+import time
+
+from frm.pricing_engine.black76 import black76_price
+from frm.pricing_engine.hull_white_1_factor import calc_B, calc_short_rate_variance_weights, _discount_factor, \
+    _instantaneous_forward_rate
+
+VALID_VOLATILITY_TYPES = ['piecewise_constant', 'constant']
+
+
+def _build_strip(zero_curve, expiry_years, payment_years_list, accrual_fractions_list, strikes, is_payer):
+    # Pads the cash flows of the strip into (nb of options, max nb of cash flows) arrays. Each option is an option on a
+    # coupon bond with coupons strike * accrual fraction and a final notional of 1, struck at 1 (Jamshidian form).
+    nb_options = len(expiry_years)
+    max_nb_cashflows = max(len(p) for p in payment_years_list)
+    payment_years = np.zeros((nb_options, max_nb_cashflows))
+    accrual_fractions = np.zeros((nb_options, max_nb_cashflows))
+    mask = np.zeros((nb_options, max_nb_cashflows), dtype=bool)
+    for j, (p, τ) in enumerate(zip(payment_years_list, accrual_fractions_list)):
+        payment_years[j, :len(p)] = p
+        accrual_fractions[j, :len(p)] = τ
+        mask[j, :len(p)] = True
+    payment_years = np.where(mask, payment_years, expiry_years[:, np.newaxis]) # Padding doesn't affect the results
+
+    P_0_T_e = _discount_factor(zero_curve, expiry_years)
+    P_0_T_i = _discount_factor(zero_curve, payment_years)
+    annuity = (accrual_fractions * P_0_T_i * mask).sum(axis=1)
+    P_0_T_n = P_0_T_i[np.arange(nb_options), mask.sum(axis=1) - 1]
+    forward = (P_0_T_e - P_0_T_n) / annuity
+    strikes = forward.copy() if strikes is None else np.broadcast_to(np.asarray(strikes, dtype=np.float64), (nb_options,)).copy()
+
+    coupons = strikes[:, np.newaxis] * accrual_fractions * mask
+    coupons[np.arange(nb_options), mask.sum(axis=1) - 1] += 1.0
+
+    return {'expiry_years': expiry_years,
+            'payment_years': payment_years,
+            'accrual_fractions': accrual_fractions,
+            'coupons': coupons,
+            'mask': mask,
+            'strike': strikes,
+            'forward': forward,
+            'annuity': annuity,
+            'is_payer': np.broadcast_to(np.asarray(is_payer, dtype=bool), (nb_options,)).copy()}
+
+
+def coterminal_swaption_strip(zero_curve,
+                              expiry_years: np.array,
+                              maturity_years: float,
+                              fixed_leg_frequency_years: float=1.0,
+                              strikes: Optional[np.array]=None,
+                              is_payer: bool=True) -> dict:
+    """
+    Define a strip of European swaptions on swaps that start at the expiry and end at the common maturity.
+    The fixed leg pays every fixed_leg_frequency_years back from the maturity (a short first period if required).
+    strikes default to the forward swap rates (at-the-money).
+    """
+    expiry_years = np.sort(np.atleast_1d(np.asarray(expiry_years, dtype=np.float64)))
+    if (expiry_years >= maturity_years).any():
+        raise ValueError("The expiries must be before 'maturity_years'")
+    payment_years_list, accrual_fractions_list = [], []
+    for T_e in expiry_years:
+        nb_periods = int(np.ceil((maturity_years - T_e) / fixed_leg_frequency_years - 1e-9))
+        payment_years = maturity_years - fixed_leg_frequency_years * np.arange(nb_periods)[::-1]
+        payment_years_list.append(payment_years)
+        accrual_fractions_list.append(np.diff(np.concatenate([[T_e], payment_years])))
+    return _build_strip(zero_curve, expiry_years, payment_years_list, accrual_fractions_list, strikes, is_payer)
+
+
+def caplet_strip(zero_curve,
+                 start_years: np.array,
+                 end_years: np.array,
+                 strikes: Optional[np.array]=None,
+                 is_caplet: bool=True) -> dict:
+    """
+    Define a strip of caplets (or floorlets) on the simple forward rates over [start_years, end_years], fixed at the start
+    and paid at the end. A caplet is a put on the zero-coupon bond P(start, end). strikes default to the forward rates.
+    """
+    start_years = np.atleast_1d(np.asarray(start_years, dtype=np.float64))
+    end_years = np.atleast_1d(np.asarray(end_years, dtype=np.float64))
+    order = np.argsort(start_years)
+    start_years, end_years = start_years[order], end_years[order]
+    if strikes is not None:
+        strikes = np.broadcast_to(np.asarray(strikes, dtype=np.float64), start_years.shape)[order]
+    return _build_strip(zero_curve, start_years, [[e] for e in end_years], [[e - s] for s, e in zip(start_years, end_years)],
+                        strikes, is_caplet)
+
+
+def black76_strip_price(strip: dict, black_volatility: np.array) -> np.array:
+    """
+    Black (1976) prices of the options in the strip, given lognormal volatilities.
+    Swaptions are priced off the forward swap rate and annuity, caplets off the forward rate and the accrual-weighted
+    discount factor to the payment date.
+    """
+    cp = np.where(strip['is_payer'], 1.0, -1.0)
+    return black76_price(F=strip['forward'],
+                         K=strip['strike'],
+                         σ=black_volatility,
+                         T=strip['expiry_years'],
+                         cp=cp,
+                         discount_factor=strip['annuity'])
+
+
+def hull_white_strip_price(strip: dict,
+                           zero_curve,
+                           α: float,
+                           short_rate_variance: np.array,
+                           max_iterations: int=50):
+    """
+    Hull-White prices of the options in the strip by Jamshidian decomposition, vectorised over the strip, and their
+    analytic vega with respect to the variance of the short rate at each option's expiry.
+
+    A payer swaption (or caplet) is a put, struck at 1, on the coupon bond Σ c_i P(T_e, T_i). The short rate r* at which
+    the coupon bond is worth 1 is found by Newton iterations on the whole strip at once, and the option is the sum of the
+    puts on the zero-coupon bonds struck at X_i = P(T_e, T_i; r*). The price depends on the volatility only through
+    v = Var[r(T_e)]. As all the zero-coupon bond options exercise on the same event r(T_e) > r*, the sensitivity of r*
+    to v cancels and dPrice/dv = Σ c_i P(0,T_i) n(h_i) B(T_e,T_i) / (2 sqrt(v)).
+
+    Parameters:
+    strip (dict): Output of coterminal_swaption_strip() or caplet_strip().
+    zero_curve (ZeroCurve): The zero curve the model is fitted to.
+    α (float): Mean reversion parameter.
+    short_rate_variance (np.array): Var[r(T_e)] for each option (see calc_short_rate_variance()).
+
+    Returns:
+    price (np.array): Hull-White price of each option.
+    vega (np.array): dPrice / dVar[r(T_e)] for each option.
+
+    References:
+    [1] Jamshidian, F. (1989). An Exact Bond Option Formula. The Journal of Finance, 44(1), 205-209.
+    [2] Damiano Brigo, Fabio Mercurio - Interest Rate Models Theory and Practice (2001, Springer)
+        Section 3.3.2 'Bond and Option Pricing', equations (3.40) & (3.41), pages 76-77
+    """
+    T_e = strip['expiry_years'][:, np.newaxis]
+    T_i = strip['payment_years']
+    c = strip['coupons']
+    v = np.maximum(np.asarray(short_rate_variance, dtype=np.float64), 1e-300)[:, np.newaxis]
+
+    B = calc_B(T_e, T_i, α)
+    P_0_T_e = _discount_factor(zero_curve, T_e)
+    P_0_T_i = _discount_factor(zero_curve, T_i)
+    f_0_T_e = _instantaneous_forward_rate(zero_curve, T_e)
+    A = np.log(P_0_T_i / P_0_T_e) + B * f_0_T_e - 0.5 * B**2 * v
+
+    # Newton iterations for r*: Σ c_i exp(A_i - B_i r*) = 1. The function is decreasing & convex in r*.
+    r_star = f_0_T_e.copy()
+    for _ in range(max_iterations):
+        X = np.exp(A - B * r_star)
+        g = (c * X).sum(axis=1, keepdims=True) - 1.0
+        dg = -(c * B * X).sum(axis=1, keepdims=True)
+        step = g / dg
+        r_star -= step
+        if np.abs(step).max() < 1e-15:
+            break
+    X = np.exp(A - B * r_star)
+
+    mask = strip['mask']
+    σ_p = np.where(mask, B * np.sqrt(v), 1.0) # The padding has B=0, it is masked out of the sums below
+    h = np.log(P_0_T_i / (P_0_T_e * X)) / σ_p + 0.5 * σ_p
+    zero_coupon_bond_put = X * P_0_T_e * norm.cdf(-h + σ_p) - P_0_T_i * norm.cdf(-h)
+    zero_coupon_bond_call = P_0_T_i * norm.cdf(h) - X * P_0_T_e * norm.cdf(h - σ_p)
+
+    is_payer = strip['is_payer'][:, np.newaxis]
+    price = np.where(mask, c * np.where(is_payer, zero_coupon_bond_put, zero_coupon_bond_call), 0.0).sum(axis=1)
+    vega = np.where(mask, c * P_0_T_i * norm.pdf(h) * B / (2 * np.sqrt(v)), 0.0).sum(axis=1) # Same for puts and calls
+    return price, vega
+
+
+def hull_white_calibrate(strip: dict,
+                         zero_curve,
+                         market_prices: np.array,
+                         α: float=0.05,
+                         volatility_type: str='piecewise_constant',
+                         flag_calibrate_α: bool=False,
+                         α_bounds: tuple=(1e-4, 1.0)) -> dict:
+    """
+    Calibrate the Hull-White 1 factor volatility σ(t) (and optionally the mean reversion α) to a strip of swaption or
+    caplet prices.
+
+    With volatility_type='piecewise_constant', σ(t) is constant between the option expiries; σ[j] applies over
+    [T_e[j-1], T_e[j]) (from 0 for j=0). For a strip sorted by expiry the Jacobian of the prices with respect to σ is
+    lower triangular and analytic (see hull_white_strip_price()), so the least squares solve needs only a few
+    vectorised price evaluations. With flag_calibrate_α, α is found by a bounded scalar minimisation over the
+    σ calibrations.
+
+    Parameters:
+    strip (dict): Output of coterminal_swaption_strip() or caplet_strip().
+    zero_curve (ZeroCurve): The zero curve the model is fitted to.
+    market_prices (np.array): Market prices of the options in the strip, e.g. from black76_strip_price().
+    α (float, optional): Mean reversion parameter, or the initial guess if flag_calibrate_α. Default is 0.05.
+    volatility_type (str, optional): 'piecewise_constant' or 'constant'. Default is 'piecewise_constant'.
+    flag_calibrate_α (bool, optional): Flag to calibrate α. Default is False.
+    α_bounds (tuple, optional): Bounds on α if flag_calibrate_α.
+
+    Returns:
+    dict:
+        'α' (float): Mean reversion parameter.
+        'σ' (np.array): Volatility per segment (one value for volatility_type='constant').
+        'volatility_grid_years' (np.array): End of each volatility segment (None for volatility_type='constant').
+        'model_prices' (np.array): Hull-White prices of the strip.
+        'residuals' (np.array): Model less market prices.
+    """
+    if volatility_type not in VALID_VOLATILITY_TYPES:
+        raise ValueError(f"'volatility_type' must be one of {VALID_VOLATILITY_TYPES}, got {volatility_type}")
+    market_prices = np.asarray(market_prices, dtype=np.float64)
+    T_e = strip['expiry_years']
+    if volatility_type == 'piecewise_constant':
+        volatility_grid_years = np.unique(T_e)
+    else:
+        volatility_grid_years = np.array([T_e.max()])
+
+    def calibrate_σ(α):
+        weights = calc_short_rate_variance_weights(T_e, α, volatility_grid_years) # Var[r(T_e)] = weights @ σ²
+
+        def residuals(σ):
+            price, _ = hull_white_strip_price(strip, zero_curve, α, weights @ σ**2)
+            return price - market_prices
+
+        def jacobian(σ):
+            _, vega = hull_white_strip_price(strip, zero_curve, α, weights @ σ**2)
+            return vega[:, np.newaxis] * weights * 2 * σ[np.newaxis, :]
+
+        σ0 = np.full(len(volatility_grid_years), 0.01)
+        return scipy.optimize.least_squares(residuals, σ0, jac=jacobian, bounds=(1e-6, np.inf), x_scale=0.01,
+                                            xtol=1e-14, ftol=1e-14, gtol=1e-14)
+
+    if flag_calibrate_α:
+        result_α = scipy.optimize.minimize_scalar(lambda α: calibrate_σ(α).cost, bounds=α_bounds, method='bounded',
+                                                  options={'xatol': 1e-6})
+        α = result_α.x
+    result = calibrate_σ(α)
+
+    σ = result.x
+    model_prices = result.fun + market_prices
+    return {'α': α,
+            'σ': σ,
+            'volatility_grid_years': volatility_grid_years if volatility_type == 'piecewise_constant' else None,
+            'model_prices': model_prices,
+            'residuals': result.fun}
+
+
+if __name__ == "__main__":
+
+    import pandas as pd
+    from frm.term_structures.zero_curve import ZeroCurve
+    from frm.enums.utils import CompoundingFrequency
+
+    years = np.array([0.25, 0.5, 1, 2, 3, 5, 7, 10, 15, 20, 30])
+    zero_curve = ZeroCurve(curve_date=pd.Timestamp(2024, 1, 2),
+                           data=pd.DataFrame({'years': years, 'zero_rate': 0.03 + 0.01 * (1 - np.exp(-years / 5))}),
+                           compounding_frequency=CompoundingFrequency.CONTINUOUS)
+
+    # 1y...9y into 10y co-terminal ATM payer swaptions
+    strip = coterminal_swaption_strip(zero_curve, expiry_years=np.arange(1, 10), maturity_years=10.0)
+    market_prices = black76_strip_price(strip, black_volatility=np.linspace(0.30, 0.22, 9))
+
+    # α and a constant σ, then a piecewise constant σ(t) given α, which reprices the strip exactly
+    t1 = time.time()
+    result = hull_white_calibrate(strip, zero_curve, market_prices, volatility_type='constant', flag_calibrate_α=True)
+    result = hull_white_calibrate(strip, zero_curve, market_prices, α=result['α'])
+    t2 = time.time()
+    print('α:', round(result['α'], 4), 'σ:', np.round(result['σ'], 5))
+    print('Max abs price error:', np.abs(result['residuals']).max(), 'Time:', round(t2-t1, 3), 'seconds')
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Optional, Tuple
+import time
+
+from frm.utils.daycount import year_fraction
+from frm.pricing_engine.hull_white_1_factor import calc_B, _discount_factor
+
+# Beyond this node index the central branch is pinned inwards (Hull & White (1994) use j_max = ceil(0.184 / (α Δt)))
+J_MAX_FACTOR = 0.184
+
+
+def swap_leg_cashflows(swap_leg, zero_curve) -> Tuple[np.array, np.array]:
+    """
+    Cash flows of a SwapLeg (or any object with a 'schedule' DataFrame with 'payment_date' & 'payment' columns) after
+    the curve date, as (years, amounts). Amounts are signed by the leg's pay_rec and years use the curve's day count basis.
+    The payments must be known, e.g. a fixed leg; float/OIS coupons are not projected by the tree.
+    """
+    schedule = swap_leg.schedule
+    mask_future = schedule['payment_date'] > zero_curve.curve_date
+    payments = schedule.loc[mask_future, 'payment'].to_numpy(dtype=np.float64)
+    if np.isnan(payments).any():
+        raise ValueError("The leg has unknown payments (e.g. float or OIS coupons), only known cash flows are supported")
+    multiplier = swap_leg.pay_rec.multiplier if getattr(swap_leg, 'pay_rec', None) is not None else 1
+    years = np.atleast_1d(year_fraction(zero_curve.curve_date, pd.DatetimeIndex(schedule.loc[mask_future, 'payment_date']),
+                                        zero_curve.day_count_basis)).astype(np.float64)
+    return years, multiplier * payments
+
+
+def _build_time_grid(event_years: np.array, max_time_step: float) -> np.array:
+    # Union of 0 and the event times, each interval split in equal steps no longer than max_time_step
+    points = np.unique(np.concatenate([[0.0], np.asarray(event_years, dtype=np.float64)]))
+    nb_steps = np.maximum(np.ceil(np.diff(points) / max_time_step - 1e-9).astype(np.int64), 1)
+    grid = [np.linspace(points[i], points[i+1], nb_steps[i], endpoint=False) for i in range(len(points) - 1)]
+    return np.concatenate(grid + [points[-1:]])
+
+
+@dataclass
+class HullWhiteTrinomialTree:
+    """
+    Hull-White 1 factor trinomial tree, dr = (θ(t) - α r) dt + σ(t) dW, fitted to the zero curve by forward induction
+    of the Arrow-Debreu prices.
+
+    The tree is built on x = r - φ(t), dx = -α x dt + σ(t) dW, with nodes x_{i,j} = j dx_i for j in [-J_i, J_i] at
+    slice i. The node spacing dx_{i+1} = sqrt(3 V_i), where V_i is the exact variance of x over the step, so
+    non-uniform time steps and piecewise constant volatilities are supported. From node j, the branches go to
+    k-1, k, k+1, with k the node nearest to the conditional mean, pinned inwards beyond J_MAX_FACTOR / (α Δt), and
+    the probabilities match the conditional mean and variance of x exactly. The discounting over [t_i, t_{i+1}] is at
+    r_{i,j} = φ_i + x_{i,j}, with φ_i fitted so the tree reprices P(0, t_{i+1}).
+
+    Only the per slice parameters (Δt_i, dx_i, J_i, φ_i) are stored; the transitions are recomputed from these, so
+    the memory of the fitting and of the backward induction is O(nodes per slice) rather than O(total nodes).
+
+    Parameters:
+    zero_curve (ZeroCurve): The zero curve the tree is fitted to.
+    α (float): Mean reversion parameter.
+    σ (float or np.array): Volatility, or the piecewise constant volatilities over volatility_grid_years (as output
+                           by hull_white_calibrate()); σ[j] applies over [grid[j-1], grid[j]), the last one thereafter.
+    event_years (np.array): Times that must be on the tree (cash flow and exercise times). The last one is the end of the tree.
+    max_time_step (float, optional): Maximum time step, in years. Default is 1/12.
+    volatility_grid_years (np.array, optional): End of each volatility segment, if σ is piecewise constant.
+
+    References:
+    [1] John Hull, Alan White - Numerical Procedures for Implementing Term Structure Models I: Single-Factor Models
+        (1994), The Journal of Derivatives, 2(1), 7-16
+    [2] John Hull, Alan White - Using Hull-White Interest Rate Trees (1996), The Journal of Derivatives, 3(3), 26-36
+    """
+    zero_curve: object
+    α: float
+    σ: object
+    event_years: np.array
+    max_time_step: float = 1 / 12
+    volatility_grid_years: Optional[np.array] = None
+
+    times: np.array = field(init=False)
+    dt: np.array = field(init=False)
+    dx: np.array = field(init=False)
+    j_max: np.array = field(init=False)
+    φ: np.array = field(init=False)
+
+    def __post_init__(self):
+        event_years = np.atleast_1d(np.asarray(self.event_years, dtype=np.float64))
+        if (event_years <= 0).any():
+            raise ValueError("'event_years' must be > 0")
+        if self.α <= 0:
+            raise ValueError("'α' must be > 0")
+        σ = np.atleast_1d(np.asarray(self.σ, dtype=np.float64))
+        if self.volatility_grid_years is None:
+            if σ.size != 1:
+                raise ValueError("'volatility_grid_years' must be specified for a piecewise constant σ")
+            grid = np.array([np.inf])
+            extra_points = np.array([])
+        else:
+            grid = np.asarray(self.volatility_grid_years, dtype=np.float64)
+            if σ.shape != grid.shape:
+                raise ValueError("'σ' and 'volatility_grid_years' must have the same shape")
+            grid = np.concatenate([grid[:-1], [np.inf]]) # The last σ is extended
+            extra_points = grid[:-1][grid[:-1] < event_years.max()]
+
+        self.times = _build_time_grid(np.concatenate([event_years, extra_points]), self.max_time_step)
+        self.dt = np.diff(self.times)
+        nb_steps = len(self.dt)
+
+        # Spacing of slice i+1 from the exact variance of x over step i
+        σ_step = σ[np.searchsorted(grid, self.times[:-1], side='right')]
+        variance = σ_step ** 2 * calc_B(0, self.dt, 2 * self.α)
+        self.dx = np.concatenate([[np.sqrt(3 * variance[0])], np.sqrt(3 * variance)])
+
+        # Forward induction of the Arrow-Debreu prices Q_{i,j}, fitting φ_i to P(0, t_{i+1})
+        P = _discount_factor(self.zero_curve, self.times[1:])
+        self.j_max = np.zeros(nb_steps + 1, dtype=np.int64)
+        self.φ = np.zeros(nb_steps)
+        Q = np.ones(1)
+        for i in range(nb_steps):
+            x = self._x(i)
+            discount_x = np.exp(-x * self.dt[i])
+            self.φ[i] = (np.log((Q * discount_x).sum()) - np.log(P[i])) / self.dt[i]
+            k, p_d, p_m, p_u = self._transition(i)
+            weights = Q * discount_x * np.exp(-self.φ[i] * self.dt[i])
+            nb_next = 2 * self.j_max[i+1] + 1
+            Q = np.bincount(k - 1, weights * p_d, nb_next) \
+                + np.bincount(k, weights * p_m, nb_next) \
+                + np.bincount(k + 1, weights * p_u, nb_next)
+
+    def _x(self, i: int) -> np.array:
+        return np.arange(-self.j_max[i], self.j_max[i] + 1) * self.dx[i]
+
+    def _transition(self, i: int) -> Tuple[np.array, ...]:
+        # Branching from slice i to slice i+1: the array index of the central node k in slice i+1 and the
+        # probabilities of the down/middle/up branches. Sets self.j_max[i+1], the same on the forward & backward passes.
+        x = self._x(i)
+        dx_next = self.dx[i+1]
+        mean = x * np.exp(-self.α * self.dt[i])
+        k = np.rint(mean / dx_next).astype(np.int64)
+        j_cap = max(int(np.ceil(J_MAX_FACTOR / (1 - np.exp(-self.α * self.dt[i])))), 1)
+        j_next = max(min(int(np.abs(k).max()) + 1, j_cap), 1)
+        # Pin the central branch inwards at the edges, keeping p_m >= 0 i.e. |η| <= sqrt(2/3) dx
+        k_pinned = np.clip(k, -(j_next - 1), j_next - 1)
+        if (np.abs(mean - k_pinned * dx_next) > np.sqrt(2 / 3) * dx_next).any():
+            j_next, k_pinned = int(np.abs(k).max()) + 1, k
+        self.j_max[i+1] = j_next
+
+        η = (mean - k_pinned * dx_next) / dx_next
+        p_u = 1 / 6 + 0.5 * (η**2 + η)
+        p_d = 1 / 6 + 0.5 * (η**2 - η)
+        p_m = 2 / 3 - η**2
+        return k_pinned + j_next, p_d, p_m, p_u
+
+    def short_rate(self, i: int) -> np.array:
+        """The short rate over [t_i, t_{i+1}] at the nodes of slice i."""
+        return self.φ[i] + self._x(i)
+
+    def _event_index(self, years: np.array) -> np.array:
+        years = np.atleast_1d(np.asarray(years, dtype=np.float64))
+        idx = np.clip(np.searchsorted(self.times, years), 0, len(self.times) - 1)
+        idx_left = np.clip(idx - 1, 0, len(self.times) - 1)
+        idx = np.where(np.abs(self.times[idx_left] - years) < np.abs(self.times[idx] - years), idx_left, idx)
+        if not np.allclose(self.times[idx], years, rtol=0, atol=1e-10):
+            raise ValueError("The event times must be in 'event_years' when the tree is built")
+        return idx
+
+    def price(self,
+              cashflow_years: np.array,
+              cashflow_amounts: np.array,
+              exercise_years: Optional[np.array]=None,
+              strike: float=0.0,
+              is_call: bool=True) -> dict:
+        """
+        Price a set of known cash flows (e.g. from swap_leg_cashflows()) and, optionally, a Bermudan option on them, by
+        backward induction on the slice arrays.
+
+        The underlying at an exercise time t_e is the value of the cash flows paid after t_e. The option holder
+        exercises into the underlying less the strike (is_call) or into the strike less the underlying (not is_call).
+        For a fixed coupon bond with notional N and a float leg at par:
+        - a Bermudan receiver swaption is a call with strike N on the fixed leg plus N at maturity,
+        - a Bermudan payer swaption is the corresponding put,
+        - a bond callable at par by the issuer is the bond less the call.
+        With a single exercise time the option is European.
+
+        Returns:
+        dict:
+            'underlying' (float): Present value of the cash flows.
+            'option' (float): Present value of the option (0 if exercise_years is None).
+        """
+        cashflow_years = np.atleast_1d(np.asarray(cashflow_years, dtype=np.float64))
+        cashflow_amounts = np.atleast_1d(np.asarray(cashflow_amounts, dtype=np.float64))
+        cashflows_by_slice = np.bincount(self._event_index(cashflow_years), cashflow_amounts, len(self.times))
+        is_exercise = np.zeros(len(self.times), dtype=bool)
+        if exercise_years is not None:
+            is_exercise[self._event_index(exercise_years)] = True
+        ω = 1.0 if is_call else -1.0
+
+        last = int(max(np.nonzero(cashflows_by_slice)[0].max(initial=0), np.nonzero(is_exercise)[0].max(initial=0)))
+        underlying = np.full(2 * self.j_max[last] + 1, cashflows_by_slice[last])
+        option = np.zeros_like(underlying)
+        if is_exercise[last]:
+            option = np.maximum(ω * (underlying - cashflows_by_slice[last] - strike), 0.0)
+
+        for i in range(last - 1, -1, -1):
+            k, p_d, p_m, p_u = self._transition(i)
+            discount = np.exp(-self.short_rate(i) * self.dt[i])
+            underlying = discount * (p_d * underlying[k-1] + p_m * underlying[k] + p_u * underlying[k+1])
+            option = discount * (p_d * option[k-1] + p_m * option[k] + p_u * option[k+1])
+            if is_exercise[i]:
+                option = np.maximum(option, ω * (underlying - strike)) # Excludes the cash flows paid at t_i
+            underlying += cashflows_by_slice[i]
+
+        return {'underlying': underlying[0], 'option': option[0]}
+
+
+if __name__ == "__main__":
+
+    from frm.term_structures.zero_curve import ZeroCurve
+    from frm.enums.utils import CompoundingFrequency
+
+    years = np.array([0.25, 0.5, 1, 2, 3, 5, 7, 10, 15, 20, 30])
+    zero_curve = ZeroCurve(curve_date=pd.Timestamp(2024, 1, 2),
+                           data=pd.DataFrame({'years': years, 'zero_rate': 0.03 + 0.01 * (1 - np.exp(-years / 5))}),
+                           compounding_frequency=CompoundingFrequency.CONTINUOUS)
+
+    # 10y annual 4% bond, callable at par annually from year 2, with daily time steps
+    cashflow_years = np.arange(1, 11, dtype=np.float64)
+    cashflow_amounts = np.full(10, 4.0)
+    cashflow_amounts[-1] += 100.0
+    t1 = time.time()
+    tree = HullWhiteTrinomialTree(zero_curve, α=0.05, σ=0.01, event_years=cashflow_years, max_time_step=1/365)
+    result = tree.price(cashflow_years, cashflow_amounts, exercise_years=np.arange(2, 10), strike=100.0, is_call=True)
+    t2 = time.time()
+    print('Bond:', result['underlying'], 'Call:', result['option'], 'Callable bond:', result['underlying'] - result['option'])
+    print('Steps:', len(tree.dt), 'Max nodes per slice:', 2 * tree.j_max.max() + 1, 'Time:', round(t2-t1, 3), 'seconds')
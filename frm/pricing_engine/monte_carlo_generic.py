@@ -6,7 +6,8 @@ def generate_rand_nbs(nb_steps: int,
                       nb_rand_vars: int=1,
                       nb_simulations: int=None,  
                       flag_apply_antithetic_variates: bool=None,
-                      random_seed=0):
+                      random_seed=0,
+                      rng: np.random.Generator=None):
     
     """
     Generate random numbers for Monte Carlo simulations with an option to apply antithetic variates.
@@ -21,6 +22,9 @@ def generate_rand_nbs(nb_steps: int,
     nb_simulations (int, optional): The total number of simulations. Default is 100,000.
     flag_apply_antithetic_variates (bool, optional): Flag to indicate whether antithetic variates should
                                                      be applied for variance reduction. Default is True.
+    random_seed (int, optional): Seed for the global numpy random state. Ignored if `rng` is specified. Default is 0.
+    rng (np.random.Generator, optional): Generator to draw from (e.g. a spawned stream per Monte Carlo chunk).
+                                         If specified, the global numpy random state is not reseeded.
 
     Returns:
     np.array: A 2D array of random numbers. Each row corresponds to a simulation path, and each
@@ -38,7 +42,11 @@ def generate_rand_nbs(nb_steps: int,
     - The generated random numbers follow a standard normal distribution (mean 0, standard deviation 1).
     """
     
-    np.random.seed(random_seed)
+    if rng is None:
+        np.random.seed(random_seed)
+        standard_normal = lambda size: np.random.normal(0, 1, size)
+    else:
+        standard_normal = rng.standard_normal
     
     if nb_simulations is None:
         nb_simulations = 100 * 1000 
@@ -63,11 +71,11 @@ def generate_rand_nbs(nb_steps: int,
     if flag_apply_antithetic_variates:
         nb_antithetic_variate_simulations = nb_simulations // 2
         nb_normal_simulations = nb_simulations - nb_antithetic_variate_simulations
-        rand_nbs_normal = np.random.normal(0, 1, (nb_steps, nb_rand_vars, nb_normal_simulations)) # standard normal random numbers
+        rand_nbs_normal = standard_normal((nb_steps, nb_rand_vars, nb_normal_simulations)) # standard normal random numbers
         rand_nbs_antithetic_variate = -1 * rand_nbs_normal[:,:,:nb_antithetic_variate_simulations]
         rand_nbs = np.concatenate([rand_nbs_normal, rand_nbs_antithetic_variate], axis=2)
     else:    
-        rand_nbs = np.random.normal(0, 1, (nb_steps, nb_rand_vars, nb_simulations))
+        rand_nbs = standard_normal((nb_steps, nb_rand_vars, nb_simulations))
     
     return rand_nbs
 
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from typing import Callable, Optional
+import time
+
+from frm.pricing_engine.monte_carlo_statistics import merge_mean_and_m2
+
+DEFAULT_NB_SIMULATIONS_PER_CHUNK = 100 * 1000
+
+
+def get_chunk_sizes(nb_simulations: int,
+                    nb_simulations_per_chunk: int=DEFAULT_NB_SIMULATIONS_PER_CHUNK) -> np.array:
+    """
+    Split the simulations into chunks. The chunking depends only on the number of simulations and the chunk size,
+    not on the number of workers, so each chunk (and its random number stream) is the same for any worker count.
+    """
+    assert nb_simulations >= 1, nb_simulations
+    assert nb_simulations_per_chunk >= 1, nb_simulations_per_chunk
+    nb_chunks = (nb_simulations + nb_simulations_per_chunk - 1) // nb_simulations_per_chunk
+    chunk_sizes = np.full(nb_chunks, nb_simulations_per_chunk, dtype=np.int64)
+    chunk_sizes[-1] = nb_simulations - nb_simulations_per_chunk * (nb_chunks - 1)
+    return chunk_sizes
+
+
+def _monte_carlo_chunk_worker(simulate_payoff: Callable,
+                              nb_simulations: int,
+                              seed_sequence: np.random.SeedSequence,
+                              shared_memory_name: str,
+                              buffer_shape: tuple,
+                              chunk_index: int,
+                              kwargs: dict):
+    # Simulates one chunk and reduces the payoffs to (mean, M2) in the worker.
+    # Only the reduced statistics are written to the shared output buffer; the paths never leave the worker.
+    rng = np.random.default_rng(seed_sequence)
+    payoff = np.asarray(simulate_payoff(rng, nb_simulations, **kwargs), dtype=np.float64)
+    if payoff.shape[0] != nb_simulations:
+        raise ValueError(f"'simulate_payoff' must return an array with shape (nb_simulations, ...), got {payoff.shape}")
+
+    mean = payoff.mean(axis=0)
+    m2 = ((payoff - mean) ** 2).sum(axis=0)
+
+    shm = shared_memory.SharedMemory(name=shared_memory_name)
+    try:
+        buffer = np.ndarray(buffer_shape, dtype=np.float64, buffer=shm.buf)
+        buffer[chunk_index, 0] = mean
+        buffer[chunk_index, 1] = m2
+        del buffer
+    finally:
+        shm.close()
+
+
+def run_monte_carlo(simulate_payoff: Callable,
+                    nb_simulations: int,
+                    payoff_shape: tuple=(),
+                    nb_simulations_per_chunk: int=DEFAULT_NB_SIMULATIONS_PER_CHUNK,
+                    nb_workers: Optional[int]=None,
+                    random_seed: int=0,
+                    **kwargs) -> dict:
+    """
+    Run a Monte Carlo simulation in chunks over a process pool, with deterministic reduction of the results.
+
+    The simulations are split into fixed size chunks. Each chunk draws from its own random number stream, spawned from
+    np.random.SeedSequence(random_seed), and reduces its payoffs to a mean and sum of squared deviations inside the worker.
+    The reduced statistics are written to a shared memory buffer (one row per chunk) and merged in chunk order in the
+    parent process. Hence only small aggregates cross process boundaries and the result is identical for any nb_workers.
+
+    Parameters:
+    simulate_payoff (Callable): Function with signature simulate_payoff(rng, nb_simulations, **kwargs) that returns the
+                                payoffs of each simulation, shape=(nb_simulations,) + payoff_shape.
+                                Must be picklable and importable (i.e. defined at the top level of a module)
+                                if nb_workers > 1.
+    nb_simulations (int): Total number of simulations.
+    payoff_shape (tuple, optional): Shape of the payoff of one simulation, e.g. (nb of dates,). Default is () (scalar).
+    nb_simulations_per_chunk (int, optional): Number of simulations per chunk. Default is 100,000.
+    nb_workers (int, optional): Number of worker processes. Defaults to os.cpu_count(). If 1, chunks run in-process.
+    random_seed (int, optional): Seed of the root np.random.SeedSequence. Default is 0.
+    **kwargs: Passed to simulate_payoff.
+
+    Returns:
+    dict:
+        'mean' (np.array): Monte Carlo estimate of the expected payoff, shape=payoff_shape.
+        'standard_error' (np.array): Standard error of the estimate, shape=payoff_shape.
+        'nb_simulations' (int): Number of simulations.
+    """
+
+    nb_simulations = int(nb_simulations)
+    chunk_sizes = get_chunk_sizes(nb_simulations, int(nb_simulations_per_chunk))
+    nb_chunks = len(chunk_sizes)
+    seed_sequences = np.random.SeedSequence(random_seed).spawn(nb_chunks)
+
+    if nb_workers is None:
+        nb_workers = os.cpu_count()
+    nb_workers = max(1, min(int(nb_workers), nb_chunks))
+
+    buffer_shape = (nb_chunks, 2) + tuple(payoff_shape)
+    nb_bytes = int(np.prod(buffer_shape)) * np.dtype(np.float64).itemsize
+    shm = shared_memory.SharedMemory(create=True, size=max(nb_bytes, 1))
+    try:
+        args = [(simulate_payoff, int(chunk_sizes[i]), seed_sequences[i], shm.name, buffer_shape, i, kwargs)
+                for i in range(nb_chunks)]
+
+        if nb_workers == 1:
+            for arg in args:
+                _monte_carlo_chunk_worker(*arg)
+        else:
+            # Workers are started from a fork server rather than forked from this process, as forking after numba's
+            # parallel thread pool has started is not safe.
+            mp_context = multiprocessing.get_context('forkserver')
+            with ProcessPoolExecutor(max_workers=nb_workers, mp_context=mp_context) as executor:
+                futures = [executor.submit(_monte_carlo_chunk_worker, *arg) for arg in args]
+                for future in futures:
+                    future.result()
+
+        buffer = np.ndarray(buffer_shape, dtype=np.float64, buffer=shm.buf)
+        chunk_means = buffer[:, 0].copy()
+        chunk_m2s = buffer[:, 1].copy()
+        del buffer
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # Merge in chunk order so the floating point result does not depend on the scheduling of the workers
+    nb, mean, m2 = chunk_sizes[0], chunk_means[0], chunk_m2s[0]
+    for i in range(1, nb_chunks):
+        nb, mean, m2 = merge_mean_and_m2(nb, mean, m2, chunk_sizes[i], chunk_means[i], chunk_m2s[i])
+
+    variance = m2 / (nb - 1) if nb > 1 else np.full(np.shape(m2), np.nan)
+    standard_error = np.sqrt(variance / nb)
+
+    return {'mean': mean,
+            'standard_error': standard_error,
+            'nb_simulations': nb_simulations}
+
+
+def _gbm_european_call_payoff(rng, nb_simulations, S0, mu, sigma, tau, K):
+    # Example payoff function for the __main__ block
+    W = rng.standard_normal(nb_simulations)
+    S_T = S0 * np.exp((mu - 0.5 * sigma ** 2) * tau + sigma * np.sqrt(tau) * W)
+    return np.maximum(S_T - K, 0)
+
+
+if __name__ == '__main__':
+
+    for nb_workers in [1, os.cpu_count()]:
+        t1 = time.time()
+        result = run_monte_carlo(_gbm_european_call_payoff,
+                                 nb_simulations=10 * 1000 * 1000,
+                                 nb_workers=nb_workers,
+                                 S0=100, mu=0.05, sigma=0.2, tau=1.0, K=100)
+        t2 = time.time()
+        print(nb_workers, 'worker(s):', result['mean'], '+/-', result['standard_error'], round(t2-t1, 2), 'seconds')
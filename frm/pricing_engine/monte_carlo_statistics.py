@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+from numba import njit, prange
+from dataclasses import dataclass, field
+import time
+
+
+def merge_mean_and_m2(nb_a, mean_a, m2_a, nb_b, mean_b, m2_b):
+    """
+    Merge the count, mean and sum of squared deviations (M2) of two sets of samples.
+
+    References:
+    [1] Chan, T.F., Golub, G.H., LeVeque, R.J. (1979). Updating Formulae and a Pairwise Algorithm for Computing Sample Variances.
+    """
+    nb = nb_a + nb_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (nb_b / nb)
+    m2 = m2_a + m2_b + delta ** 2 * (nb_a * nb_b / nb)
+    return nb, mean, m2
+
+
+@dataclass
+class MonteCarloStatistics:
+    """
+    Streaming statistics of Monte Carlo results, updated chunk by chunk so the simulated paths don't need to be kept.
+
+    Per date, the following are tracked in O(nb_dates * nb_quantiles) memory:
+    - mean and variance (Welford/Chan updates), hence the standard error of the mean
+    - expected positive exposure (EPE) and expected negative exposure (ENE)
+    - quantiles, via the P² algorithm, hence the potential future exposure (PFE)
+
+    Usage:
+        stats = MonteCarloStatistics(nb_dates=len(dates), quantiles=(0.95, 0.99))
+        for chunk in chunks:
+            stats.update(values)  # values.shape = (nb of simulations in the chunk, nb_dates)
+        stats.potential_future_exposure
+
+    References:
+    [1] Jain, R., Chlamtac, I. (1985). The P² Algorithm for Dynamic Calculation of Quantiles and Histograms Without Storing Observations.
+    """
+    nb_dates: int
+    quantiles: tuple = (0.95,)
+
+    # Attributes set in __post_init__
+    nb_simulations: int = field(init=False)
+    mean: np.ndarray = field(init=False)
+    m2: np.ndarray = field(init=False)
+    sum_positive: np.ndarray = field(init=False)
+    sum_negative: np.ndarray = field(init=False)
+    _p2_heights: np.ndarray = field(init=False, repr=False)
+    _p2_positions: np.ndarray = field(init=False, repr=False)
+    _p2_desired_positions: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.quantiles = tuple(float(p) for p in np.atleast_1d(self.quantiles))
+        if not all(0 < p < 1 for p in self.quantiles):
+            raise ValueError(f"'quantiles' must be in (0,1): {self.quantiles}")
+
+        self.nb_simulations = 0
+        self.mean = np.zeros(self.nb_dates)
+        self.m2 = np.zeros(self.nb_dates)
+        self.sum_positive = np.zeros(self.nb_dates)
+        self.sum_negative = np.zeros(self.nb_dates)
+
+        nb_quantiles = len(self.quantiles)
+        self._p2_heights = np.zeros((self.nb_dates, nb_quantiles, 5))
+        self._p2_positions = np.tile(np.arange(5, dtype=np.float64), (self.nb_dates, nb_quantiles, 1))
+        p = np.array(self.quantiles)[:, np.newaxis]
+        desired_positions = np.hstack([0 * p, 2 * p, 4 * p, 2 + 2 * p, 0 * p + 4])
+        self._p2_desired_positions = np.tile(desired_positions, (self.nb_dates, 1, 1))
+
+    def update(self, values: np.ndarray):
+        """
+        Update the statistics with a chunk of simulation results, shape=(nb of simulations in the chunk, nb_dates).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.ndim == 1:
+            values = values[:, np.newaxis]
+        assert values.shape[1] == self.nb_dates, values.shape
+        nb = values.shape[0]
+        if nb == 0:
+            return
+
+        chunk_mean = values.mean(axis=0)
+        chunk_m2 = ((values - chunk_mean) ** 2).sum(axis=0)
+        if self.nb_simulations == 0:
+            self.mean, self.m2 = chunk_mean, chunk_m2
+        else:
+            _, self.mean, self.m2 = merge_mean_and_m2(self.nb_simulations, self.mean, self.m2, nb, chunk_mean, chunk_m2)
+
+        self.sum_positive += np.maximum(values, 0).sum(axis=0)
+        self.sum_negative += np.minimum(values, 0).sum(axis=0)
+
+        _p2_update(values,
+                   np.array(self.quantiles),
+                   self.nb_simulations,
+                   self._p2_heights,
+                   self._p2_positions,
+                   self._p2_desired_positions)
+
+        self.nb_simulations += nb
+
+    @property
+    def variance(self) -> np.ndarray:
+        if self.nb_simulations < 2:
+            return np.full(self.nb_dates, np.nan)
+        return self.m2 / (self.nb_simulations - 1)
+
+    @property
+    def standard_error(self) -> np.ndarray:
+        return np.sqrt(self.variance / self.nb_simulations)
+
+    @property
+    def expected_positive_exposure(self) -> np.ndarray:
+        return self.sum_positive / self.nb_simulations
+
+    @property
+    def expected_negative_exposure(self) -> np.ndarray:
+        return self.sum_negative / self.nb_simulations
+
+    def quantile(self) -> np.ndarray:
+        """
+        Estimated quantiles of the simulation results, shape=(nb_quantiles, nb_dates).
+        Exact (linear interpolation) while fewer than 5 simulations have been observed, the P² estimate afterwards.
+        """
+        if self.nb_simulations == 0:
+            return np.full((len(self.quantiles), self.nb_dates), np.nan)
+        elif self.nb_simulations < 5:
+            observed = self._p2_heights[:, 0, :self.nb_simulations]
+            return np.quantile(observed, self.quantiles, axis=1)
+        else:
+            return self._p2_heights[:, :, 2].T.copy()
+
+    @property
+    def potential_future_exposure(self) -> np.ndarray:
+        # Quantiles commute with the monotone max(x,0), so the PFE is the positive part of the quantile
+        return np.maximum(self.quantile(), 0)
+
+
+@njit(parallel=True, cache=True)
+def _p2_update(values, probs, nb_observed, heights, positions, desired_positions):
+    # P² marker update for each (date, quantile). Auxiliary function for MonteCarloStatistics, separated so @njit can be used.
+    # Marker positions are 0-based, i.e. the 1st observation has position 0.
+    nb_rows, nb_dates = values.shape
+    nb_quantiles = probs.shape[0]
+    for d in prange(nb_dates):
+        for j in range(nb_quantiles):
+            q = heights[d, j]
+            n = positions[d, j]
+            nd = desired_positions[d, j]
+            p = probs[j]
+            for r in range(nb_rows):
+                x = values[r, d]
+                c = nb_observed + r
+                if c < 5:
+                    # Initialisation, the first 5 observations are the marker heights
+                    q[c] = x
+                    if c == 4:
+                        q.sort()
+                    continue
+
+                if x < q[0]:
+                    q[0] = x
+                    k = 0
+                elif x >= q[4]:
+                    q[4] = x
+                    k = 3
+                else:
+                    k = 0
+                    while x >= q[k + 1]:
+                        k += 1
+
+                for i in range(k + 1, 5):
+                    n[i] += 1.0
+                nd[1] += p / 2
+                nd[2] += p
+                nd[3] += (1 + p) / 2
+                nd[4] += 1.0
+
+                for i in range(1, 4):
+                    delta = nd[i] - n[i]
+                    if (delta >= 1.0 and n[i + 1] - n[i] > 1.0) or (delta <= -1.0 and n[i - 1] - n[i] < -1.0):
+                        s = 1.0 if delta > 0 else -1.0
+                        # Piecewise-parabolic (P²) prediction
+                        q_new = q[i] + s / (n[i + 1] - n[i - 1]) * (
+                                (n[i] - n[i - 1] + s) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                                + (n[i + 1] - n[i] - s) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                        if not (q[i - 1] < q_new < q[i + 1]):
+                            # Linear prediction
+                            i_s = i + 1 if s > 0 else i - 1
+                            q_new = q[i] + s * (q[i_s] - q[i]) / (n[i_s] - n[i])
+                        q[i] = q_new
+                        n[i] += s
+
+
+if __name__ == "__main__":
+
+    nb_dates = 100
+    nb_simulations_per_chunk = 100 * 1000
+    nb_chunks = 100 # 10m simulations
+    stats = MonteCarloStatistics(nb_dates=nb_dates, quantiles=(0.95, 0.99))
+    rng = np.random.default_rng(0)
+    sqrt_t = np.sqrt(np.linspace(0.01, 10, nb_dates))
+
+    t1 = time.time()
+    for _ in range(nb_chunks):
+        exposure = rng.standard_normal((nb_simulations_per_chunk, nb_dates)) * sqrt_t
+        stats.update(exposure)
+    t2 = time.time()
+
+    print('Simulations:', stats.nb_simulations, 'Time:', round(t2-t1, 2), 'seconds')
+    print('EPE (10y):', stats.expected_positive_exposure[-1], 'vs analytical', sqrt_t[-1] / np.sqrt(2 * np.pi))
+    print('PFE 95% (10y):', stats.potential_future_exposure[0, -1], 'vs analytical', sqrt_t[-1] * 1.6448536)
@@ -26,6 +26,7 @@ from frm.term_structures.fx_volatility_surface_helpers import (clean_vol_quotes_
 from scipy.interpolate import CubicSpline, InterpolatedUnivariateSpline
 from frm.utils.daycount import year_fraction
 from frm.utils.business_day_calendar import get_busdaycal
+from frm.utils.business_day_index import get_business_day_index
 from frm.enums.utils import DayCountBasis, CompoundingFrequency
 
 import numpy as np
@@ -138,8 +139,7 @@ class FXVolatilitySurface:
         min_expiry = self.vol_smile_pillar_df['expiry_date'].min()
         max_expiry = self.vol_smile_pillar_df['expiry_date'].max()
         expiry_dates = pd.date_range(min_expiry, max_expiry, freq='d')
-        expiry_dates_np = expiry_dates.to_numpy(dtype='datetime64[D]')
-        delivery_dates = np.busday_offset(dates=expiry_dates_np, offsets=self.spot_offset, roll='following', busdaycal=self.busdaycal)
+        delivery_dates = get_business_day_index(self.busdaycal).busday_offset(expiry_dates, offsets=self.spot_offset, roll='following')
 
         expiry_years = year_fraction(self.curve_date, expiry_dates, self.day_count_basis)
 
@@ -410,7 +410,7 @@ class FXVolatilitySurface:
 
         delivery_date_grid = delivery_date_grid.unique().sort_values(ascending=True)
         delivery_date_grid = delivery_date_grid.union(self.spot_date)
-        fixing_date_grid = np.busday_offset(delivery_date_grid, offsets=-1*self.spot_offset, roll='preceding', busdaycal=self.busdaycal)
+        fixing_date_grid = get_business_day_index(self.busdaycal).busday_offset(delivery_date_grid, offsets=-1*self.spot_offset, roll='preceding')
         mask = self.vol_smile_daily_df['expiry_date'].isin(fixing_date_grid)
         vol_smile_daily_df = self.vol_smile_daily_df.loc[mask].copy()
 
@@ -469,7 +469,7 @@ class FXVolatilitySurface:
 
         delivery_date_grid = delivery_date_grid.unique().sort_values(ascending=True)
         delivery_date_grid = delivery_date_grid.union(self.spot_date)
-        fixing_date_grid = np.busday_offset(delivery_date_grid, offsets=-1*self.spot_offset, roll='preceding', busdaycal=self.busdaycal)
+        fixing_date_grid = get_business_day_index(self.busdaycal).busday_offset(delivery_date_grid, offsets=-1*self.spot_offset, roll='preceding')
         #mask = self.vol_smile_daily_df['expiry_date'].isin(fixing_date_grid)
         #vol_smile_daily_df = self.vol_smile_daily_df.loc[mask].copy()
         self._solve_vol_daily_smile_func(fixing_date_grid)
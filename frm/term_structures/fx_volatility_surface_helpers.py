@@ -12,6 +12,8 @@ import warnings
 
 from frm.utils.utilities import convert_column_to_consistent_data_type
 from frm.utils.tenor import clean_tenor, tenor_to_date_offset
+from frm.utils.day_number import to_day_number, day_number_to_datetimeindex
+from frm.utils.business_day_index import get_business_day_index
 
 
 VALID_DELTA_CONVENTIONS = ['regular_spot','regular_forward','premium_adjusted_spot','premium_adjusted_forward']
@@ -54,21 +56,21 @@ def fx_term_structure_helper(df: pd.DataFrame,
         df[column] = df[column].astype('datetime64[ns]')
 
     # Hierarchy is to use the delivery date if it is available, otherwise use the fixing date, otherwise use the tenor.
-    for i, row in df.iterrows():
-
-        if pd.notna(row['delivery_date']):
-            pass
-        elif pd.notna(row[rate_set_date_str]):
-            rate_set_date_np = row[rate_set_date_str].astype('datetime64[D]')
-            df.at[i,'delivery_date'] = np.busday_offset(rate_set_date_np, offsets=-1*spot_offset, roll='preceding',busdaycal=busdaycal)
-        elif pd.notna(row['tenor']):
-            date_offset = tenor_to_date_offset(row['tenor'])
-            rate_set_date = curve_date + date_offset
-            rate_set_date_np = rate_set_date.to_numpy().astype('datetime64[D]')
-            df.at[i,rate_set_date_str] = np.busday_offset(rate_set_date_np, offsets=0, roll='following',busdaycal=busdaycal)
-            df.at[i,'delivery_date'] = np.busday_offset(rate_set_date_np, offsets=spot_offset, roll='following',busdaycal=busdaycal)
-        else:
-            raise ValueError("'delivery_date', '{rate_set_date_str}' and 'tenor' are all missing")
+    business_day_index = get_business_day_index(busdaycal)
+    mask_rate_set_date = df['delivery_date'].isna() & df[rate_set_date_str].notna()
+    mask_tenor = df['delivery_date'].isna() & df[rate_set_date_str].isna()
+    if df.loc[mask_tenor, 'tenor'].isna().any():
+        raise ValueError("'delivery_date', '{rate_set_date_str}' and 'tenor' are all missing")
+
+    if mask_rate_set_date.any():
+        rate_set_date = to_day_number(df.loc[mask_rate_set_date, rate_set_date_str])
+        df.loc[mask_rate_set_date, 'delivery_date'] = day_number_to_datetimeindex(
+            business_day_index.offset(rate_set_date, offsets=-1*spot_offset, roll='preceding'))
+    if mask_tenor.any():
+        rate_set_date = to_day_number(pd.DatetimeIndex([curve_date + tenor_to_date_offset(tenor) for tenor in df.loc[mask_tenor, 'tenor']]))
+        df.loc[mask_tenor, rate_set_date_str] = day_number_to_datetimeindex(business_day_index.roll(rate_set_date, roll='following'))
+        df.loc[mask_tenor, 'delivery_date'] = day_number_to_datetimeindex(
+            business_day_index.offset(rate_set_date, offsets=spot_offset, roll='following'))
 
 
     if 'tenor' in df.columns:
@@ -137,14 +139,12 @@ def check_curve_date_spot_date_spot_offset_consistency(curve_date: pd.Timestamp,
 def calc_implied_spot_offset(curve_date: pd.Timestamp,
                              spot_date: pd.Timestamp,
                              busdaycal: np.busdaycalendar) -> int:
-    spot_offset = 0
-    date = curve_date
-    while date < spot_date:
-        spot_offset += 1
-        date += pd.DateOffset(days=1)
-        date_np = date.to_numpy().astype('datetime64[D]')
-        date = np.busday_offset(date_np, offsets=0, roll='following', busdaycal=busdaycal)
-    return spot_offset
+    # Each step moves to the next business day after the current date, until the spot date is reached, i.e. one more
+    # step than the business days strictly between the curve date and the spot date.
+    if spot_date <= curve_date:
+        return 0
+    business_day_index = get_business_day_index(busdaycal)
+    return int(business_day_index.count(to_day_number(curve_date) + 1, to_day_number(spot_date))[0]) + 1
 
 
 def resolve_fx_curve_dates(
@@ -164,14 +164,11 @@ def resolve_fx_curve_dates(
         # Only one of {curve_date, spot_date} are specified, get spot_offset per market convention from ccy_pair
         spot_offset = get_fx_spot_spot_offset(ccy_pair)
 
+    business_day_index = get_business_day_index(busdaycal)
     if spot_date is None:
-        curve_date_np = curve_date.to_numpy().astype('datetime64[D]')
-        spot_date = pd.Timestamp(
-            np.busday_offset(curve_date_np, offsets=spot_offset, roll='following', busdaycal=busdaycal))
+        spot_date = pd.Timestamp(business_day_index.busday_offset(curve_date, offsets=spot_offset, roll='following')[0])
     elif curve_date is None:
-        spot_date_np = spot_date.to_numpy().astype('datetime64[D]')
-        curve_date = pd.Timestamp(
-            np.busday_offset(spot_date_np, offsets=-spot_offset, roll='preceding', busdaycal=busdaycal))
+        curve_date = pd.Timestamp(business_day_index.busday_offset(spot_date, offsets=-spot_offset, roll='preceding')[0])
 
     return curve_date, spot_offset, spot_date
 
@@ -3,23 +3,30 @@ import os
 if __name__ == "__main__":
     os.chdir(os.environ.get('PROJECT_DIR_FRM')) 
         
-from frm.utils.daycount import day_count, year_fraction
+from frm.utils.daycount import year_fraction, year_fraction_from_day_number
+from frm.utils.day_number import to_day_number
+from frm.utils.business_day_index import get_business_day_index
 from frm.utils.tenor import *
 from frm.utils.utilities import convert_column_to_consistent_data_type
 from frm.enums.utils import DayCountBasis, CompoundingFrequency
 from frm.enums.term_structures import OISCouponCalcMethod, TermRate
-from frm.term_structures.zero_curve_helpers import zero_rate_from_discount_factor, discount_factor_from_zero_rate
+from frm.term_structures.zero_curve_helpers import zero_rate_from_discount_factor, discount_factor_from_zero_rate, \
+    pillar_interpolation_weights
+from frm.term_structures.zero_curve_interpolation import PiecewisePolynomial, PIECEWISE_INTERPOLATORS, pillar_support
 
 import scipy 
 import pandas as pd
 import numpy as np
 from dataclasses import dataclass, field, InitVar
+from functools import cached_property
 from typing import Optional, Union, Literal
 import matplotlib.pyplot as plt
 import datetime as dt
 from dateutil.relativedelta import relativedelta
+import warnings
 
-VALID_INTERPOLATION_METHOD = Literal['linear_on_log_of_discount_factors','cubic_spline_on_zero_rates']
+VALID_INTERPOLATION_METHOD = Literal['linear_on_log_of_discount_factors','cubic_spline_on_zero_rates',
+                                     'linear_on_zero_rates','pchip_on_zero_rates','monotone_convex']
 VALID_EXTRAPOLATION_METHOD = Literal['none','flat']
 
 
@@ -41,6 +48,11 @@ class ZeroCurve:
 
     # Attributes set in __post_init__
     cubic_spline_definition: str=field(init=False)
+    piecewise_definition: Optional[PiecewisePolynomial]=field(init=False, repr=False) # F(t) = -ln P(t), for the local interpolators
+    max_date: pd.Timestamp=field(init=False)
+    pillar_years: np.array=field(init=False, repr=False)
+    pillar_ln_discount_factor: np.array=field(init=False, repr=False)
+    version: int=field(init=False, repr=False, default=0) # incremented on each in place update of the pillars
     
     def __post_init__(self, compounding_frequency):
         
@@ -49,7 +61,7 @@ class ZeroCurve:
             raise ValueError("'compounding_frequency' must be specified zero rates specified in data")        
             
         self.__process_input_data(data, compounding_frequency)
-        self.__df_of_daily_data_setup()
+        self.__interpolation_setup()
 
     
     def __process_input_data(self, data, compounding_frequency):
@@ -82,7 +94,7 @@ class ZeroCurve:
                 data.loc[:,'tenor'] = data['tenor'].apply(clean_tenor)
                 date_offset = data['tenor'].apply(tenor_to_date_offset)
                 dates = self.curve_date + date_offset
-                data['date'] = np.busday_offset(dates.values.astype('datetime64[D]'), offsets=0, roll='following', busdaycal=self.busdaycal)
+                data['date'] = get_business_day_index(self.busdaycal).busday_offset(dates, offsets=0, roll='following')
                 __calculate_days()
                 __calculate_years()
             case 'date':
@@ -138,52 +150,133 @@ class ZeroCurve:
         self.data = data        
         
         
-    def __df_of_daily_data_setup(self):    
-        
+    def __interpolation_setup(self):
+        # The interpolation is evaluated on demand from the pillar arrays, so the setup is O(nb of pillars).
         if 'date' in self.data.columns:
-            max_date = max(self.data['date'])
+            self.max_date = max(self.data['date'])
         else:
             max_years = int(max(self.data['years']))
             max_date = self.curve_date + relativedelta(years=max_years)
             while year_fraction(self.curve_date, max_date, self.day_count_basis) < max_years:
                 max_date += dt.timedelta(days=1)
-                
-        date_range = pd.date_range(self.curve_date,max_date,freq='d')
-        days = day_count(self.curve_date, date_range, self.day_count_basis)
-        years = year_fraction(self.curve_date,date_range, self.day_count_basis)
-        
+            self.max_date = max_date
+
+        self.pillar_years = self.data['years'].to_numpy(dtype=np.float64)
+        self.pillar_ln_discount_factor = np.log(self.data['discount_factor'].to_numpy(dtype=np.float64))
+
+        self.cubic_spline_definition = None
+        self.piecewise_definition = None
         if self.interpolation_method == 'cubic_spline_on_zero_rates':
-            self.cubic_spline_definition = scipy.interpolate.splrep(x=self.data['years'].to_list(),
-                                                                    y=self.data['nacc'].to_list(), k=3)  
-            zero_rate_interpolated = scipy.interpolate.splev(years, self.cubic_spline_definition, der=0)
-            self.data_daily = pd.DataFrame({'date': date_range.to_list(), 
-                                                 'days': days,
-                                                 'years': years, 
-                                                 'nacc': zero_rate_interpolated,
-                                                 'discount_factor': np.exp(-1 * zero_rate_interpolated * years)})
-            
-        elif self.interpolation_method == 'linear_on_log_of_discount_factors':            
-            ln_df_interpolated = np.interp(x=years, xp=self.data['years'], fp= np.log(self.data['discount_factor']))
-            nacc = -1 * ln_df_interpolated / years
-            self.data_daily = pd.DataFrame({'date': date_range.to_list(),  
-                                                 'days': days,
-                                                 'years': years,
-                                                 'nacc': nacc,
-                                                 'discount_factor': np.exp(ln_df_interpolated)})        
-       
-    def flat_shift(self, 
+            self.cubic_spline_definition = scipy.interpolate.splrep(x=self.pillar_years,
+                                                                    y=self.data['nacc'].to_numpy(dtype=np.float64), k=3)
+        elif self.interpolation_method in PIECEWISE_INTERPOLATORS:
+            self.piecewise_definition = PIECEWISE_INTERPOLATORS[self.interpolation_method](
+                self.pillar_years, self.data['nacc'].to_numpy(dtype=np.float64))
+        elif self.interpolation_method != 'linear_on_log_of_discount_factors':
+            raise ValueError(f"Invalid interpolation_method {self.interpolation_method}")
+
+
+    def __interpolate(self, years: np.array) -> (np.array, np.array):
+        # Returns the continuously compounded zero rate and discount factor at years.
+        years = np.asarray(years, dtype=np.float64)
+        if self.interpolation_method == 'cubic_spline_on_zero_rates':
+            nacc = scipy.interpolate.splev(years, self.cubic_spline_definition, der=0)
+            return nacc, np.exp(-1 * nacc * years)
+        elif self.interpolation_method == 'linear_on_log_of_discount_factors':
+            ln_df_interpolated = np.interp(x=years, xp=self.pillar_years, fp=self.pillar_ln_discount_factor)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                nacc = np.where(years == 0, self.data['nacc'].iloc[0], -1 * ln_df_interpolated / years)
+            return nacc, np.exp(ln_df_interpolated)
+        else:
+            # F(t) = t z(t), so z(0) = F'(0), the instantaneous forward rate at t=0
+            F = self.piecewise_definition(years)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                nacc = np.where(years == 0, self.piecewise_definition(0.0, der=1), F / years)
+            return nacc, np.exp(-1 * F)
+
+    def update_pillar_discount_factors(self, discount_factor: np.array):
+        """
+        Update, in place, the discount factors at the pillars (excluding the t=0 pillar added for linear interpolation),
+        e.g. after a re-bootstrap on a quote update. The pillar dates are unchanged. The spline is refit, O(nb of
+        pillars), and the daily lookup arrays are rebuilt lazily on the next date lookup. The version is incremented so
+        that the objects caching values of the curve (e.g. a projection curve ZeroCurveBootstrapper) can refresh them.
+        """
+        discount_factor = np.asarray(discount_factor, dtype=np.float64)
+        rows = self.data.index[self.data['years'] > 0]
+        if discount_factor.shape != (len(rows),):
+            raise ValueError(f"'discount_factor' must have one value per pillar ({len(rows)}), got shape {discount_factor.shape}")
+        self.data.loc[rows, 'discount_factor'] = discount_factor
+        self.data.loc[rows, 'nacc'] = -1 * np.log(discount_factor) / self.data.loc[rows, 'years'].values
+        if self.interpolation_method == 'linear_on_log_of_discount_factors':
+            self.data.loc[self.data['years'] == 0, 'nacc'] = self.data.loc[rows[0], 'nacc']
+        self.__interpolation_setup()
+        self.__dict__.pop('_daily_curve', None)
+        self.version += 1
+
+    def flat_shift(self,
                    basis_points: float=1) -> 'ZeroCurve':
-        dates = list(self.data.keys())
-        years = year_fraction(self.curve_date, dates, self.day_count_basis)
-        shifted = - np.log(list(self.data.values())) / years + basis_points / 10000    
-        df_shifted_data = pd.DataFrame({'date': dates, 
-                                        'years': years, 
-                                        'discount_factor':np.exp(-shifted * years)})
-        df_shifted_data.loc[0,'discount_factor'] = 1.0 # set the discount factor on the curve date to be 1.0
-        return ZeroCurve(curve_date=self.curve_date, 
-                         data = df_shifted_data,
-                         day_count_basis = self.day_count_basis)
-                   
+        """
+        A new ZeroCurve, with the same pillars and settings, with the continuously compounded zero rates at the pillars
+        shifted by basis_points. As the interpolation is linear in the pillar values, the zero rates are shifted at all
+        the dates up to the last pillar.
+        """
+        pillars = self.data.loc[self.data['years'] > 0]
+        x_column_name = 'date' if 'date' in pillars.columns else 'years'
+        shifted_nacc = pillars['nacc'].values + basis_points / 10000
+        data = pd.DataFrame({x_column_name: pillars[x_column_name].values,
+                             'discount_factor': np.exp(-1 * shifted_nacc * pillars['years'].values)})
+        return ZeroCurve(curve_date=self.curve_date,
+                         data=data,
+                         day_count_basis=self.day_count_basis,
+                         busdaycal=self.busdaycal,
+                         interpolation_method=self.interpolation_method,
+                         extrapolation_method=self.extrapolation_method)
+
+    def discount_factor_jacobian(self,
+                                 dates: Optional[Union[pd.Timestamp, pd.Series]]=None,
+                                 days: Optional[Union[int, pd.Series]]=None,
+                                 years: Optional[Union[float, pd.Series]]=None,) -> np.array:
+        """
+        Sensitivity of the discount factors at the dates, days or years (exactly one must be specified) to the
+        continuously compounded zero rates at the pillars, dP(t)/dz_k, of shape (nb of dates, nb of pillars). The t=0
+        pillar added for linear interpolation is not a parameter of the curve and is excluded. Rows are NaN where the
+        discount factor is NaN.
+
+        Analytic for 'linear_on_log_of_discount_factors' and 'cubic_spline_on_zero_rates', which are linear in the
+        pillar values. The local interpolators are not, so their coefficients are rebuilt with each pillar bumped
+        (central differences), and only the dates within the support of the bumped pillar (see pillar_support), whose
+        pieces can change, are re-evaluated. The sensitivities outside of it are exactly zero.
+        """
+        years, _, discount_factor = self.__lookup(dates, days, years)
+        years = np.atleast_1d(years)
+        if self.interpolation_method in PIECEWISE_INTERPOLATORS:
+            interpolator = PIECEWISE_INTERPOLATORS[self.interpolation_method]
+            zero_rates = self.data['nacc'].to_numpy(dtype=np.float64)
+            knots = np.concatenate([[0.0], self.pillar_years])
+            x = np.nan_to_num(years)
+            h = 1e-6
+            ln_discount_factor_jacobian = np.zeros((len(years), len(zero_rates)))
+            for k in range(len(zero_rates)):
+                # Outside of the support of pillar k, F(t) is unchanged and the sensitivity is exactly zero
+                lower, upper = pillar_support(self.interpolation_method, k, len(zero_rates))
+                mask = (x > knots[lower]) & (x < (np.inf if upper is None else knots[upper]))
+                bump = np.zeros(len(zero_rates))
+                bump[k] = h
+                F_up = interpolator(self.pillar_years, zero_rates + bump)(x[mask])
+                F_down = interpolator(self.pillar_years, zero_rates - bump)(x[mask])
+                ln_discount_factor_jacobian[mask, k] = -1 * (F_up - F_down) / (2 * h)
+            return np.atleast_1d(discount_factor)[:, np.newaxis] * ln_discount_factor_jacobian
+
+        mask_pillar = self.pillar_years > 0
+        weights = pillar_interpolation_weights(np.nan_to_num(years), self.pillar_years, self.interpolation_method)
+        if self.interpolation_method == 'linear_on_log_of_discount_factors':
+            # ln P(t) = Σ w_k(t) ln P_k, with ln P_k = -t_k z_k
+            ln_discount_factor_jacobian = -1 * weights[:, mask_pillar] * self.pillar_years[mask_pillar]
+        else:
+            # ln P(t) = -t z(t), with z(t) = Σ w_k(t) z_k
+            ln_discount_factor_jacobian = -1 * years[:, np.newaxis] * weights[:, mask_pillar]
+        return np.atleast_1d(discount_factor)[:, np.newaxis] * ln_discount_factor_jacobian
+
     def forward_rate(self,
                      period_start: pd.DatetimeIndex,
                      period_end: pd.DatetimeIndex,
@@ -194,37 +287,33 @@ class ZeroCurve:
                     
         if forward_rate_type in {OISCouponCalcMethod.WEIGHTED_AVERAGE, OISCouponCalcMethod.SIMPLE_AVERAGE}:
             
+            # Daily simple rates over [min start, max end), reduced to prefix sums so each period average is O(1)
+            period_start = pd.DatetimeIndex(period_start)
+            period_end = pd.DatetimeIndex(period_end)
             dates = pd.date_range(start=period_start.min(), end=period_end.max(), freq='D')
-            discount_factors = self.discount_factor(dates=dates)
+            discount_factors = self.get_discount_factor(dates=dates)
             daily_interest_multiplier = discount_factors[:-1] / discount_factors[1:]
             daily_simple_interest_rate = (daily_interest_multiplier - 1) * self.day_count_basis.days_per_year
-            dates_np = dates.to_numpy(dtype='datetime64[D]')
-            busday_flag = pd.Series(np.is_busday(dates_np, busdaycal=self.busdaycal), index=dates)
-            
-            helper_data = {
-                    'date': dates[:-1],
-                    'daily_interest_multiplier': daily_interest_multiplier,
-                    'simple_daily_rate': daily_simple_interest_rate,
-                    'business_day_flag': busday_flag.values[:-1]
-                }
-            helper_df = pd.DataFrame(helper_data)
-            
-            result = np.full(period_start.shape, np.nan)
-
-            for i,(start_date,end_date) in enumerate(zip(period_start, period_end)):
-                mask = np.logical_and(helper_df['date'] >= start_date,
-                                      helper_df['date'] < end_date)
-                match forward_rate_type:
-                    case OISCouponCalcMethod.WEIGHTED_AVERAGE:
-                        result[i] = helper_df.loc[mask,'simple_daily_rate'].mean()
-                    case OISCouponCalcMethod.SIMPLE_AVERAGE:
-                        mask = np.logical_and(mask, helper_df['business_day_flag'])
-                        result[i] = helper_df.loc[mask,'simple_daily_rate'].mean()
-                        
-                    # Returns same result as ForwardRate.SIMPLE formulae
-                    # case ForwardRate.DAILY_COMPOUNDED:
-                    #     year_frac = year_fraction(start_date, end_date, self.day_count_basis)
-                    #     result[i] = (helper_df.loc[mask,'daily_interest_multiplier'].product() - 1) / year_frac
+
+            match forward_rate_type:
+                case OISCouponCalcMethod.WEIGHTED_AVERAGE:
+                    weights = np.ones(len(daily_simple_interest_rate))
+                case OISCouponCalcMethod.SIMPLE_AVERAGE:
+                    dates_np = dates.to_numpy(dtype='datetime64[D]')[:-1]
+                    weights = np.is_busday(dates_np, busdaycal=self.busdaycal).astype(np.float64)
+                    
+                # Returns same result as ForwardRate.SIMPLE formulae
+                # case ForwardRate.DAILY_COMPOUNDED:
+                #     year_frac = year_fraction(start_date, end_date, self.day_count_basis)
+                #     result[i] = (helper_df.loc[mask,'daily_interest_multiplier'].product() - 1) / year_frac
+
+            cumulative_rate = np.concatenate([[0.0], np.cumsum(weights * daily_simple_interest_rate)])
+            cumulative_count = np.concatenate([[0.0], np.cumsum(weights)])
+            idx_start = dates.searchsorted(period_start)
+            idx_end = dates.searchsorted(period_end)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                result = (cumulative_rate[idx_end] - cumulative_rate[idx_start]) \
+                         / (cumulative_count[idx_end] - cumulative_count[idx_start]) # NaN for periods without a rate
                         
             return result
         
@@ -247,20 +336,31 @@ class ZeroCurve:
         
     def instantaneous_forward_rate(self, years):        
         if self.interpolation_method == 'cubic_spline_on_zero_rates':
-            zero_rate = self.get_zero_rate(years=years)
+            zero_rate = self.get_zero_rate(compounding_frequency=CompoundingFrequency.CONTINUOUS, years=years)
             zero_rate_1st_deriv = scipy.interpolate.splev(x=years, tck=self.cubic_spline_definition, der=1) 
             return zero_rate + years * zero_rate_1st_deriv
+        elif self.interpolation_method == 'linear_on_log_of_discount_factors':
+            # The log discount factors are linear between pillars, hence the forward rate is piecewise constant.
+            # At a pillar, the forward rate of the following segment is returned.
+            pillar_years = self.data['years'].values
+            ln_df = np.log(self.data['discount_factor'].values)
+            segment_forward_rate = -1 * np.diff(ln_df) / np.diff(pillar_years)
+            idx = np.searchsorted(pillar_years, years, side='right') - 1
+            return segment_forward_rate[np.clip(idx, 0, len(segment_forward_rate) - 1)]
         else:
-            raise ValueError('only supported for cubic spline interpolation method(s)')
+            return self.piecewise_definition(years, der=1)
         
         
     def get_discount_factor(self,
                             dates: Optional[Union[pd.Timestamp, pd.Series]]=None,
                             days: Optional[Union[int, pd.Series]]=None,
-                            years: Optional[Union[float, pd.Series]]=None,) -> pd.Series:
+                            years: Optional[Union[float, pd.Series]]=None,) -> np.array:
 
-        df = self.index_daily_data(dates, days, years)
-        return df['discount_factor'].values
+        if years is not None:
+            _, _, discount_factor = self.__lookup(years=years)
+            return discount_factor
+        idx, out_of_range = self.__daily_index(dates, days)
+        return self.__take(self._daily_curve[2], idx, out_of_range)
            
         
     def get_zero_rate(self,
@@ -268,89 +368,121 @@ class ZeroCurve:
                       dates: Union[pd.Timestamp, pd.Series] = None,
                       days: Union[int, pd.Series] = None,
                       years: Union[float, pd.Series] = None,
-                      ) -> pd.Series:
-                
-        df = self.index_daily_data(dates, days, years)
+                      ) -> np.array:
+
+        if compounding_frequency == CompoundingFrequency.CONTINUOUS and years is None:
+            idx, out_of_range = self.__daily_index(dates, days)
+            return self.__take(self._daily_curve[1], idx, out_of_range)
 
+        years, nacc, discount_factor = self.__lookup(dates, days, years)
         if compounding_frequency == CompoundingFrequency.CONTINUOUS:
-            return df['nacc'].values
+            return nacc
         else:
-            zero_rate = zero_rate_from_discount_factor(years=df['years'],
-                                                       discount_factor=df['discount_factor'],
+            zero_rate = zero_rate_from_discount_factor(years=years,
+                                                       discount_factor=discount_factor,
                                                        compounding_frequency=compounding_frequency)
             return zero_rate
         
         
-    def index_daily_data(self, 
-                  dates: Optional[Union[pd.Timestamp, pd.Series]]=None,
-                  days: Optional[Union[int, pd.Series]]=None,
-                  years: Optional[Union[float, pd.Series]]=None,) -> pd.DataFrame:
-        
+    def interpolate(self,
+                    dates: Optional[Union[pd.Timestamp, pd.Series]]=None,
+                    days: Optional[Union[int, pd.Series]]=None,
+                    years: Optional[Union[float, pd.Series]]=None,) -> pd.DataFrame:
+        """
+        Interpolate the curve at the dates, days or years (exactly one must be specified), in the input order.
+        Dates outside [curve_date, max_date] are NaN, or set to the bound if extrapolation_method is 'flat'.
+        """
+        if years is not None:
+            years, nacc, discount_factor = self.__lookup(years=years)
+            return pd.DataFrame({'years': years, 'nacc': nacc, 'discount_factor': discount_factor})
+        else:
+            idx, out_of_range = self.__daily_index(dates, days)
+            dates = pd.DatetimeIndex(np.datetime64(self.curve_date.date(), 'D') + idx)
+            df = pd.DataFrame({'date': dates,
+                               'days': idx,
+                               'years': self._daily_curve[0][idx],
+                               'nacc': self._daily_curve[1][idx],
+                               'discount_factor': self._daily_curve[2][idx]})
+            if out_of_range is not None:
+                df.loc[out_of_range, :] = np.nan
+            return df
+
+
+    @cached_property
+    def _daily_years(self) -> np.array:
+        # Year fraction for each day from the curve date to the max date. Independent of the discount factors, so it
+        # is kept when the pillars are updated.
+        curve_day_number = to_day_number(self.curve_date)
+        nb_days = to_day_number(self.max_date)[0] - curve_day_number[0]
+        day_number = curve_day_number + np.arange(nb_days + 1, dtype=np.int32)
+        return np.ascontiguousarray(year_fraction_from_day_number(curve_day_number, day_number, self.day_count_basis), dtype=np.float64)
+
+
+    @cached_property
+    def _daily_curve(self) -> (np.array, np.array, np.array):
+        # Years, zero rate (nacc) & discount factor for each day from the curve date to the max date, as contiguous
+        # float64 arrays indexed by the day offset. Built on the first date lookup, it is O(nb of days) only once.
+        years = self._daily_years
+        nacc, discount_factor = self.__interpolate(years)
+        return years, np.ascontiguousarray(nacc), np.ascontiguousarray(discount_factor)
+
+
+    def __daily_index(self, dates=None, days=None) -> (np.array, Optional[np.array]):
+        # Index into the _daily_curve arrays (the int64 day offset from the curve date, clipped to the available data)
+        # and the mask of the dates to set to NaN (None if there are none). One warning is emitted for all the dates
+        # outside the available data.
+        if (dates is None) == (days is None):
+            raise ValueError('Only one input among days, date, or years is allowed.')
+        if days is not None:
+            day_offsets = np.atleast_1d(np.asarray(days)).astype(np.int64)
+        else:
+            day_offsets = to_day_number(dates).astype(np.int64) - to_day_number(self.curve_date)[0]
+
+        max_offset = len(self._daily_curve[0]) - 1
+        below_range = day_offsets < 0
+        above_range = day_offsets > max_offset
+        nb_below, nb_above = below_range.sum(), above_range.sum()
+        if nb_below == 0 and nb_above == 0:
+            return day_offsets, None
+
+        if self.extrapolation_method == 'none':
+            msg = f"NaN will be returned as 'extrapolation_method' is {self.extrapolation_method}"
+        elif self.extrapolation_method == 'flat':
+            msg = f"Flat extrapolation will be applied as 'extrapolation_method' is {self.extrapolation_method}"
+        warnings.warn(f"{nb_below} date(s) below the min available data of {self.curve_date.strftime('%Y-%m-%d')} "
+                      f"and {nb_above} date(s) above the max available data of {self.max_date.strftime('%Y-%m-%d')}. " + msg)
+        idx = np.clip(day_offsets, 0, max_offset)
+        return idx, (below_range | above_range) if self.extrapolation_method == 'none' else None
+
+
+    @staticmethod
+    def __take(values: np.array, idx: np.array, out_of_range: Optional[np.array]) -> np.array:
+        result = values[idx]
+        if out_of_range is not None:
+            result[out_of_range] = np.nan
+        return result
+
+
+    def __lookup(self, dates=None, days=None, years=None) -> (np.array, np.array, np.array):
+        # Years, zero rate (nacc) & discount factor at the dates, days or years, in the input order.
         inputs = {'dates': dates, 'days': days, 'years': years}
         if sum(x is not None for x in inputs.values()) != 1:
-            raise ValueError('Only one input among days, date, or years is allowed.')            
-        
+            raise ValueError('Only one input among days, date, or years is allowed.')
+
         if years is not None:
-            if self.interpolation_method == 'cubic_spline_on_zero_rates':
-                nacc = scipy.interpolate.splev(years, self.cubic_spline_definition, der=0)
-                discount_factor = np.exp(-1 * nacc * years)
-                df = pd.DataFrame({'years': years,'nacc': nacc,'discount_factor': discount_factor})
-                return df
-                
-            elif self.interpolation_method == 'linear_on_log_of_discount_factors':
-                ln_df_interpolated = np.interp(x=years, xp=self.data['years'], fp= np.log(self.data['discount_factor']))
-                nacc = -1 * ln_df_interpolated / years
-                discount_factor = np.exp(ln_df_interpolated)
-                df = pd.DataFrame({'years': years,'nacc': nacc,'discount_factor': discount_factor})
-                return df
-        else:
-            if days is not None:
-                dates = self.curve_date + dt.timedelta(days=days)
-            if type(dates) is pd.Timestamp: 
-                dates = pd.Series([dates])
-                
-            # Message suffix if any dates are outside the available data
-            if self.extrapolation_method == 'none':    
-                msg = f". NaN will be returned as 'extrapolation_method' is {self.extrapolation_method}"
-            elif self.extrapolation_method == 'flat':
-                msg = f". Flat extropolation will be applied as 'extrapolation_method' is {self.extrapolation_method}"          
-            
-            # Check if any of the dates are outside the available data
-            min_date = self.data_daily['date'].min()
-            below_range = dates < min_date
-            dates_below = []
-            if any(below_range):
-                bound_date = self.data_daily['date'].min()
-                for i,date in enumerate(dates[below_range]):
-                    print('Date', date.strftime('%Y-%m-%d'), 'is below the min available data of ' + bound_date.strftime('%Y-%m-%d') + msg)
-                    if self.extrapolation_method == 'none':    
-                        dates_below.append(np.nan)
-                    elif self.extrapolation_method == 'flat':    
-                        dates_below.append(bound_date)
-            
-            max_date = self.data_daily['date'].max()
-            above_range = dates > max_date
-            dates_above = []
-            if any(above_range):
-                bound_date = self.data_daily['date'].max()
-                for i,date in enumerate(dates[above_range]):
-                    print('Date', date.strftime('%Y-%m-%d'), 'is above the max available data of ' + bound_date.strftime('%Y-%m-%d') + msg)
-                    if self.extrapolation_method == 'none':    
-                        dates_above.append(np.nan)
-                    elif self.extrapolation_method == 'flat':    
-                        dates_above.append(bound_date)
-          
-            in_range = np.logical_and(np.logical_not(below_range),np.logical_not(above_range))
-            cleaned_dates = dates_below + list(dates[in_range].values) + dates_above
-            df = pd.merge(pd.DataFrame(data=cleaned_dates, columns=['date']), self.data_daily, left_on='date',right_on='date', how='left')
-            return df    
+            years = np.asarray(years, dtype=np.float64)
+            nacc, discount_factor = self.__interpolate(years)
+            return years, nacc, discount_factor
+
+        idx, out_of_range = self.__daily_index(dates, days)
+        return tuple(self.__take(values, idx, out_of_range) for values in self._daily_curve)
 
        
     def plot(self, forward_rate_terms=[90]):
             
         # Zero rates
-        min_date = self.data_daily['date'].iloc[1]
-        max_date = self.data_daily['date'].iloc[-1]
+        min_date = self.curve_date + dt.timedelta(days=1)
+        max_date = self.max_date
         date_range = pd.date_range(min_date,max_date,freq='d')
         years_zr = year_fraction(self.curve_date, date_range, self.day_count_basis)
         zero_rates = pd.Series(self.get_zero_rate(compounding_frequency=CompoundingFrequency.CONTINUOUS, dates=date_range)) * 100
@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import List, Optional, Union
+import time
+
+from frm.enums.utils import DayCountBasis, PeriodFrequency, RollConvention, TimingConvention
+from frm.utils.daycount import year_fraction
+from frm.utils.schedule import get_schedule, get_payment_dates
+from frm.term_structures.zero_curve import ZeroCurve
+from frm.term_structures.zero_curve_helpers import pillar_interpolation_weights
+
+VALID_SOLVE_METHODS = ['newton', 'sequential']
+
+
+@dataclass
+class Deposit:
+    """Deposit paying rate * year_fraction at maturity. Also used for the index fixing on the projection curve."""
+    effective_date: pd.Timestamp
+    maturity_date: pd.Timestamp
+    rate: float
+    day_count_basis: DayCountBasis=DayCountBasis.ACT_360
+
+    @property
+    def quote(self) -> float:
+        return self.rate
+
+    def quote_to_rate(self, quote):
+        return quote
+
+    def cashflows(self) -> dict:
+        τ = year_fraction(self.effective_date, self.maturity_date, self.day_count_basis)
+        return _cashflows(fixed_pay=[self.maturity_date], fixed_accrual=[τ],
+                          float_start=[self.effective_date], float_end=[self.maturity_date], float_pay=[self.maturity_date])
+
+
+@dataclass
+class ForwardRateAgreement(Deposit):
+    """FRA on the simple forward rate over [effective_date, maturity_date]."""
+
+
+@dataclass
+class InterestRateFuture:
+    """Interest rate future on the simple forward rate over [effective_date, maturity_date], quoted as 100 - rate (%)."""
+    effective_date: pd.Timestamp
+    maturity_date: pd.Timestamp
+    price: float
+    day_count_basis: DayCountBasis=DayCountBasis.ACT_360
+    convexity_adjustment: float=0.0 # Futures rate less forward rate
+
+    @property
+    def quote(self) -> float:
+        return self.price
+
+    def quote_to_rate(self, quote):
+        return (100.0 - quote) / 100.0 - self.convexity_adjustment
+
+    def cashflows(self) -> dict:
+        τ = year_fraction(self.effective_date, self.maturity_date, self.day_count_basis)
+        return _cashflows(fixed_pay=[self.maturity_date], fixed_accrual=[τ],
+                          float_start=[self.effective_date], float_end=[self.maturity_date], float_pay=[self.maturity_date])
+
+
+@dataclass
+class InterestRateSwap:
+    """Par fixed vs float (term rate) swap. The fixed & float schedules are built as in SwapLeg."""
+    effective_date: pd.Timestamp
+    maturity_date: pd.Timestamp
+    fixed_rate: float
+    fixed_frequency: PeriodFrequency=PeriodFrequency.SEMIANNUAL
+    float_frequency: PeriodFrequency=PeriodFrequency.QUARTERLY
+    fixed_day_count_basis: DayCountBasis=DayCountBasis._30_360
+    roll_convention: RollConvention=RollConvention.MODIFIED_FOLLOWING
+    payment_delay: int=0
+    busdaycal: np.busdaycalendar=field(default_factory=np.busdaycalendar)
+
+    @property
+    def quote(self) -> float:
+        return self.fixed_rate
+
+    def quote_to_rate(self, quote):
+        return quote
+
+    def cashflows(self) -> dict:
+        fixed = _leg_schedule(self.effective_date, self.maturity_date, self.fixed_frequency, self.roll_convention,
+                              self.payment_delay, self.busdaycal)
+        float_ = _leg_schedule(self.effective_date, self.maturity_date, self.float_frequency, self.roll_convention,
+                               self.payment_delay, self.busdaycal)
+        return _cashflows(fixed_pay=fixed['payment_date'],
+                          fixed_accrual=year_fraction(fixed['period_start'], fixed['period_end'], self.fixed_day_count_basis),
+                          float_start=float_['period_start'], float_end=float_['period_end'], float_pay=float_['payment_date'])
+
+
+@dataclass
+class OISSwap:
+    """Par fixed vs daily compounded overnight rate swap, with the same fixed & float schedules."""
+    effective_date: pd.Timestamp
+    maturity_date: pd.Timestamp
+    fixed_rate: float
+    frequency: PeriodFrequency=PeriodFrequency.ANNUAL
+    day_count_basis: DayCountBasis=DayCountBasis.ACT_360
+    roll_convention: RollConvention=RollConvention.MODIFIED_FOLLOWING
+    payment_delay: int=0
+    busdaycal: np.busdaycalendar=field(default_factory=np.busdaycalendar)
+
+    @property
+    def quote(self) -> float:
+        return self.fixed_rate
+
+    def quote_to_rate(self, quote):
+        return quote
+
+    def cashflows(self) -> dict:
+        schedule = _leg_schedule(self.effective_date, self.maturity_date, self.frequency, self.roll_convention,
+                                 self.payment_delay, self.busdaycal)
+        return _cashflows(fixed_pay=schedule['payment_date'],
+                          fixed_accrual=year_fraction(schedule['period_start'], schedule['period_end'], self.day_count_basis),
+                          float_start=schedule['period_start'], float_end=schedule['period_end'],
+                          float_pay=schedule['payment_date'])
+
+
+def _leg_schedule(effective_date, maturity_date, frequency, roll_convention, payment_delay, busdaycal) -> pd.DataFrame:
+    schedule = get_schedule(start_date=effective_date, end_date=maturity_date, frequency=frequency,
+                            roll_convention=roll_convention, busdaycal=busdaycal)
+    schedule['payment_date'] = get_payment_dates(schedule=schedule, payment_delay=payment_delay,
+                                                 roll_convention=roll_convention,
+                                                 payment_timing=TimingConvention.IN_ARREARS, busdaycal=busdaycal)
+    return schedule
+
+
+def _cashflows(fixed_pay, fixed_accrual, float_start, float_end, float_pay) -> dict:
+    # The instrument is priced at par: rate * Σ τ_i P_d(fixed_pay_i) = Σ_j (P_p(float_start_j) / P_p(float_end_j) - 1) P_d(float_pay_j)
+    # where P_p and P_d are the projection and discount curves. Single period instruments have one fixed & float period.
+    return {'fixed_pay': pd.DatetimeIndex(fixed_pay),
+            'fixed_accrual': np.atleast_1d(np.asarray(fixed_accrual, dtype=np.float64)),
+            'float_start': pd.DatetimeIndex(float_start),
+            'float_end': pd.DatetimeIndex(float_end),
+            'float_pay': pd.DatetimeIndex(float_pay)}
+
+
+BootstrapInstrument = Union[Deposit, ForwardRateAgreement, InterestRateFuture, InterestRateSwap, OISSwap]
+
+
+@dataclass
+class ZeroCurveBootstrapper:
+    """
+    Bootstrap a ZeroCurve from par instrument quotes, with one pillar at the last date of each instrument.
+
+    The instrument schedules are compiled once into flat arrays indexing the unique cash flow dates. For both
+    interpolation methods, the log discount factors at these dates are linear in the pillar parameters θ
+    (the log discount factors for 'linear_on_log_of_discount_factors', the continuously compounded zero rates for
+    'cubic_spline_on_zero_rates' as the spline is linear in its knot values), ln P(dates) = M θ. The par conditions
+    and their analytic Jacobian are then evaluated with a few vectorised operations, so a bootstrap() on new quotes
+    is a handful of Newton iterations on arrays.
+
+    With a discount_curve, the curve is a projection curve (dual-curve): the fixed & float legs are discounted on the
+    discount_curve and the float rates are projected on the bootstrapped curve. Otherwise the curve is both. The
+    discount factors of the discount_curve are cached, and re-read on the next solve if it is updated in place.
+
+    Parameters:
+    curve_date (pd.Timestamp): Curve date.
+    instruments (list): Deposit, ForwardRateAgreement, InterestRateFuture, InterestRateSwap and OISSwap instruments,
+                        with distinct last dates.
+    discount_curve (ZeroCurve, optional): Discount curve if the bootstrapped curve is a projection curve.
+    day_count_basis (DayCountBasis, optional): Day count basis of the bootstrapped ZeroCurve.
+    interpolation_method (str, optional): Interpolation method of the bootstrapped ZeroCurve.
+                                          Default is 'linear_on_log_of_discount_factors'.
+    solve_method (str, optional): 'newton' solves all pillars simultaneously. 'sequential' solves the pillars one at a
+                                  time in maturity order, which requires the local interpolation
+                                  'linear_on_log_of_discount_factors'. Default is 'newton'.
+    busdaycal (np.busdaycalendar, optional): Business day calendar of the bootstrapped ZeroCurve.
+    """
+    curve_date: pd.Timestamp
+    instruments: List[BootstrapInstrument]
+    discount_curve: Optional[ZeroCurve]=None
+    day_count_basis: DayCountBasis=DayCountBasis.ACT_ACT
+    interpolation_method: str='linear_on_log_of_discount_factors'
+    solve_method: str='newton'
+    busdaycal: np.busdaycalendar=field(default_factory=np.busdaycalendar)
+    tolerance: float=1e-14
+    max_iterations: int=50
+
+    # Attributes set in __post_init__ and bootstrap()
+    pillar_dates: pd.DatetimeIndex=field(init=False, repr=False)
+    pillar_years: np.array=field(init=False, repr=False)
+    θ: np.array=field(init=False, repr=False)
+    jacobian: np.array=field(init=False, repr=False)
+    quotes: np.array=field(init=False, repr=False)
+    curve: Optional[ZeroCurve]=field(init=False, repr=False, default=None)
+
+    def __post_init__(self):
+        if self.solve_method not in VALID_SOLVE_METHODS:
+            raise ValueError(f"'solve_method' must be one of {VALID_SOLVE_METHODS}, got {self.solve_method}")
+        if self.interpolation_method not in {'linear_on_log_of_discount_factors', 'cubic_spline_on_zero_rates'}:
+            raise ValueError(f"Interpolation method {self.interpolation_method} is not supported, the bootstrap requires "
+                             f"an interpolation linear in the pillar values")
+        if self.solve_method == 'sequential' and self.interpolation_method != 'linear_on_log_of_discount_factors':
+            raise ValueError("The 'sequential' solve method requires 'linear_on_log_of_discount_factors' interpolation")
+        if self.interpolation_method == 'cubic_spline_on_zero_rates' and len(self.instruments) < 4:
+            raise ValueError("At least 4 instruments are required for 'cubic_spline_on_zero_rates' interpolation")
+        self.__compile()
+        self.θ = self.__initial_guess()
+
+    def __compile(self):
+        # Flatten the cash flows of all the instruments into arrays indexing the sorted unique dates
+        cashflows = [instrument.cashflows() for instrument in self.instruments]
+        all_dates = [d for cf in cashflows for d in (cf['fixed_pay'], cf['float_start'], cf['float_end'], cf['float_pay'])]
+        dates = pd.DatetimeIndex(np.unique(np.concatenate([d.values for d in all_dates])))
+        if (dates < self.curve_date).any():
+            raise ValueError("The instrument dates must be on or after the curve date")
+
+        nb_fixed = [len(cf['fixed_pay']) for cf in cashflows]
+        nb_float = [len(cf['float_start']) for cf in cashflows]
+        self._fixed_instrument = np.repeat(np.arange(len(cashflows)), nb_fixed)
+        self._float_instrument = np.repeat(np.arange(len(cashflows)), nb_float)
+        self._fixed_accrual = np.concatenate([cf['fixed_accrual'] for cf in cashflows])
+        index = lambda key: dates.searchsorted(np.concatenate([cf[key].values for cf in cashflows]))
+        self._fixed_pay, self._float_start, self._float_end, self._float_pay = \
+            index('fixed_pay'), index('float_start'), index('float_end'), index('float_pay')
+
+        # One pillar at the last date of each instrument
+        last_date_index = np.array([dates.searchsorted(max(d.max() for d in (cf['fixed_pay'], cf['float_end'], cf['float_pay'])))
+                                    for cf in cashflows])
+        if len(np.unique(last_date_index)) != len(last_date_index):
+            raise ValueError("The instruments must have distinct last dates, one pillar is solved per instrument")
+        self._order = np.argsort(last_date_index) # Instrument solved for each pillar
+        self._pillar_position = np.argsort(self._order) # Pillar of each instrument
+        self.pillar_dates = dates[last_date_index[self._order]]
+
+        years = np.atleast_1d(year_fraction(self.curve_date, dates, self.day_count_basis)).astype(np.float64)
+        self.pillar_years = years[last_date_index[self._order]]
+        self._dates = dates
+        self._M = self.__interpolation_matrix(years)
+
+        self._discount_curve_version = None
+        self.__refresh_discount_factors()
+
+    def __refresh_discount_factors(self) -> bool:
+        # Re-read the discount factors at the cash flow dates if the discount_curve was updated in place since they were
+        # last read (see ZeroCurve.update_pillar_discount_factors()). Returns True if they were refreshed.
+        if self.discount_curve is None or self.discount_curve.version == self._discount_curve_version:
+            return False
+        self._discount_factor = self.discount_curve.get_discount_factor(dates=self._dates)
+        self._discount_curve_version = self.discount_curve.version
+        return True
+
+    def __interpolation_matrix(self, years: np.array) -> np.array:
+        # M such that ln P(years) = M θ
+        if self.interpolation_method == 'linear_on_log_of_discount_factors':
+            # Linear between (0, 0) and the pillars, θ_0 = ln P(0) = 0
+            return pillar_interpolation_weights(years, np.concatenate([[0.0], self.pillar_years]), self.interpolation_method)[:, 1:]
+        else:
+            # ln P(t) = -t z(t) where the spline z(t) is linear in the zero rates at the pillars
+            return -years[:, np.newaxis] * pillar_interpolation_weights(years, self.pillar_years, self.interpolation_method)
+
+    def __initial_guess(self, flat_rate: float=0.03) -> np.array:
+        if self.interpolation_method == 'linear_on_log_of_discount_factors':
+            return -flat_rate * self.pillar_years
+        else:
+            return np.full(len(self.pillar_years), flat_rate)
+
+    def residuals_and_jacobian(self, θ: np.array, rates: np.array) -> (np.array, np.array):
+        """
+        Par residuals (fixed leg less float leg PV per unit notional) of the instruments, in pillar order, and their
+        Jacobian with respect to the pillar parameters θ.
+        """
+        ln_P = self._M @ θ
+        P = np.exp(ln_P)
+        P_d = P if self.discount_curve is None else self._discount_factor
+        nb = len(self.instruments)
+        nb_dates = len(self._dates)
+
+        fixed_pv = rates[self._fixed_instrument] * self._fixed_accrual * P_d[self._fixed_pay]
+        ratio = P[self._float_start] / P[self._float_end]
+        float_pv = (ratio - 1.0) * P_d[self._float_pay]
+        residuals = np.bincount(self._fixed_instrument, fixed_pv, nb) - np.bincount(self._float_instrument, float_pv, nb)
+
+        # d residuals / d ln P(dates), accumulated on the flattened (instrument, date) index
+        rows = [self._float_instrument, self._float_instrument]
+        cols = [self._float_start, self._float_end]
+        weights = [-ratio * P_d[self._float_pay], ratio * P_d[self._float_pay]]
+        if self.discount_curve is None:
+            rows += [self._fixed_instrument, self._float_instrument]
+            cols += [self._fixed_pay, self._float_pay]
+            weights += [fixed_pv, -float_pv]
+        flat_index = np.concatenate(rows) * nb_dates + np.concatenate(cols)
+        jacobian_dates = np.bincount(flat_index, np.concatenate(weights), nb * nb_dates).reshape(nb, nb_dates)
+
+        return residuals[self._order], (jacobian_dates @ self._M)[self._order]
+
+    def rate_jacobian(self) -> np.array:
+        """
+        Sensitivity of the continuously compounded zero rates at the pillars to the instruments' par rates (the quotes
+        in rate terms, e.g. (100 - price) / 100 less the convexity adjustment for futures), of shape
+        (nb of pillars, nb of instruments) with the instruments in input order. bootstrap() must have been called first.
+
+        At the solution the par residuals R(θ, rates) are 0, so dθ/drates = -J⁻¹ dR/drates (implicit function theorem),
+        where dR_i/drate_i is the fixed leg annuity of instrument i. No re-bootstrap is required. The discount_curve,
+        if any, is held fixed at its values at the last bootstrap() or update_quote().
+        """
+        if self.curve is None:
+            raise ValueError("bootstrap() must be called before rate_jacobian()")
+        P_d = np.exp(self._M @ self.θ) if self.discount_curve is None else self._discount_factor
+        annuity = np.bincount(self._fixed_instrument, self._fixed_accrual * P_d[self._fixed_pay], len(self.instruments))
+        dθ_drates = np.linalg.solve(self.jacobian, -1 * np.diag(annuity[self._order]))[:, self._pillar_position]
+        if self.interpolation_method == 'linear_on_log_of_discount_factors':
+            return -1 * dθ_drates / self.pillar_years[:, np.newaxis] # θ = ln P = -t z
+        else:
+            return dθ_drates
+
+    def bootstrap(self, quotes: Optional[np.array]=None) -> ZeroCurve:
+        """
+        Solve the pillars for the instrument quotes (in the order of the instruments; default is each instrument's
+        quote) and return a new ZeroCurve, also stored as self.curve. The previous solution is the initial guess, so
+        re-bootstrapping after small quote changes converges in a couple of iterations.
+        """
+        if quotes is None:
+            quotes = [instrument.quote for instrument in self.instruments]
+        quotes = np.array(quotes, dtype=np.float64)
+        if quotes.shape != (len(self.instruments),):
+            raise ValueError(f"'quotes' must have one value per instrument, got shape {quotes.shape}")
+        self.quotes = quotes
+        self._rates = np.array([instrument.quote_to_rate(q) for instrument, q in zip(self.instruments, quotes)])
+        self.__refresh_discount_factors()
+        self.__solve(first_pillar=0)
+        self.curve = self.zero_curve()
+        return self.curve
+
+    def update_quote(self, instrument_index: Union[int, np.array], quote: Union[float, np.array]) -> ZeroCurve:
+        """
+        Update the quote(s) of the instrument(s) at instrument_index and re-solve incrementally, updating self.curve in
+        place (see ZeroCurve.update_pillar_discount_factors()). bootstrap() must have been called first.
+
+        The compiled schedules are reused. With 'linear_on_log_of_discount_factors' interpolation an instrument only
+        depends on the pillars up to its own, so only the pillars at and beyond the first changed instrument's pillar
+        are re-solved. The spline interpolation is not local, so all the pillars are re-solved. If the discount_curve
+        was updated in place since the last solve (e.g. by update_quote() on its own bootstrapper), its discount
+        factors are re-read and all the pillars are re-solved.
+        """
+        if self.curve is None:
+            raise ValueError("bootstrap() must be called before update_quote()")
+        instrument_index = np.atleast_1d(instrument_index)
+        quote = np.broadcast_to(np.asarray(quote, dtype=np.float64), instrument_index.shape)
+        for i, q in zip(instrument_index, quote):
+            self.quotes[i] = q
+            self._rates[i] = self.instruments[i].quote_to_rate(q)
+
+        discount_curve_updated = self.__refresh_discount_factors()
+        if self.interpolation_method == 'linear_on_log_of_discount_factors' and not discount_curve_updated:
+            first_pillar = int(self._pillar_position[instrument_index].min())
+        else:
+            first_pillar = 0
+        self.__solve(first_pillar)
+        self.curve.update_pillar_discount_factors(self.__pillar_discount_factors())
+        return self.curve
+
+    def __solve(self, first_pillar: int):
+        # Solve θ[first_pillar:] with θ[:first_pillar] fixed, starting from the current solution
+        θ = self.θ.copy()
+        k = first_pillar
+        if self.solve_method == 'newton':
+            for _ in range(self.max_iterations):
+                residuals, jacobian = self.residuals_and_jacobian(θ, self._rates)
+                if np.abs(residuals[k:]).max() < self.tolerance:
+                    break
+                θ[k:] -= np.linalg.solve(jacobian[k:, k:], residuals[k:])
+            else:
+                raise RuntimeError(f"The bootstrap did not converge in {self.max_iterations} iterations, "
+                                   f"max abs residual {np.abs(residuals[k:]).max()}")
+
+        elif self.solve_method == 'sequential':
+            # Pillar k only affects instruments k, k+1, ... as the interpolation is local, so each pillar is a 1D solve
+            for k in range(first_pillar, len(θ)):
+                for _ in range(self.max_iterations):
+                    residuals, jacobian = self.residuals_and_jacobian(θ, self._rates)
+                    if abs(residuals[k]) < self.tolerance:
+                        break
+                    θ[k] -= residuals[k] / jacobian[k, k]
+                else:
+                    raise RuntimeError(f"The bootstrap did not converge in {self.max_iterations} iterations "
+                                       f"for the pillar {self.pillar_dates[k].date()}")
+            residuals, jacobian = self.residuals_and_jacobian(θ, self._rates)
+
+        self.θ = θ
+        self.jacobian = jacobian
+
+    def __pillar_discount_factors(self) -> np.array:
+        if self.interpolation_method == 'linear_on_log_of_discount_factors':
+            return np.exp(self.θ)
+        else:
+            return np.exp(-self.θ * self.pillar_years)
+
+    def zero_curve(self) -> ZeroCurve:
+        """A new ZeroCurve of the current solution."""
+        return ZeroCurve(curve_date=self.curve_date,
+                         data=pd.DataFrame({'date': self.pillar_dates, 'discount_factor': self.__pillar_discount_factors()}),
+                         day_count_basis=self.day_count_basis,
+                         busdaycal=self.busdaycal,
+                         interpolation_method=self.interpolation_method)
+
+
+if __name__ == "__main__":
+
+    curve_date = pd.Timestamp(2024, 6, 3)
+    spot_date = pd.Timestamp(2024, 6, 5)
+
+    # OIS discount curve from the overnight deposit and OIS swaps
+    ois_instruments = [Deposit(curve_date, pd.Timestamp(2024, 6, 4), 0.0530)] \
+        + [OISSwap(spot_date, spot_date + pd.DateOffset(months=m), 0.0530 - 0.0004 * m ** 0.5) for m in [1, 3, 6, 9]] \
+        + [OISSwap(spot_date, spot_date + pd.DateOffset(years=y), 0.0500 - 0.0010 * y ** 0.5) for y in range(1, 31)]
+
+    t1 = time.time()
+    ois_bootstrapper = ZeroCurveBootstrapper(curve_date, ois_instruments)
+    t2 = time.time()
+    ois_curve = ois_bootstrapper.bootstrap()
+    t3 = time.time()
+    print('OIS curve:', len(ois_instruments), 'instruments. Compile:', round(t2-t1, 3), 's. Bootstrap:', round(t3-t2, 4), 's')
+
+    # 3M term rate projection curve from the 3M deposit, FRAs and swaps, discounted on the OIS curve
+    projection_instruments = [Deposit(spot_date, spot_date + pd.DateOffset(months=3), 0.0560)] \
+        + [ForwardRateAgreement(spot_date + pd.DateOffset(months=m), spot_date + pd.DateOffset(months=m+3), 0.0555 - 0.0005 * m) for m in [3, 6, 9]] \
+        + [InterestRateSwap(spot_date, spot_date + pd.DateOffset(years=y), 0.0520 - 0.0010 * y ** 0.5) for y in range(2, 31)]
+    projection_bootstrapper = ZeroCurveBootstrapper(curve_date, projection_instruments, discount_curve=ois_curve)
+
+    quotes = np.array([instrument.quote for instrument in projection_instruments])
+    t1 = time.time()
+    for i in range(100):
+        projection_curve = projection_bootstrapper.bootstrap(quotes + 1e-5 * np.sin(i))
+    t2 = time.time()
+    print('Projection curve:', len(projection_instruments), 'instruments. Mean re-bootstrap time:', round((t2-t1)/100, 4), 's')
+
+    # Tick by tick updates of the 10y swap quote, updating the projection curve in place
+    i = 12
+    t1 = time.time()
+    for tick in range(100):
+        projection_bootstrapper.update_quote(i, quotes[i] + 1e-5 * np.sin(tick))
+        projection_curve.get_discount_factor(dates=pd.DatetimeIndex([spot_date + pd.DateOffset(years=10)]))
+    t2 = time.time()
+    print('Mean incremental update time:', round((t2-t1)/100, 4), 's')
@@ -4,6 +4,7 @@ if __name__ == "__main__":
     os.chdir(os.environ.get('PROJECT_DIR_FRM')) 
         
 import numpy as np
+import scipy
 from frm.enums.utils import CompoundingFrequency
 
 
@@ -47,18 +48,33 @@ def discount_factor_from_zero_rate(
         return 1.0 / (1.0 + zero_rate / periods_per_year) ** (periods_per_year * years)
     else:
         raise ValueError(f"Invalid compounding_frequency {compounding_frequency}")
-        
-        
 
-            
 
-            
-            
-            
-            
-            
-            
-            
-            
-            
-            
\ No newline at end of file
+def pillar_interpolation_weights(
+        years: np.array,
+        pillar_years: np.array,
+        interpolation_method: str) -> np.array:
+    """
+    Interpolation weights W, of shape (len(years), len(pillar_years)), such that the interpolated value at years is
+    W @ (the values at the pillars). Both interpolation methods are linear in the pillar values:
+    - 'linear_on_log_of_discount_factors': the values are the log discount factors. Flat beyond the first and last
+      pillars, as np.interp.
+    - 'cubic_spline_on_zero_rates': the values are the continuously compounded zero rates. The spline is linear in its
+      knot values, so the columns are the splines of the unit vectors. Extrapolated beyond the pillars, as splev.
+    """
+    years = np.atleast_1d(np.asarray(years, dtype=np.float64))
+    pillar_years = np.asarray(pillar_years, dtype=np.float64)
+    nb_pillars = len(pillar_years)
+    if interpolation_method == 'linear_on_log_of_discount_factors':
+        idx = np.clip(np.searchsorted(pillar_years, years, side='right') - 1, 0, nb_pillars - 2)
+        w = np.clip((years - pillar_years[idx]) / (pillar_years[idx+1] - pillar_years[idx]), 0.0, 1.0)
+        weights = np.zeros((len(years), nb_pillars))
+        rows = np.arange(len(years))
+        weights[rows, idx] = 1.0 - w
+        weights[rows, idx + 1] += w
+        return weights
+    elif interpolation_method == 'cubic_spline_on_zero_rates':
+        return np.column_stack([scipy.interpolate.splev(years, scipy.interpolate.splrep(pillar_years, e, k=3))
+                                for e in np.eye(nb_pillars)])
+    else:
+        raise ValueError(f"Invalid interpolation_method {interpolation_method}")
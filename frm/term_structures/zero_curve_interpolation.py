@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import scipy
+from dataclasses import dataclass
+from math import factorial
+from typing import Optional
+import time
+
+
+@dataclass
+class PiecewisePolynomial:
+    """
+    Piecewise polynomial, p(t) = Σ_k coefficients[j,k] * (t - breakpoints[j])^k for breakpoints[j] <= t < breakpoints[j+1].
+    The first (last) piece is extended below (above) the breakpoints. Evaluation is vectorised with Horner's method.
+
+    Parameters:
+    breakpoints (np.array): Left end of each piece, ascending, shape (nb of pieces,).
+    coefficients (np.array): Coefficients in ascending powers, shape (nb of pieces, degree + 1).
+    """
+    breakpoints: np.array
+    coefficients: np.array
+
+    def __call__(self, x: np.array, der: int=0) -> np.array:
+        x = np.asarray(x, dtype=np.float64)
+        idx = np.clip(np.searchsorted(self.breakpoints, x, side='right') - 1, 0, len(self.breakpoints) - 1)
+        u = x - self.breakpoints[idx]
+        degree = self.coefficients.shape[1] - 1
+        result = np.zeros(x.shape)
+        for k in range(degree, der - 1, -1):
+            result = result * u + self.coefficients[idx, k] * (factorial(k) // factorial(k - der))
+        return result
+
+
+# The interpolators below return the piecewise polynomial of F(t) = -ln P(t) = t z(t), the integral of the
+# instantaneous forward rate, from the pillar years (> 0) and continuously compounded zero rates. F, F' & F'' are the
+# -log discount factor, the instantaneous forward rate and its slope. The schemes are local: a pillar only changes the
+# pieces of the nearby intervals.
+
+def _integrate_forward_rate(breakpoints: np.array, forward_rate_coefficients: np.array) -> PiecewisePolynomial:
+    # F from the piecewise polynomial of the forward rate, with F(0) = 0
+    degree = forward_rate_coefficients.shape[1]
+    coefficients = np.zeros((len(breakpoints), degree + 1))
+    coefficients[:, 1:] = forward_rate_coefficients / np.arange(1, degree + 1)
+    h = np.diff(breakpoints)
+    piece_integral = (coefficients[:-1, 1:] * h[:, np.newaxis] ** np.arange(1, degree + 1)).sum(axis=1)
+    coefficients[1:, 0] = np.cumsum(piece_integral)
+    return PiecewisePolynomial(breakpoints, coefficients)
+
+
+def _zero_rate_to_F(breakpoints: np.array, zero_rate_coefficients: np.array) -> PiecewisePolynomial:
+    # F = t z(t) = (b + u) z(u), from the piecewise polynomial of the zero rate
+    coefficients = np.zeros((len(breakpoints), zero_rate_coefficients.shape[1] + 1))
+    coefficients[:, :-1] += breakpoints[:, np.newaxis] * zero_rate_coefficients
+    coefficients[:, 1:] += zero_rate_coefficients
+    return PiecewisePolynomial(breakpoints, coefficients)
+
+
+def linear_on_zero_rates(pillar_years: np.array, zero_rates: np.array) -> PiecewisePolynomial:
+    """Zero rates linear between the pillars, flat before the first and after the last pillar."""
+    slope = np.diff(zero_rates) / np.diff(pillar_years)
+    breakpoints = np.concatenate([[0.0], pillar_years])
+    zero_rate_coefficients = np.column_stack([np.concatenate([zero_rates[:1], zero_rates]),
+                                              np.concatenate([[0.0], slope, [0.0]])])
+    return _zero_rate_to_F(breakpoints, zero_rate_coefficients)
+
+
+def pchip_on_zero_rates(pillar_years: np.array, zero_rates: np.array) -> PiecewisePolynomial:
+    """
+    Monotone piecewise cubic Hermite (Fritsch-Carlson, scipy's PchipInterpolator) zero rates between the pillars,
+    flat before the first and after the last pillar. The slope at a pillar depends on its neighbours only.
+    """
+    pchip = scipy.interpolate.PchipInterpolator(pillar_years, zero_rates)
+    breakpoints = np.concatenate([[0.0], pillar_years])
+    zero_rate_coefficients = np.zeros((len(breakpoints), 4))
+    zero_rate_coefficients[0, 0] = zero_rates[0]
+    zero_rate_coefficients[1:-1] = pchip.c[::-1].T # scipy's coefficients are in descending powers
+    zero_rate_coefficients[-1, 0] = zero_rates[-1]
+    return _zero_rate_to_F(breakpoints, zero_rate_coefficients)
+
+
+def monotone_convex(pillar_years: np.array, zero_rates: np.array) -> PiecewisePolynomial:
+    """
+    Hagan-West monotone convex interpolation of the instantaneous forward rate from t=0. Each interval's forward rate
+    averages to the discrete forward rate, so the pillars are repriced, and the forward rate is continuous and
+    piecewise quadratic (at most two quadratics per interval). The positivity constraint of [1] is not applied, so
+    negative rates are allowed. Flat forward rate after the last pillar.
+
+    References:
+    [1] Patrick S. Hagan & Graeme West, Interpolation Methods for Curve Construction, Applied Mathematical Finance (2006)
+    """
+    τ = np.concatenate([[0.0], pillar_years])
+    rτ = np.concatenate([[0.0], zero_rates * pillar_years])
+    h = np.diff(τ)
+    f_discrete = np.diff(rτ) / h
+
+    # Instantaneous forward rates at the pillars
+    f = np.zeros(len(τ))
+    if len(h) > 1:
+        f[1:-1] = (h[:-1] * f_discrete[1:] + h[1:] * f_discrete[:-1]) / (h[:-1] + h[1:])
+        f[0] = f_discrete[0] - 0.5 * (f[1] - f_discrete[0])
+        f[-1] = f_discrete[-1] - 0.5 * (f[-2] - f_discrete[-1])
+    else:
+        f[:] = f_discrete[0]
+
+    # g(x) = f - f_discrete on each interval, x in [0,1], as pieces [x_start, (p0, p1, p2)] of g = p0 + p1 x + p2 x²
+    def quadratic(v0, c, m):
+        # v0 + c (x - m)²
+        return v0 + c * m ** 2, -2 * c * m, c
+
+    breakpoints, forward_rate_coefficients = [], []
+    for i in range(len(h)):
+        g0, g1 = f[i] - f_discrete[i], f[i+1] - f_discrete[i]
+        if g0 == 0 and g1 == 0:
+            pieces = [(0.0, (0.0, 0.0, 0.0))]
+        elif (g0 < 0 and -g0 / 2 <= g1 <= -2 * g0) or (g0 > 0 and -g0 / 2 >= g1 >= -2 * g0):
+            pieces = [(0.0, (g0, -4 * g0 - 2 * g1, 3 * g0 + 3 * g1))]
+        elif (g0 < 0 and g1 > -2 * g0) or (g0 > 0 and g1 < -2 * g0):
+            η = (g1 + 2 * g0) / (g1 - g0)
+            pieces = [(0.0, (g0, 0.0, 0.0)), (η, quadratic(g0, (g1 - g0) / (1 - η) ** 2, η))]
+        elif (g0 > 0 and 0 > g1 > -g0 / 2) or (g0 < 0 and 0 < g1 < -g0 / 2):
+            η = 3 * g1 / (g1 - g0)
+            pieces = [(0.0, quadratic(g1, (g0 - g1) / η ** 2, η)), (η, (g1, 0.0, 0.0))]
+        else:
+            η = g1 / (g1 + g0)
+            A = -g0 * g1 / (g0 + g1)
+            pieces = ([(0.0, quadratic(A, (g0 - A) / η ** 2, η))] if η > 0 else []) \
+                + ([(η, quadratic(A, (g1 - A) / (1 - η) ** 2, η))] if η < 1 else [])
+
+        for x_start, (p0, p1, p2) in pieces:
+            # In the local variable u = t - (τ_i + x_start h), x = x_start + u / h
+            breakpoints.append(τ[i] + x_start * h[i])
+            forward_rate_coefficients.append([f_discrete[i] + p0 + p1 * x_start + p2 * x_start ** 2,
+                                              (p1 + 2 * p2 * x_start) / h[i],
+                                              p2 / h[i] ** 2])
+
+    breakpoints.append(τ[-1])
+    forward_rate_coefficients.append([f[-1], 0.0, 0.0])
+    return _integrate_forward_rate(np.array(breakpoints), np.array(forward_rate_coefficients))
+
+
+PIECEWISE_INTERPOLATORS = {
+    'linear_on_zero_rates': linear_on_zero_rates,
+    'pchip_on_zero_rates': pchip_on_zero_rates,
+    'monotone_convex': monotone_convex,
+}
+
+
+# Support of a pillar, in intervals (0,t_1), (t_1,t_2), ... and the extrapolation tail after the last pillar t_n, as
+# (nb of intervals below, nb of intervals above, reach of the tail). Bumping pillar k (knot k+1, with knot 0 at t=0)
+# only changes F on the intervals between knots k-below and k+above, and on the tail if k >= n - reach.
+# - linear: z(t) on the two intervals either side of the pillar; the tail is z_n.
+# - pchip: the slope at a pillar depends on its neighbours (the end slopes on the first/last 3 pillars); the tail is z_n.
+# - monotone convex: f at knot j depends on the discrete forward rates either side of it, so the bump moves f at
+#   knots k, k+1 & k+2, and f at the last knot (the flat tail forward rate) depends on f at the knot before it.
+PIECEWISE_INTERPOLATOR_SUPPORT = {
+    'linear_on_zero_rates': (0, 2, 1),
+    'pchip_on_zero_rates': (1, 3, 1),
+    'monotone_convex': (1, 3, 3),
+}
+
+
+def pillar_support(interpolation_method: str, k: int, nb_pillars: int) -> (int, Optional[int]):
+    """
+    Knot indices (lower, upper) of the interval outside of which F is unchanged when pillar k is bumped, with upper
+    None if the extrapolation tail changes. Knot 0 is t=0 and knot k+1 is pillar k.
+    """
+    below, above, reach = PIECEWISE_INTERPOLATOR_SUPPORT[interpolation_method]
+    lower = max(k - below, 0)
+    upper = None if k >= nb_pillars - reach else min(k + above, nb_pillars)
+    return lower, upper
+
+
+if __name__ == "__main__":
+    pillar_years = np.array([0.25, 0.5, 1, 2, 3, 5, 7, 10, 15, 20, 30])
+    zero_rates = np.array([0.0530, 0.0525, 0.0510, 0.0470, 0.0450, 0.0430, 0.0425, 0.0428, 0.0435, 0.0432, 0.0420])
+    years = np.linspace(0, 30, 1_000_000)
+    for name, interpolator in PIECEWISE_INTERPOLATORS.items():
+        t1 = time.time()
+        F = interpolator(pillar_years, zero_rates)
+        t2 = time.time()
+        forward_rate = F(years, der=1)
+        t3 = time.time()
+        print(name, '- setup:', round(t2-t1, 5), 's, forward rates at 1m points:', round(t3-t2, 4), 's,',
+              'max pillar error:', np.abs(F(pillar_years) - zero_rates * pillar_years).max())
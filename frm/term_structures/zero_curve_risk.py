@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import pandas as pd
+from typing import Optional
+import time
+
+from frm.term_structures.zero_curve import ZeroCurve
+from frm.term_structures.zero_curve_bootstrapper import ZeroCurveBootstrapper
+
+
+def swap_leg_discount_factor_sensitivity(swap_leg,
+                                         discount_curve: ZeroCurve,
+                                         projection_curve: Optional[ZeroCurve]=None) -> dict:
+    """
+    Present value of a SwapLeg and its sensitivity to each discount factor it reads, dPV/dP(date). The leg can be any
+    object with a 'schedule' DataFrame with 'payment_date' & 'payment' columns (and an optional pay_rec). Payments after
+    the curve date are included.
+
+    Known payments (fixed coupons, notional exchanges) are discounted on the discount_curve. Unknown payments (float or
+    OIS coupons, 'payment' is NaN) are projected on the projection_curve (default is the discount_curve) from the
+    'period_start', 'period_end', 'notional', 'years' & 'spread' columns as notional * (P_p(start) / P_p(end) - 1 +
+    spread * years), i.e. the simple forward rate over the period plus the spread. For an OIS coupon, this is the
+    daily compounded rate, as the daily forward rates telescope.
+
+    Returns:
+    dict: 'present_value', 'discount_dates' & 'discount_sensitivity' (dPV/dP_d at the payment dates),
+          'projection_dates' & 'projection_sensitivity' (dPV/dP_p at the float period start & end dates).
+    """
+    if projection_curve is None:
+        projection_curve = discount_curve
+    schedule = swap_leg.schedule
+    schedule = schedule.loc[schedule['payment_date'] > discount_curve.curve_date]
+    multiplier = swap_leg.pay_rec.multiplier if getattr(swap_leg, 'pay_rec', None) is not None else 1
+
+    payment_date = pd.DatetimeIndex(schedule['payment_date'])
+    payment = schedule['payment'].to_numpy(dtype=np.float64).copy()
+    discount_factor = discount_curve.get_discount_factor(dates=payment_date)
+
+    mask_float = np.isnan(payment)
+    float_rows = schedule.loc[mask_float].reindex(columns=['period_start', 'period_end', 'notional', 'years', 'spread'])
+    period_start = pd.DatetimeIndex(float_rows['period_start'])
+    period_end = pd.DatetimeIndex(float_rows['period_end'])
+    if (period_start < projection_curve.curve_date).any():
+        raise ValueError("The fixing of a float period starting before the curve date must be set in 'payment'")
+    P_start = projection_curve.get_discount_factor(dates=period_start)
+    P_end = projection_curve.get_discount_factor(dates=period_end)
+    notional = float_rows['notional'].to_numpy(dtype=np.float64)
+    spread = float_rows['spread'].fillna(0.0).to_numpy(dtype=np.float64)
+    years = float_rows['years'].to_numpy(dtype=np.float64)
+    payment[mask_float] = notional * (P_start / P_end - 1.0 + spread * years)
+
+    float_discount_factor = discount_factor[mask_float]
+    return {'present_value': multiplier * (payment * discount_factor).sum(),
+            'discount_dates': payment_date,
+            'discount_sensitivity': multiplier * payment,
+            'projection_dates': period_start.append(period_end),
+            'projection_sensitivity': multiplier * np.concatenate([notional * float_discount_factor / P_end,
+                                                                   -1 * notional * float_discount_factor * P_start / P_end ** 2])}
+
+
+def bucketed_pv01(zero_curve: ZeroCurve,
+                  dates: pd.DatetimeIndex,
+                  sensitivity: np.array,
+                  trade_index: Optional[np.array]=None,
+                  bootstrapper: Optional[ZeroCurveBootstrapper]=None) -> np.array:
+    """
+    Bucketed PV01, the change in present value for a +1bp change in each of the curve's pillar zero rates (continuously
+    compounded), or in each of the bootstrap instruments' par rates if the bootstrapper is given. Computed in one pass
+    from the sensitivities to the discount factors, dPV/dP(dates), the analytic interpolation Jacobian
+    (ZeroCurve.discount_factor_jacobian()) and the bootstrap Jacobian (ZeroCurveBootstrapper.rate_jacobian()), so no
+    curve is rebuilt.
+
+    Parameters:
+    zero_curve (ZeroCurve): Curve the discount factors are read from.
+    dates (pd.DatetimeIndex): Dates of the discount factors, e.g. the concatenated dates of all the trades of a book.
+                              Dates can repeat.
+    sensitivity (np.array): dPV/dP at each date.
+    trade_index (np.array, optional): Trade of each date, for a PV01 per trade. Default is a single PV01 for all dates.
+    bootstrapper (ZeroCurveBootstrapper, optional): Bootstrapper of the zero_curve, to map to the instruments' par rates.
+
+    Returns:
+    np.array: PV01 of shape (nb of buckets,), or (nb of trades, nb of buckets) if trade_index is given.
+    """
+    sensitivity = np.asarray(sensitivity, dtype=np.float64)
+    if len(dates) != len(sensitivity):
+        raise ValueError(f"'dates' ({len(dates)}) and 'sensitivity' ({len(sensitivity)}) must have the same length")
+    pv01 = sensitivity[:, np.newaxis] * zero_curve.discount_factor_jacobian(dates=dates) * 1e-4
+
+    if trade_index is None:
+        pv01 = pv01.sum(axis=0)
+    else:
+        trade_index = np.asarray(trade_index)
+        nb_trades = trade_index.max() + 1 if len(trade_index) > 0 else 0
+        pv01_by_trade = np.zeros((nb_trades, pv01.shape[1]))
+        np.add.at(pv01_by_trade, trade_index, pv01)
+        pv01 = pv01_by_trade
+
+    if bootstrapper is not None:
+        if bootstrapper.curve is None or len(bootstrapper.pillar_years) != pv01.shape[-1]:
+            raise ValueError("The bootstrapper must have bootstrapped the zero_curve")
+        pv01 = pv01 @ bootstrapper.rate_jacobian()
+    return pv01
+
+
+def fx_forward_bucketed_delta(fx_spot_rate: float,
+                              domestic_zero_curve: ZeroCurve,
+                              foreign_zero_curve: ZeroCurve,
+                              delivery_dates: pd.DatetimeIndex,
+                              spot_date: Optional[pd.Timestamp]=None) -> dict:
+    """
+    FX forward rates by covered interest parity, F(T) = S * (P_f(T) / P_f(spot)) / (P_d(T) / P_d(spot)), and their
+    change for a +1bp change in each pillar zero rate of the domestic and foreign curves.
+
+    Returns:
+    dict: 'fx_forward_rate' of shape (nb of dates,), 'domestic' & 'foreign' of shape (nb of dates, nb of pillars).
+    """
+    if spot_date is None:
+        spot_date = domestic_zero_curve.curve_date
+    spot_and_delivery_dates = pd.DatetimeIndex([spot_date]).append(pd.DatetimeIndex(delivery_dates))
+    P_d = domestic_zero_curve.get_discount_factor(dates=spot_and_delivery_dates)
+    P_f = foreign_zero_curve.get_discount_factor(dates=spot_and_delivery_dates)
+    fx_forward_rate = fx_spot_rate * (P_f[1:] / P_f[0]) / (P_d[1:] / P_d[0])
+
+    # d ln F = d ln P_f(T) - d ln P_f(spot) - d ln P_d(T) + d ln P_d(spot)
+    ln_P_d_jacobian = domestic_zero_curve.discount_factor_jacobian(dates=spot_and_delivery_dates) / P_d[:, np.newaxis]
+    ln_P_f_jacobian = foreign_zero_curve.discount_factor_jacobian(dates=spot_and_delivery_dates) / P_f[:, np.newaxis]
+    return {'fx_forward_rate': fx_forward_rate,
+            'domestic': -1 * fx_forward_rate[:, np.newaxis] * (ln_P_d_jacobian[1:] - ln_P_d_jacobian[0]) * 1e-4,
+            'foreign': fx_forward_rate[:, np.newaxis] * (ln_P_f_jacobian[1:] - ln_P_f_jacobian[0]) * 1e-4}
+
+
+if __name__ == "__main__":
+    from types import SimpleNamespace
+    from frm.term_structures.zero_curve_bootstrapper import Deposit, OISSwap
+    from frm.utils.daycount import year_fraction
+
+    curve_date = pd.Timestamp(2024, 6, 3)
+    spot_date = pd.Timestamp(2024, 6, 5)
+    instruments = [Deposit(curve_date, pd.Timestamp(2024, 6, 4), 0.0530)] \
+        + [OISSwap(spot_date, spot_date + pd.DateOffset(years=y), 0.0500 - 0.0010 * y ** 0.5) for y in range(1, 31)]
+    bootstrapper = ZeroCurveBootstrapper(curve_date, instruments)
+    zero_curve = bootstrapper.bootstrap()
+
+    # A book of 500 annual fixed vs OIS swaps, receiving fixed
+    rng = np.random.default_rng(0)
+    dates, sensitivity, trade_index = [], [], []
+    for trade in range(500):
+        maturity = int(rng.integers(1, 31))
+        period_start = pd.DatetimeIndex([spot_date + pd.DateOffset(years=y) for y in range(maturity)])
+        period_end = pd.DatetimeIndex([spot_date + pd.DateOffset(years=y) for y in range(1, maturity + 1)])
+        years = np.atleast_1d(year_fraction(period_start, period_end, zero_curve.day_count_basis)).astype(np.float64)
+        fixed = SimpleNamespace(schedule=pd.DataFrame({'payment_date': period_end, 'payment': 1e6 * 0.045 * years}))
+        ois = SimpleNamespace(schedule=pd.DataFrame({'period_start': period_start, 'period_end': period_end, 'payment_date': period_end,
+                                                     'notional': -1e6, 'years': years, 'spread': 0.0, 'payment': np.nan}))
+        for leg in [fixed, ois]:
+            result = swap_leg_discount_factor_sensitivity(leg, zero_curve)
+            for role in ['discount', 'projection']:
+                dates.append(result[role + '_dates'])
+                sensitivity.append(result[role + '_sensitivity'])
+                trade_index.append(np.full(len(result[role + '_dates']), trade))
+    dates = dates[0].append(dates[1:])
+    sensitivity = np.concatenate(sensitivity)
+    trade_index = np.concatenate(trade_index)
+
+    t1 = time.time()
+    pv01_by_pillar = bucketed_pv01(zero_curve, dates, sensitivity, trade_index)
+    pv01_by_instrument = bucketed_pv01(zero_curve, dates, sensitivity, trade_index, bootstrapper=bootstrapper)
+    t2 = time.time()
+    print('Bucketed PV01 of', pv01_by_pillar.shape[0], 'trades,', len(dates), 'discount factors:', round(t2-t1, 4), 's')
+    print('Book PV01 by instrument:', pv01_by_instrument.sum(axis=0).round(0))
@@ -1,25 +1,43 @@
 # -*- coding: utf-8 -*-
-from functools import reduce
+import functools
 import os
 import sys
+import warnings
 
-import holidays
 import numpy as np
 import pandas as pd
-import dill
+
+from frm.utils.day_number import day_number_to_datetime64
 
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
 file_path_locale_holiday = os.path.join(script_dir, 'LOCALE_HOLIDAY.pkl') 
 file_path_ccy_holiday = os.path.join(script_dir, 'CCY_HOLIDAY.pkl')
-with open(file_path_locale_holiday, 'rb') as f:
-    LOCALE_HOLIDAY = dill.load(f)
+file_path_holiday_npz = os.path.join(script_dir, 'HOLIDAY.npz')
+
+# Year range of the holidays precomputed to HOLIDAY.npz
+HOLIDAY_YEARS = range(1990, 2100)
+
+
+def __getattr__(name):
+    # LOCALE_HOLIDAY & CCY_HOLIDAY (dicts of holidays objects) are unpickled on first access, not at import
+    if name == 'LOCALE_HOLIDAY':
+        return _load_holidays_objects(file_path_locale_holiday)
+    elif name == 'CCY_HOLIDAY':
+        return _load_holidays_objects(file_path_ccy_holiday)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
-with open(file_path_ccy_holiday, 'rb') as f:
-    CCY_HOLIDAY = dill.load(f)
+@functools.lru_cache(maxsize=None)
+def _load_holidays_objects(file_path: str) -> dict:
+    import dill
+    with open(file_path, 'rb') as f:
+        return dill.load(f)
 
 
 def get_holidays_object(key):
+    CCY_HOLIDAY = _load_holidays_objects(file_path_ccy_holiday)
+    LOCALE_HOLIDAY = _load_holidays_objects(file_path_locale_holiday)
     if key in CCY_HOLIDAY.keys():
         return CCY_HOLIDAY[key]
     elif key in LOCALE_HOLIDAY.keys():
@@ -41,35 +59,87 @@ def convert_weekend_to_weekmask(weekend_set):
     return ''.join(map(str, weekmask))
 
 
+def compile_holiday_arrays(years: range=None, file_path: str=None) -> dict:
+    """
+    Precompute the weekmask and holiday dates of every currency/locale from the pickled holidays objects, over the
+    years (default HOLIDAY_YEARS), as flat arrays: 'keys', 'weekmask' (nb of keys, 7), 'holidays' (the int32 day numbers of the holidays of
+    all the keys, each key sorted) and 'offsets' (key i's holidays are holidays[offsets[i]:offsets[i+1]]).
+    Saved as a compressed .npz to file_path if given.
+    """
+    if years is None:
+        years = HOLIDAY_YEARS
+    holiday_objects = {**_load_holidays_objects(file_path_locale_holiday), **_load_holidays_objects(file_path_ccy_holiday)}
+    keys = sorted(holiday_objects.keys())
+    weekmask = np.array([[c == '1' for c in convert_weekend_to_weekmask(holiday_objects[key].weekend)] for key in keys])
+    holidays = [np.unique(np.array([d for d in holiday_objects[key] if years.start <= d.year < years.stop], dtype='datetime64[D]'))
+                for key in keys]
+    arrays = {'keys': np.array(keys),
+              'weekmask': weekmask,
+              'holidays': np.concatenate(holidays).astype(np.int64).astype(np.int32),
+              'offsets': np.concatenate([[0], np.cumsum([len(h) for h in holidays])]),
+              'years': np.array([years.start, years.stop - 1])}
+    if file_path is not None:
+        np.savez_compressed(file_path, **arrays)
+    return arrays
+
+
+@functools.lru_cache(maxsize=None)
+def _holiday_arrays() -> dict:
+    # {KEY: (weekmask, holidays)} by upper-case key, loaded from HOLIDAY.npz, or compiled from the pickles if it is
+    # absent or was compiled over other years than HOLIDAY_YEARS
+    arrays = None
+    if os.path.exists(file_path_holiday_npz):
+        with np.load(file_path_holiday_npz) as npz:
+            arrays = {name: npz[name] for name in npz.files}
+        years = (HOLIDAY_YEARS.start, HOLIDAY_YEARS.stop - 1)
+        if tuple(arrays['years']) != years:
+            warnings.warn(f"HOLIDAY.npz covers the years {tuple(arrays['years'])}, not HOLIDAY_YEARS {years}. "
+                          f"The holidays are compiled from the pickles, run compile_holiday_arrays(file_path=...) to update it.")
+            arrays = None
+    if arrays is None:
+        arrays = compile_holiday_arrays()
+    offsets = arrays['offsets']
+    holidays = day_number_to_datetime64(arrays['holidays'])
+    return {key.upper(): (arrays['weekmask'][i], holidays[offsets[i]:offsets[i+1]])
+            for i, key in enumerate(arrays['keys'])}
+
+
 def get_busdaycal(keys) -> np.busdaycalendar:
     """
-    Create a calendar which has the holidays and business days of the currencies/locales.
+    Create a calendar which has the holidays and business days of the currencies/locales. The calendars are memoised
+    by the set of keys, so repeated calls (e.g. for each surface of a currency pair) share one np.busdaycalendar.
     """
 
     if keys is None:
         return np.busdaycalendar()
 
-    if type(keys) is str:
-        keys = [keys.upper()]
-    elif type(keys) is list:
-        keys = list(set(keys))
-        keys = [key.upper() for key in keys]
+    if isinstance(keys, str):
+        keys = [keys]
+    return _get_joint_busdaycal(frozenset(key.upper() for key in keys))
 
-    holiday_objects = [get_holidays_object(key) for key in keys]
-    combined_weekend_union = reduce(lambda x, y: x | y.weekend, holiday_objects, set())
-    weekmasks = convert_weekend_to_weekmask(combined_weekend_union)
 
-    # Flattan the list of lists
-    holidays = [h for holiday_list in holiday_objects for h in holiday_list]
+@functools.lru_cache(maxsize=None)
+def _get_joint_busdaycal(keys: frozenset) -> np.busdaycalendar:
+    holiday_arrays = _holiday_arrays()
+    for key in keys:
+        if key not in holiday_arrays:
+            raise ValueError(f"Holidays not setup for {key}")
 
-    return np.busdaycalendar(weekmask=weekmasks, holidays=holidays)  
+    # A business day in the joint calendar is a business day in every calendar
+    weekmask = np.ones(7, dtype=bool)
+    for key in keys:
+        weekmask &= holiday_arrays[key][0]
+    holidays = np.unique(np.concatenate([holiday_arrays[key][1] for key in keys] + [np.array([], dtype='datetime64[D]')]))
+    return np.busdaycalendar(weekmask=weekmask.astype(np.int64), holidays=holidays)
 
 
 
 # Pickle variables 
 if __name__ == "__main__":
+    import dill
+    import holidays
     
-    years = range(1990,2100)
+    years = HOLIDAY_YEARS
 
     LOCALE_HOLIDAY = dict(sorted({
         'AE-DUBAI': holidays.AE(categories=['public'], years=years),
@@ -161,6 +231,10 @@ if __name__ == "__main__":
     # Pickle the variable
     with open(file_path_ccy_holiday, 'wb') as f:
         dill.dump(CCY_HOLIDAY, f)
+
+    # Precompute the holiday dates
+    _load_holidays_objects.cache_clear()
+    compile_holiday_arrays(years, file_path_holiday_npz)
         
 # Create code for static holidays definition
 if __name__ == "__main__":
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import functools
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+import time
+
+from frm.utils.day_number import FIRST_DAY, to_day_number, day_number_to_datetime64, _civil_tables
+
+
+VALID_ROLL = {'raise', 'forward', 'following', 'backward', 'preceding', 'modifiedfollowing', 'modifiedpreceding'}
+
+
+@dataclass
+class BusinessDayIndex:
+    """
+    Index of the business days of a np.busdaycalendar over the pd.Timestamp range (1677 to 2262), for business day
+    rolls, offsets and counts on int32 day numbers (frm.utils.day_number) as array lookups, with the semantics of
+    np.busday_offset() and np.busday_count().
+
+    The index holds the cumulative count of business days before each day, nb_before[d] = #{business days < d}, and
+    the business days in order, so the first business day on or after d is business_days[nb_before[d]] and the n-th
+    business day after business day b is business_days[nb_before[b] + n].
+
+    Parameters:
+    busdaycal (np.busdaycalendar): Calendar of the weekmask and holidays.
+    """
+    busdaycal: np.busdaycalendar
+
+    # Attributes set in __post_init__
+    nb_before: np.array=field(init=False, repr=False)
+    business_days: np.array=field(init=False, repr=False)
+
+    def __post_init__(self):
+        days = np.arange(FIRST_DAY, np.datetime64('2263-01-02', 'D').astype(np.int64))
+        is_busday = np.is_busday(days.view('datetime64[D]'), busdaycal=self.busdaycal)
+        self.business_days = days[is_busday].astype(np.int32)
+        self.nb_before = np.concatenate([[0], np.cumsum(is_busday)]).astype(np.int32) # One more than days, for d + 1
+
+    def __position(self, day_number: np.array) -> np.array:
+        idx = np.asarray(day_number, dtype=np.int64) - FIRST_DAY
+        if not ((0 <= idx) & (idx < len(self.nb_before) - 1)).all():
+            raise ValueError("Dates must be within the pd.Timestamp range")
+        return idx
+
+    def __take(self, position: np.array) -> np.array:
+        if not ((0 <= position) & (position < len(self.business_days))).all():
+            raise ValueError("The rolled date is outside the pd.Timestamp range")
+        return self.business_days[position]
+
+    def __take_day(self, position: int) -> int:
+        if not 0 <= position < len(self.business_days):
+            raise ValueError("The rolled date is outside the pd.Timestamp range")
+        return int(self.business_days[position])
+
+    def is_busday(self, day_number: np.array) -> np.array:
+        idx = self.__position(day_number)
+        return self.nb_before[idx + 1] > self.nb_before[idx]
+
+    def roll(self, day_number: np.array, roll: str='following') -> np.array:
+        """Rolls the day numbers to business days, per the np.busday_offset() roll."""
+        idx = self.__position(day_number)
+        if roll == 'raise':
+            if not (self.nb_before[idx + 1] > self.nb_before[idx]).all():
+                raise ValueError("Non-business day date in busday_offset")
+            return (idx + FIRST_DAY).astype(np.int32)
+        elif roll in {'forward', 'following'}:
+            return self.__take(self.nb_before[idx])
+        elif roll in {'backward', 'preceding'}:
+            return self.__take(self.nb_before[idx + 1] - 1)
+        elif roll in {'modifiedfollowing', 'modifiedpreceding'}:
+            # The modified rolls go the other way if the roll changes the month
+            following = self.__take(self.nb_before[idx])
+            preceding = self.__take(self.nb_before[idx + 1] - 1)
+            month = _civil_tables()[1]
+            if roll == 'modifiedfollowing':
+                return np.where(month[following - FIRST_DAY] == month[idx], following, preceding)
+            else:
+                return np.where(month[preceding - FIRST_DAY] == month[idx], preceding, following)
+        raise ValueError(f"Invalid roll '{roll}', must be one of {sorted(VALID_ROLL)}")
+
+    def offset(self, day_number: np.array, offsets=0, roll: str='raise') -> np.array:
+        """np.busday_offset() on day numbers: rolls to a business day, then moves by offsets business days."""
+        rolled = self.roll(day_number, roll)
+        position = self.nb_before[self.__position(rolled)] + np.asarray(offsets, dtype=np.int64)
+        return self.__take(position)
+
+    def count(self, begin_day_number: np.array, end_day_number: np.array) -> np.array:
+        """np.busday_count() on day numbers: the business days in [begin, end), or -1 * those in (end, begin] if end < begin."""
+        begin_idx = self.__position(begin_day_number)
+        end_idx = self.__position(end_day_number)
+        shift = (end_idx < begin_idx).astype(np.int64)
+        return self.nb_before[end_idx + shift] - self.nb_before[begin_idx + shift]
+
+    def roll_day(self, day_number: int, roll: str='following') -> int:
+        """roll() of a single day number on Python scalars, to avoid the array overhead when rolling one date at a time."""
+        idx = day_number - FIRST_DAY
+        if not 0 <= idx < len(self.nb_before) - 1:
+            raise ValueError("Dates must be within the pd.Timestamp range")
+        if roll not in VALID_ROLL:
+            raise ValueError(f"Invalid roll '{roll}', must be one of {sorted(VALID_ROLL)}")
+        nb_before, nb_to = int(self.nb_before[idx]), int(self.nb_before[idx + 1])
+        if nb_to > nb_before:
+            return day_number
+        elif roll == 'raise':
+            raise ValueError("Non-business day date in busday_offset")
+        following = self.__take_day(nb_before)
+        preceding = self.__take_day(nb_to - 1)
+        if roll in {'forward', 'following'}:
+            return following
+        elif roll in {'backward', 'preceding'}:
+            return preceding
+        month = _civil_tables()[1]
+        if roll == 'modifiedfollowing':
+            return following if month[following - FIRST_DAY] == month[idx] else preceding
+        else:
+            return preceding if month[preceding - FIRST_DAY] == month[idx] else following
+
+    def offset_day(self, day_number: int, offsets: int=0, roll: str='raise') -> int:
+        """offset() of a single day number on Python scalars."""
+        return self.__take_day(int(self.nb_before[self.roll_day(day_number, roll) - FIRST_DAY]) + offsets)
+
+    def busday_offset(self, dates, offsets=0, roll: str='raise') -> np.array:
+        """offset() on any date type accepted by to_day_number(), returning datetime64[D] like np.busday_offset()."""
+        return day_number_to_datetime64(self.offset(to_day_number(dates), offsets, roll))
+
+
+def calendar_fingerprint(busdaycal: np.busdaycalendar) -> tuple:
+    """A hashable key of a np.busdaycalendar's weekmask and holidays (np.busdaycalendar itself hashes by identity)."""
+    return busdaycal.weekmask.tobytes(), busdaycal.holidays.tobytes()
+
+
+def busdaycal_from_fingerprint(fingerprint: tuple) -> np.busdaycalendar:
+    """The np.busdaycalendar of a calendar_fingerprint()."""
+    weekmask, holidays = fingerprint
+    return np.busdaycalendar(weekmask=np.frombuffer(weekmask, dtype=bool).astype(np.int64),
+                             holidays=np.frombuffer(holidays, dtype='datetime64[D]'))
+
+
+@functools.lru_cache(maxsize=64)
+def _get_business_day_index(fingerprint: tuple) -> BusinessDayIndex:
+    return BusinessDayIndex(busdaycal_from_fingerprint(fingerprint))
+
+
+def get_business_day_index(busdaycal: np.busdaycalendar=np.busdaycalendar()) -> BusinessDayIndex:
+    """The BusinessDayIndex of a calendar, memoised by the calendar's weekmask and holidays."""
+    return _get_business_day_index(calendar_fingerprint(busdaycal))
+
+
+if __name__ == "__main__":
+    from frm.utils.business_day_calendar import get_busdaycal
+
+    busdaycal = get_busdaycal(['USD', 'EUR'])
+    dates = pd.date_range('2000-01-01', '2050-12-31', freq='D').values.astype('datetime64[D]')
+    t1 = time.time()
+    index = get_business_day_index(busdaycal)
+    t2 = time.time()
+    result = index.busday_offset(dates, 2, roll='modifiedfollowing')
+    t3 = time.time()
+    expected = np.busday_offset(dates, 2, roll='modifiedfollowing', busdaycal=busdaycal)
+    t4 = time.time()
+    assert (result == expected).all()
+    print('Index setup:', round(t2-t1, 4), 's, offset of', len(dates), 'dates:', round(t3-t2, 4), 's vs np.busday_offset:', round(t4-t3, 4), 's')
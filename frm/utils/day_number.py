@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import datetime as dt
+import functools
+import numpy as np
+import pandas as pd
+import time
+
+
+# Dates are represented internally as int32 day numbers, the days since 1970-01-01 (the datetime64[D] epoch), so
+# day counts are integer differences and a day number is a datetime64[D] after a view. The year/month/day of a day
+# number is looked up in tables over the pd.Timestamp range (1677 to 2262), built once. Conversion from/to the
+# pandas/numpy/python date types is only done at the API boundary with to_day_number() and day_number_to_datetimeindex().
+
+NS_PER_DAY = 86_400_000_000_000
+FIRST_DAY = int(np.datetime64('1677-01-01', 'D').astype(np.int64)) # The day number of the first day in the tables
+_EPOCH_ORDINAL = dt.date(1970, 1, 1).toordinal()
+
+
+def to_day_number(date_object) -> np.array:
+    """
+    Converts a date-like object to an int32 array of day numbers (days since 1970-01-01). Times of day are floored.
+
+    Parameters:
+    date_object: pd.DatetimeIndex, pd.Series, pd.Timestamp, np.datetime64, np.ndarray of datetime64, dt.date,
+                 dt.datetime or a list of dates.
+
+    Returns:
+    np.array: int32 day numbers of shape (nb of dates,).
+    """
+    if isinstance(date_object, (pd.Index, pd.Series)):
+        values = date_object.values
+    elif isinstance(date_object, pd.Timestamp):
+        return np.array([date_object.value // NS_PER_DAY], dtype=np.int32)
+    elif isinstance(date_object, np.datetime64):
+        return np.atleast_1d(date_object.astype('datetime64[D]').astype(np.int64)).astype(np.int32)
+    elif isinstance(date_object, dt.date):
+        return np.array([date_object.toordinal() - _EPOCH_ORDINAL], dtype=np.int32)
+    elif isinstance(date_object, np.ndarray):
+        values = date_object
+    elif isinstance(date_object, list):
+        values = pd.DatetimeIndex(date_object).values
+    else:
+        raise ValueError("Unsupported type", type(date_object), date_object)
+
+    values = np.atleast_1d(values)
+    if values.dtype == 'datetime64[ns]':
+        # Floor division of the int64 nanoseconds is faster than converting to datetime64[D]
+        return (values.view(np.int64) // NS_PER_DAY).astype(np.int32)
+    if values.dtype.kind != 'M':
+        values = pd.DatetimeIndex(values).values
+    return values.astype('datetime64[D]').astype(np.int64).astype(np.int32)
+
+
+def day_number_to_datetime64(day_number: np.array) -> np.array:
+    """Day numbers as a datetime64[D] array, e.g. for np.busday_offset()."""
+    return np.asarray(day_number).astype(np.int64).view('datetime64[D]')
+
+
+def day_number_to_datetimeindex(day_number: np.array) -> pd.DatetimeIndex:
+    """Day numbers as a pd.DatetimeIndex (datetime64[ns])."""
+    return pd.DatetimeIndex(np.asarray(day_number).astype(np.int64) * NS_PER_DAY)
+
+
+@functools.lru_cache(maxsize=None)
+def _civil_tables() -> (np.array, np.array, np.array):
+    # The year, month and day of each day from 1677-01-01 to 2263-01-01, indexed by the day number less FIRST_DAY
+    day = np.arange(FIRST_DAY, np.datetime64('2263-01-02', 'D').astype(np.int64)).view('datetime64[D]')
+    month = day.astype('datetime64[M]')
+    year = month.astype('datetime64[Y]')
+    return ((year.astype(np.int64) + 1970).astype(np.int16),
+            (month.astype(np.int64) % 12 + 1).astype(np.int8),
+            ((day - month.astype('datetime64[D]')).astype(np.int64) + 1).astype(np.int8))
+
+
+def year_month_day(day_number: np.array) -> (np.array, np.array, np.array):
+    """The year, month (1 to 12) and day of the month (1 to 31) of day numbers, as int32 arrays."""
+    idx = np.asarray(day_number) - FIRST_DAY
+    return tuple(table[idx].astype(np.int32) for table in _civil_tables())
+
+
+def is_last_day_of_month(day_number: np.array) -> np.array:
+    """True where the day number is the last day of its month."""
+    return _civil_tables()[2][np.asarray(day_number) + 1 - FIRST_DAY] == 1
+
+
+@functools.lru_cache(maxsize=None)
+def _month_start_table() -> np.array:
+    # The day number of the first day of each month from 1677-01 to 2263-01, indexed by the months since 1677-01
+    return np.arange(np.datetime64('1677-01', 'M'), np.datetime64('2263-02', 'M')).astype('datetime64[D]').astype(np.int64)
+
+
+def add_months(day_number: np.array, months: np.array, day: np.array=None) -> np.array:
+    """
+    Adds months to day numbers like pd.DateOffset(months=...), the day of the month being clipped to the length of the
+    resulting month. The day of the month can be overridden by day (e.g. 31 for the end of the month, 0 to keep the day).
+    """
+    year, month, day_of_month = year_month_day(day_number)
+    month_index = (year.astype(np.int64) - 1677) * 12 + month - 1 + np.asarray(months, dtype=np.int64)
+    month_start = _month_start_table()
+    if not ((0 <= month_index) & (month_index < len(month_start) - 1)).all():
+        raise ValueError("Dates must be within the pd.Timestamp range")
+    days_in_month = month_start[month_index + 1] - month_start[month_index]
+    if day is not None:
+        day_of_month = np.where(np.asarray(day) > 0, day, day_of_month)
+    return (month_start[month_index] + np.minimum(day_of_month, days_in_month) - 1).astype(np.int32)
+
+
+if __name__ == "__main__":
+    dates = pd.date_range('2000-01-01', '2050-12-31', freq='D')
+    t1 = time.time()
+    day_number = to_day_number(dates)
+    year, month, day = year_month_day(day_number)
+    t2 = time.time()
+    print('Day numbers and year/month/day of', len(dates), 'dates:', round(t2-t1, 5), 's')
+    assert (year == dates.year).all() and (month == dates.month).all() and (day == dates.day).all()
+    assert (day_number_to_datetimeindex(day_number) == dates).all()
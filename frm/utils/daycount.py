@@ -3,11 +3,12 @@ import os
 if __name__ == "__main__":
     os.chdir(os.environ.get('PROJECT_DIR_FRM')) 
 
-import calendar
 import datetime as dt
+import functools
 import numpy as np
 import pandas as pd
 from frm.enums.utils import DayCountBasis
+from frm.utils.day_number import FIRST_DAY, to_day_number, year_month_day, is_last_day_of_month, _civil_tables
 
             
 def convert_to_same_shape_DatetimeIndex(start_date, end_date):
@@ -20,108 +21,95 @@ def convert_to_same_shape_DatetimeIndex(start_date, end_date):
         scalar_output = False
     
     if len(start_DatetimeIndex) == 1 and len(end_DatetimeIndex) > 1:
-        start_DatetimeIndex = pd.DatetimeIndex([start_DatetimeIndex.values[0] for _ in range(len(end_DatetimeIndex))])
+        start_DatetimeIndex = pd.DatetimeIndex(np.repeat(start_DatetimeIndex.values, len(end_DatetimeIndex)))
     elif len(start_DatetimeIndex) > 1 and len(end_DatetimeIndex) == 1:
-        end_DatetimeIndex = pd.DatetimeIndex([end_DatetimeIndex.values[0] for _ in range(len(start_DatetimeIndex))])
+        end_DatetimeIndex = pd.DatetimeIndex(np.repeat(end_DatetimeIndex.values, len(start_DatetimeIndex)))
     
     return start_DatetimeIndex, end_DatetimeIndex, scalar_output
 
 
+def convert_to_same_shape_day_number(start_date, end_date) -> (np.array, np.array, bool):
+    # The int32 day numbers of the start and end dates, broadcast to the same length
+    start_day_number = to_day_number(start_date)
+    end_day_number = to_day_number(end_date)
+    scalar_output = len(start_day_number) == 1 and len(end_day_number) == 1
+    start_day_number, end_day_number = np.broadcast_arrays(start_day_number, end_day_number)
+    return start_day_number, end_day_number, scalar_output
+
+
 def day_count(start_date,
               end_date, 
               day_count_basis: DayCountBasis,
               is_end_date_on_termination: bool=None)->np.array:
     # If the start_date and end_date are scalars assumption is end_date is the termination date
     # If end_date is a vector, the final value of the vector is assumed to be the termination date
+    start_day_number, end_day_number, scalar_output = convert_to_same_shape_day_number(start_date, end_date)
+    result = day_count_from_day_number(start_day_number, end_day_number, day_count_basis, is_end_date_on_termination)
+    if scalar_output:
+        return result.item()
+    else:
+        return result
+
+
+def day_count_from_day_number(start_day_number: np.array,
+                              end_day_number: np.array,
+                              day_count_basis: DayCountBasis,
+                              is_end_date_on_termination: bool=None) -> np.array:
+    # day_count() on int32 day numbers (frm.utils.day_number), of the same shape or broadcastable
     
     # References
     # [1] The excel file "30-360-2006ISDADefs" sourced from https://www.isda.org/2008/12/22/30-360-day-count-conventions/
     #     Saved to  WayBackMachine on 23 September 2024, https://web.archive.org/web/20240923055727/https://www.isda.org/2008/12/22/30-360-day-count-conventions/
         
-    start_DatetimeIndex, end_DatetimeIndex, scalar_output = convert_to_same_shape_DatetimeIndex(start_date, end_date)
+    start_day_number, end_day_number = np.broadcast_arrays(np.atleast_1d(start_day_number), np.atleast_1d(end_day_number))
     
-    assert (start_DatetimeIndex <= end_DatetimeIndex).all()
+    assert (start_day_number <= end_day_number).all()
     
     if day_count_basis in {DayCountBasis.ACT_360, DayCountBasis.ACT_365, DayCountBasis.ACT_ACT, DayCountBasis.ACT_366}:
         # Act = the actual number of days between the dates
-        result = (end_DatetimeIndex - start_DatetimeIndex).days.values
+        return (end_day_number - start_day_number).astype(np.int64)
+
+    year1, month1, DAY1 = year_month_day(start_day_number)
+    year2, month2, DAY2 = year_month_day(end_day_number)
     
-    elif day_count_basis == DayCountBasis._30_360:
+    if day_count_basis == DayCountBasis._30_360:
         # Logic for "30/360" / "360/360" / "Bond Basis" is defined in tab "30-360 Bond Basis" in reference [1]
         
         # If (DAY1=31), Set D1=30, Otherwise set D1=DAY1
-        DAY1 = start_DatetimeIndex.day
         d1 = np.where(DAY1 == 31, 30, DAY1) 	
         
         # If (DAY2=31) and (DAY1=30 or 31), Then set D2=30, Otherwise set D2=DAY2	
-        DAY2 = end_DatetimeIndex.day
         mask = np.logical_and(d1 == 30, DAY2 == 31)
         d2 = np.where(mask, 30, DAY2)
-        
-        result = 360*(end_DatetimeIndex.year - start_DatetimeIndex.year) \
-               + 30*(end_DatetimeIndex.month - start_DatetimeIndex.month) \
-               + d2 - d1
-        result = result.values
     
     elif day_count_basis == DayCountBasis._30E_360:
         # Logic for "30/360E" / "Eurobond Basis" is defined in tab "30E-360 Eurobond" in reference [1]
         
         # If (DAY1=31), Set D1=30, Otherwise set D1=DAY1
-        DAY1 = start_DatetimeIndex.day
         d1 = np.where(DAY1 == 31, 30, DAY1) 	            
 
         # If (DAY2=31), Then set D2=30, Otherwise set D2=DAY2	
-        DAY2 = end_DatetimeIndex.day
         d2 = np.where(DAY2 == 31, 30, DAY2) 	
-        
-        result = 360 * (end_DatetimeIndex.year - start_DatetimeIndex.year) \
-               + 30 * (end_DatetimeIndex.month - start_DatetimeIndex.month) \
-               + d2 - d1
-        result = result.values
                
     elif day_count_basis == DayCountBasis._30E_360_ISDA:
         # Logic for 30E/360 (ISDA)" is defined in tab "30E-360 ISDA" in [1]
         
-        # Returns TRUE/FALSE if datetime is the last day of February
-        def _is_last_day_of_feb(datetime):
-            if datetime.month == 2:
-                _, last_of_month = calendar.monthrange(datetime.year, datetime.month)
-                if datetime.day == last_of_month:
-                    return True
-            return False
-
-        def _apply_logic(start_date, end_date, is_end_date_on_termination):
-            # If (DAY1=31) or (DAY1 is last day of February), Set D1=30, Otherwise set D1=DAY1	
-            if start_date.day == 31 or _is_last_day_of_feb(start_date):
-                d1 = 30
-            else:
-                d1 = start_date.day
-    
-            # If (DAY2=31) or (DAY2 is last day of February but not the Termination Date), Then set D2=30, Otherwise set D2=DAY2
-            if end_date.day == 31 or (_is_last_day_of_feb(end_date) and not is_end_date_on_termination):
-                d2 = 30
-            else:
-                d2 = end_date.day
-    
-            result = 360 * (end_date.year - start_date.year) \
-                     + 30 * (end_date.month - start_date.month) \
-                     + d2 - d1
-            return result
-        
+        N = len(end_day_number)
         if is_end_date_on_termination is None:
-            N = len(end_DatetimeIndex)
-            is_end_date_on_termination = [False if i < (N-1)  else True for i in range(N)]
+            is_end_date_on_termination = np.arange(N) == N - 1
         else:
-            is_end_date_on_termination = np.atleast_1d(is_end_date_on_termination)
+            is_end_date_on_termination = np.broadcast_to(np.atleast_1d(is_end_date_on_termination).astype(bool), (N,))
 
-        result = np.array([_apply_logic(start, end, flag) for start, end, flag in zip(start_DatetimeIndex, end_DatetimeIndex, is_end_date_on_termination)])               
+        # If (DAY1=31) or (DAY1 is last day of February), Set D1=30, Otherwise set D1=DAY1
+        d1 = np.where((DAY1 == 31) | ((month1 == 2) & is_last_day_of_month(start_day_number)), 30, DAY1)
+
+        # If (DAY2=31) or (DAY2 is last day of February but not the Termination Date), Then set D2=30, Otherwise set D2=DAY2
+        mask = (DAY2 == 31) | ((month2 == 2) & is_last_day_of_month(end_day_number) & ~is_end_date_on_termination)
+        d2 = np.where(mask, 30, DAY2)
     else:
         raise ValueError
     
-    if scalar_output:
-        return result.item()
-    else:
-        return result
+    return (360 * (year2 - year1) + 30 * (month2 - month1) + d2 - d1).astype(np.int64)
 
 
 def year_fraction(start_date,
@@ -131,39 +119,58 @@ def year_fraction(start_date,
     
     # If the start_date and end_date are scalars assumption is end_date is the termination date
     # If end_date is a vector, the final value of the vector is assumed to be the termination date
+    start_day_number, end_day_number, scalar_output = convert_to_same_shape_day_number(start_date, end_date)
+    result = year_fraction_from_day_number(start_day_number, end_day_number, day_count_basis, is_end_date_on_termination)
+    if scalar_output:
+        return result.item()
+    elif day_count_basis == DayCountBasis.ACT_ACT:
+        return pd.Index(result)
+    else:
+        return result
+
+
+def year_fraction_from_day_number(start_day_number: np.array,
+                                  end_day_number: np.array,
+                                  day_count_basis: DayCountBasis,
+                                  is_end_date_on_termination: bool=None) -> np.array:
+    # year_fraction() on int32 day numbers (frm.utils.day_number), of the same shape or broadcastable
 
     if day_count_basis in {DayCountBasis._30_360, DayCountBasis._30E_360, DayCountBasis._30E_360_ISDA, DayCountBasis.ACT_360}:
-        return day_count(start_date, end_date, day_count_basis, is_end_date_on_termination) / 360.0
+        return day_count_from_day_number(start_day_number, end_day_number, day_count_basis, is_end_date_on_termination) / 360.0
     
     elif day_count_basis == DayCountBasis.ACT_365:
-        return day_count(start_date, end_date, day_count_basis, is_end_date_on_termination) / 365.0        
+        return day_count_from_day_number(start_day_number, end_day_number, day_count_basis, is_end_date_on_termination) / 365.0        
 
     elif day_count_basis == DayCountBasis.ACT_366:
-        return day_count(start_date, end_date, day_count_basis, is_end_date_on_termination) / 366.0 
+        return day_count_from_day_number(start_day_number, end_day_number, day_count_basis, is_end_date_on_termination) / 366.0 
     
     elif day_count_basis == DayCountBasis.ACT_ACT:
-        start_DatetimeIndex, end_DatetimeIndex, scalar_output  = convert_to_same_shape_DatetimeIndex(start_date, end_date)
-        assert (start_DatetimeIndex <= end_DatetimeIndex).all()
-        
-        start_year = start_DatetimeIndex.year
-        end_year = end_DatetimeIndex.year
-        year_1_diff = 365 + start_year.map(calendar.isleap)
-        year_2_diff = 365 + end_year.map(calendar.isleap) 
-        
-        total_sum = end_year - start_year - 1
-        diff_first = pd.DatetimeIndex([dt.datetime(v + 1, 1, 1) for v in start_year]) - start_DatetimeIndex
-        total_sum += diff_first.days / year_1_diff
-        diff_second = end_DatetimeIndex - pd.DatetimeIndex([dt.datetime(v, 1, 1) for v in end_year]) 
-        total_sum += diff_second.days / year_2_diff
-
-        if scalar_output:
-            return total_sum.item()
-        else:
-            return total_sum
+        start_day_number, end_day_number = np.broadcast_arrays(np.atleast_1d(start_day_number), np.atleast_1d(end_day_number))
+        assert (start_day_number <= end_day_number).all()
+
+        # ACT/ACT ISDA: the days in each calendar year divided by the days in that year, i.e. the difference of the
+        # (year, fraction of the year elapsed) of the dates, looked up by day number. Correct for any span of years.
+        year, fraction_of_year_elapsed = _act_act_tables()
+        start_idx = start_day_number - FIRST_DAY
+        end_idx = end_day_number - FIRST_DAY
+        return (year[end_idx] - year[start_idx]) + (fraction_of_year_elapsed[end_idx] - fraction_of_year_elapsed[start_idx])
     else:
         raise ValueError
 
 
+@functools.lru_cache(maxsize=None)
+def _act_act_tables() -> (np.array, np.array):
+    # The year and the fraction of the year elapsed, (date - 1st of January) / days in the year, of each day of the
+    # day number tables (1677 to 2262), indexed by the day number less FIRST_DAY.
+    year, month, day = _civil_tables()
+    day_number = np.arange(FIRST_DAY, FIRST_DAY + len(year))
+    first_of_january = np.arange(1677 - 1970, 2265 - 1970).astype('datetime64[Y]').astype('datetime64[D]').astype(np.int64)
+    days_in_year = np.diff(first_of_january)
+    idx = year.astype(np.int64) - 1677
+    fraction_of_year_elapsed = (day_number - first_of_january[idx]) / days_in_year[idx]
+    return year.astype(np.float64), fraction_of_year_elapsed
+
+
 def to_datetimeindex(date_object) -> 'pd.DatetimeIndex':
     """
     Converts a date-like object to a pandas DatetimeIndex.
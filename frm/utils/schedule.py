@@ -3,10 +3,18 @@ import os
 if __name__ == "__main__":
     os.chdir(os.environ.get('PROJECT_DIR_FRM'))
     
+import functools
 import numpy as np
 import pandas as pd
+from dataclasses import dataclass
 from typing import List, Tuple, Optional
+import time
 from frm.enums.utils import RollConvention, TimingConvention, StubType, PeriodFrequency, DayRoll
+from frm.utils.day_number import NS_PER_DAY, to_day_number, day_number_to_datetimeindex, year_month_day, add_months
+from frm.utils.business_day_index import get_business_day_index, calendar_fingerprint, busdaycal_from_fingerprint
+
+
+SCHEDULE_CACHE_SIZE = 4096 # Max number of distinct schedules held by get_schedule_cached()
 
 
 def set_default(value, default):
@@ -50,12 +58,12 @@ def get_payment_dates(
     # Add the payment dates
     match payment_timing:
         case TimingConvention.IN_ARREARS:
-            dates = schedule['period_end'].to_numpy(dtype='datetime64[D]')
+            day_number = to_day_number(schedule['period_end'])
         case TimingConvention.IN_ADVANCE:
-            dates = schedule['period_start'].to_numpy(dtype='datetime64[D]')
+            day_number = to_day_number(schedule['period_start'])
 
-    dates_np = np.busday_offset(dates, offsets=payment_delay, roll=roll_convention.value, busdaycal=busdaycal)
-    return pd.DatetimeIndex(dates_np).astype('datetime64[ns]')
+    day_number = get_business_day_index(busdaycal).offset(day_number, offsets=payment_delay, roll=roll_convention.value)
+    return day_number_to_datetimeindex(day_number)
 
 # include_payment_dates, payment_delay, payment_type, payment_roll_convention
 # - inherit from schedule: busdaycal
@@ -96,12 +104,12 @@ def get_fixing_dates(
     # Add the payment dates
     match fixing_timing:
         case TimingConvention.IN_ARREARS:
-            dates = schedule['period_end'].to_numpy(dtype='datetime64[D]')
+            day_number = to_day_number(schedule['period_end'])
         case TimingConvention.IN_ADVANCE:
-            dates = schedule['period_start'].to_numpy(dtype='datetime64[D]')
+            day_number = to_day_number(schedule['period_start'])
 
-    dates_np = np.busday_offset(dates, offsets=-1*fixing_days_ahead, roll=roll_convention.value, busdaycal=busdaycal)
-    return pd.DatetimeIndex(dates_np).astype('datetime64[ns]')
+    day_number = get_business_day_index(busdaycal).offset(day_number, offsets=-1*fixing_days_ahead, roll=roll_convention.value)
+    return day_number_to_datetimeindex(day_number)
 
 
 def get_schedule(
@@ -338,6 +346,63 @@ def get_schedule(
     return schedule
 
 
+@functools.lru_cache(maxsize=SCHEDULE_CACHE_SIZE)
+def _get_schedule_day_numbers(*args, fingerprint: tuple) -> Tuple[np.array, np.array]:
+    schedule = get_schedule(*args, busdaycal=busdaycal_from_fingerprint(fingerprint))
+    period_start = to_day_number(schedule['period_start'])
+    period_end = to_day_number(schedule['period_end'])
+    period_start.setflags(write=False) # Shared by every caller with the same arguments
+    period_end.setflags(write=False)
+    return period_start, period_end
+
+
+def get_schedule_cached(
+        start_date: pd.Timestamp,
+        end_date: pd.Timestamp,
+        frequency: PeriodFrequency,
+        roll_convention: RollConvention=RollConvention.MODIFIED_FOLLOWING,
+        day_roll: DayRoll=DayRoll.NONE,
+        first_cpn_end_date: Optional[pd.Timestamp]=None,
+        last_cpn_start_date: Optional[pd.Timestamp]=None,
+        first_stub_type: StubType=StubType.DEFAULT,
+        last_stub_type: StubType=StubType.DEFAULT,
+        roll_user_specified_dates: bool=False,
+        busdaycal: np.busdaycalendar=np.busdaycalendar(),
+        ) -> pd.DataFrame:
+    """
+    get_schedule() memoised by the content of its arguments, the busdaycal by its weekmask and holidays, so trades
+    with the same schedule parameters share one schedule. The last SCHEDULE_CACHE_SIZE distinct schedules are cached
+    as read-only day number arrays (see get_schedule_day_numbers()). Each call returns a new DataFrame, as get_schedule().
+    """
+    period_start, period_end = get_schedule_day_numbers(
+        start_date, end_date, frequency, roll_convention, day_roll, first_cpn_end_date, last_cpn_start_date,
+        first_stub_type, last_stub_type, roll_user_specified_dates, busdaycal)
+    return pd.DataFrame({'period_start': day_number_to_datetimeindex(period_start),
+                         'period_end': day_number_to_datetimeindex(period_end)})
+
+
+def get_schedule_day_numbers(
+        start_date: pd.Timestamp,
+        end_date: pd.Timestamp,
+        frequency: PeriodFrequency,
+        roll_convention: RollConvention=RollConvention.MODIFIED_FOLLOWING,
+        day_roll: DayRoll=DayRoll.NONE,
+        first_cpn_end_date: Optional[pd.Timestamp]=None,
+        last_cpn_start_date: Optional[pd.Timestamp]=None,
+        first_stub_type: StubType=StubType.DEFAULT,
+        last_stub_type: StubType=StubType.DEFAULT,
+        roll_user_specified_dates: bool=False,
+        busdaycal: np.busdaycalendar=np.busdaycalendar(),
+        ) -> Tuple[np.array, np.array]:
+    """
+    The period start and end dates of get_schedule() as int32 day numbers (frm.utils.day_number), from the schedule
+    cache. The arrays are read-only and shared between all calls with the same arguments.
+    """
+    return _get_schedule_day_numbers(
+        start_date, end_date, frequency, roll_convention, day_roll, first_cpn_end_date, last_cpn_start_date,
+        first_stub_type, last_stub_type, roll_user_specified_dates, fingerprint=calendar_fingerprint(busdaycal))
+
+
 def generate_date_schedule(
         start_date: pd.Timestamp, 
         end_date: pd.Timestamp, 
@@ -383,10 +448,11 @@ def generate_date_schedule(
           E.g. Wrap with fields with Optional[] and set defaults in function from enum.set_default()
     """
     
+    business_day_index = get_business_day_index(busdaycal)
+
     def busday_offset_timestamp(pd_timestamp, offsets, roll, busdaycal):
-        np_datetime64D = np.array([pd_timestamp]).astype('datetime64[D]')
-        rolled_date_np = np.busday_offset(np_datetime64D, offsets=offsets, roll=roll, busdaycal=busdaycal)[0]
-        return pd.Timestamp(rolled_date_np)
+        day_number = business_day_index.offset_day(pd_timestamp.value // NS_PER_DAY, offsets, roll)
+        return pd.Timestamp(day_number * NS_PER_DAY)
     
     def apply_specific_day_roll(pd_timestamp: pd.Timestamp,
                                 specific_day_roll: DayRoll) -> pd.Timestamp:
@@ -453,6 +519,266 @@ def generate_date_schedule(
     return start_dates, end_dates
     
 
+@dataclass
+class ScheduleBatch:
+    """
+    The schedules of many trades in flat (ragged) columns, as created by get_schedules(). The periods of trade i are
+    the rows trade_offsets[i] to trade_offsets[i+1] - 1 of period_start and period_end.
+
+    Parameters:
+    period_start (np.array): int32 day numbers (frm.utils.day_number) of the period start dates.
+    period_end (np.array): int32 day numbers of the period end dates.
+    trade_offsets (np.array): The first row of each trade, of length nb_trades + 1.
+    """
+    period_start: np.array
+    period_end: np.array
+    trade_offsets: np.array
+
+    @property
+    def nb_trades(self) -> int:
+        return len(self.trade_offsets) - 1
+
+    @property
+    def trade(self) -> np.array:
+        """The trade of each row."""
+        return np.repeat(np.arange(self.nb_trades), np.diff(self.trade_offsets))
+
+    def get_schedule(self, i: int) -> pd.DataFrame:
+        """
+        The schedule of trade i, with the dates of get_schedule(). The columns are always datetime64[ns], whereas
+        get_schedule() keeps the resolution of its input dates.
+        """
+        rows = slice(self.trade_offsets[i], self.trade_offsets[i + 1])
+        return pd.DataFrame({'period_start': day_number_to_datetimeindex(self.period_start[rows]),
+                             'period_end': day_number_to_datetimeindex(self.period_end[rows])})
+
+    def to_frame(self) -> pd.DataFrame:
+        """The schedules of all trades, with columns 'trade', 'period_start' and 'period_end' (datetime64[ns])."""
+        return pd.DataFrame({'trade': self.trade,
+                             'period_start': day_number_to_datetimeindex(self.period_start),
+                             'period_end': day_number_to_datetimeindex(self.period_end)})
+
+
+def _per_trade(value, nb_trades: int) -> list:
+    # One value per trade, from a single value for all trades or a sequence of values
+    if isinstance(value, (list, tuple, np.ndarray, pd.Series, pd.Index)):
+        if len(value) != nb_trades:
+            raise ValueError(f"Expected {nb_trades} values, got {len(value)}")
+        return list(value)
+    return [value] * nb_trades
+
+
+def _is_missing(date) -> bool:
+    return date is None or pd.isna(date)
+
+
+def _roll_per_convention(business_day_index, day_number: np.array, roll_code: np.array, rolls: np.array) -> np.array:
+    # One bulk roll per distinct roll convention, rolls[roll_code] being the roll of each date
+    rolled = np.empty_like(day_number)
+    for code, roll in enumerate(rolls):
+        mask = roll_code == code
+        rolled[mask] = business_day_index.roll(day_number[mask], roll)
+    return rolled
+
+
+def _generate_interior_dates(
+        start: np.array,
+        end: np.array,
+        months: np.array,
+        days: np.array,
+        forward: np.array,
+        day_roll: np.array,
+        roll_code: np.array,
+        rolls: np.array,
+        business_day_index,
+    ) -> Tuple[np.array, np.array, np.array]:
+    """
+    The dates generate_date_schedule() generates between the start and end dates, for many trades at once.
+
+    The k-th date of a trade is the anchor date (start_date forward, end_date backward) moved by k periods, day rolled
+    and rolled to a business day. The dates are generated for k up to past the other date, then truncated at the first
+    date that is not strictly between the start and end dates.
+
+    Returns:
+    Tuple[np.array, np.array, np.array]: The dates of all trades in ascending order per trade, the number of dates of
+        each trade, and False for trades not truncated within the generated dates (to be created one at a time).
+    """
+    if len(start) == 0:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+    sign = np.where(forward, 1, -1)
+    start_year, start_month, _ = year_month_day(start)
+    end_year, end_month, _ = year_month_day(end)
+    nb_months = (end_year - start_year) * 12 + end_month - start_month
+    nb_steps = np.where(months > 0, nb_months // np.maximum(months, 1), (end - start) // np.maximum(days, 1)) + 3
+
+    trade = np.repeat(np.arange(len(start)), nb_steps)
+    first_row = np.concatenate([[0], np.cumsum(nb_steps)[:-1]])
+    k = np.arange(len(trade)) - first_row[trade] + 1
+
+    # Unadjusted dates, the k-th multiple of the period from the anchor date (as frequency.multiply_date_offset(k))
+    anchor = np.where(forward, start, end)[trade]
+    is_monthly = (months > 0)[trade]
+    unadjusted = np.where(is_monthly, 0, anchor + (sign * days)[trade] * k).astype(np.int32)
+    unadjusted[is_monthly] = add_months(anchor[is_monthly], (sign * months)[trade][is_monthly] * k[is_monthly])
+
+    # The first date is rolled then day rolled, the others are day rolled then rolled
+    if day_roll.any():
+        day_roll = day_roll[trade]
+        is_first = k == 1
+        rolled = _roll_per_convention(business_day_index, np.where(is_first, unadjusted, add_months(unadjusted, 0, day_roll)),
+                                      roll_code[trade], rolls)
+        adjusted = np.where(is_first, add_months(rolled, 0, day_roll), rolled)
+    else:
+        adjusted = _roll_per_convention(business_day_index, unadjusted, roll_code[trade], rolls)
+
+    in_schedule = np.where(forward[trade], adjusted < end[trade], adjusted > start[trade])
+    first_excluded = np.minimum.reduceat(np.where(in_schedule, k.max() + 1, k), first_row)
+    truncated = first_excluded <= nb_steps
+    keep = k < first_excluded[trade]
+
+    # Ascending order per trade, reversing the backward generated dates
+    order = np.lexsort(((sign[trade] * k)[keep], trade[keep]))
+    return adjusted[keep][order], np.bincount(trade[keep], minlength=len(start)), truncated
+
+
+def get_schedules(
+        start_dates,
+        end_dates,
+        frequencies,
+        roll_conventions=RollConvention.MODIFIED_FOLLOWING,
+        day_rolls=DayRoll.NONE,
+        first_cpn_end_dates=None,
+        last_cpn_start_dates=None,
+        first_stub_types=StubType.DEFAULT,
+        last_stub_types=StubType.DEFAULT,
+        roll_user_specified_dates: bool=False,
+        busdaycal: np.busdaycalendar=np.busdaycalendar(),
+        ) -> ScheduleBatch:
+    """
+    Creates the schedules of many trades, the schedule of each trade being that of get_schedule(). The dates of all
+    trades are generated at once, with month arithmetic on day numbers and one business day roll per roll convention.
+
+    Parameters
+    ----------
+    start_dates, end_dates :
+        The effective and expiration dates of the trades, of any type accepted by to_day_number().
+    frequencies, roll_conventions, day_rolls, first_cpn_end_dates, last_cpn_start_dates, first_stub_types, last_stub_types :
+        As per get_schedule(), each either a single value for all trades or a sequence with one value per trade.
+        Missing first_cpn_end_dates/last_cpn_start_dates are None or pd.NaT.
+    roll_user_specified_dates : bool
+        As per get_schedule(), for all trades.
+    busdaycal : np.busdaycalendar
+        The business day calendar of all trades.
+
+    Returns
+    -------
+    ScheduleBatch
+
+    Trades with a first_cpn_end_date or last_cpn_start_date, and invalid trades, are created by get_schedule() one at
+    a time, so they raise the same errors.
+    """
+    start = to_day_number(start_dates)
+    end = to_day_number(end_dates)
+    nb_trades = len(start)
+    if len(end) != nb_trades:
+        raise ValueError(f"Expected {nb_trades} end_dates, got {len(end)}")
+
+    frequencies = _per_trade(frequencies, nb_trades)
+    roll_conventions = _per_trade(roll_conventions, nb_trades)
+    day_rolls = _per_trade(day_rolls, nb_trades)
+    first_cpn_end_dates = _per_trade(first_cpn_end_dates, nb_trades)
+    last_cpn_start_dates = _per_trade(last_cpn_start_dates, nb_trades)
+    first_stub_types = _per_trade(first_stub_types, nb_trades)
+    last_stub_types = _per_trade(last_stub_types, nb_trades)
+
+    # Period of each frequency in months or days (the zero coupon frequency has neither)
+    period = {f: (12 * f.date_offset.kwds.get('years', 0) + f.date_offset.kwds.get('months', 0),
+                  7 * f.date_offset.kwds.get('weeks', 0) + f.date_offset.kwds.get('days', 0))
+              if f.date_offset is not None else (0, 0) for f in set(frequencies)}
+    months, days = np.array([period[f] for f in frequencies], dtype=np.int64).reshape(-1, 2).T
+    day_roll = np.array([31 if d == DayRoll.EOM else (d.value or 0) for d in day_rolls], dtype=np.int64)
+    roll_code, rolls = pd.factorize(np.array([r.value for r in roll_conventions], dtype=object))
+
+    # Stub types of trades without first_cpn_end_date and last_cpn_start_date, per get_schedule()
+    first_stub = np.array([s.value for s in first_stub_types], dtype=object)
+    last_stub = np.array([s.value for s in last_stub_types], dtype=object)
+    both_default = (first_stub == StubType.DEFAULT.value) & (last_stub == StubType.DEFAULT.value)
+    valid_stub = ((first_stub == StubType.DEFAULT.value) | (last_stub == StubType.DEFAULT.value)) \
+        & (first_stub != StubType.DEFINED_PER_FIRST_CPN_END_DATE.value) & (last_stub != StubType.DEFINED_PER_LAST_CPN_START_DATE.value)
+    first_stub = np.where(both_default, StubType.market_convention().value,
+                          np.where(first_stub == StubType.DEFAULT.value, StubType.NONE.value, first_stub))
+    last_stub = np.where(last_stub == StubType.DEFAULT.value, StubType.NONE.value, last_stub)
+    backward = last_stub == StubType.NONE.value
+    forward = ~backward & (first_stub == StubType.NONE.value)
+
+    explicit = np.array([not (_is_missing(f) and _is_missing(l)) for f, l in zip(first_cpn_end_dates, last_cpn_start_dates)], dtype=bool)
+    zero_coupon = (months == 0) & (days == 0)
+    single_period = ~explicit & (start < end) & zero_coupon
+    generated = ~explicit & (start < end) & ~zero_coupon & valid_stub & (backward | forward)
+
+    # Generate the dates between the start and end dates and combine the periods of long stubs
+    business_day_index = get_business_day_index(busdaycal)
+    g = np.flatnonzero(generated)
+    interior, nb_interior, truncated = _generate_interior_dates(
+        start[g], end[g], months[g], days[g], forward[g], day_roll[g], roll_code[g], rolls, business_day_index)
+    merge_first = (backward & (first_stub == StubType.LONG.value))[g]
+    merge_last = (forward & (last_stub == StubType.LONG.value))[g]
+    interior_offsets = np.concatenate([[0], np.cumsum(nb_interior)])
+    drop = np.zeros(len(interior), dtype=bool)
+    drop[interior_offsets[:-1][merge_first & (nb_interior > 0)]] = True
+    drop[interior_offsets[1:][merge_last & (nb_interior > 0)] - 1] = True
+    valid = truncated & ~((merge_first | merge_last) & (nb_interior == 0))
+    generated[g[~valid]] = False
+    keep = ~drop & np.repeat(valid, nb_interior)
+    interior = interior[keep]
+    nb_interior = (nb_interior - (merge_first | merge_last))[valid]
+    g = g[valid]
+
+    # Boundary dates [start_date] + interior dates + [end_date] of the generated and single period trades
+    start_in_schedule = start.copy()
+    end_in_schedule = end.copy()
+    if roll_user_specified_dates:
+        start_in_schedule[g] = _roll_per_convention(business_day_index, start[g], roll_code[g], rolls)
+        end_in_schedule[g] = _roll_per_convention(business_day_index, end[g], roll_code[g], rolls)
+    nb_periods = np.zeros(nb_trades, dtype=np.int64)
+    nb_periods[g] = nb_interior + 1
+    nb_periods[single_period] = 1
+
+    # Trades created one at a time
+    schedules = {}
+    for i in np.flatnonzero(~generated & ~single_period):
+        schedules[i] = get_schedule(
+            start_date=pd.Timestamp(int(start[i]) * NS_PER_DAY), end_date=pd.Timestamp(int(end[i]) * NS_PER_DAY),
+            frequency=frequencies[i], roll_convention=roll_conventions[i], day_roll=day_rolls[i],
+            first_cpn_end_date=None if _is_missing(first_cpn_end_dates[i]) else pd.Timestamp(first_cpn_end_dates[i]),
+            last_cpn_start_date=None if _is_missing(last_cpn_start_dates[i]) else pd.Timestamp(last_cpn_start_dates[i]),
+            first_stub_type=first_stub_types[i], last_stub_type=last_stub_types[i],
+            roll_user_specified_dates=roll_user_specified_dates, busdaycal=busdaycal)
+        nb_periods[i] = len(schedules[i])
+
+    trade_offsets = np.concatenate([[0], np.cumsum(nb_periods)])
+    period_start = np.empty(trade_offsets[-1], dtype=np.int32)
+    period_end = np.empty(trade_offsets[-1], dtype=np.int32)
+
+    s = np.flatnonzero(single_period)
+    period_start[trade_offsets[s]] = start[s]
+    period_end[trade_offsets[s]] = end[s]
+
+    # Period i of a generated trade starts on boundary date i and ends on boundary date i + 1
+    period_start[trade_offsets[g]] = start_in_schedule[g]
+    period_end[trade_offsets[g + 1] - 1] = end_in_schedule[g]
+    rank = np.arange(len(interior)) - np.repeat(np.concatenate([[0], np.cumsum(nb_interior)[:-1]]), nb_interior)
+    row = np.repeat(trade_offsets[g], nb_interior) + rank
+    period_end[row] = interior
+    period_start[row + 1] = interior
+
+    for i, schedule in schedules.items():
+        period_start[trade_offsets[i]:trade_offsets[i + 1]] = to_day_number(schedule['period_start'])
+        period_end[trade_offsets[i]:trade_offsets[i + 1]] = to_day_number(schedule['period_end'])
+
+    return ScheduleBatch(period_start=period_start, period_end=period_end, trade_offsets=trade_offsets)
+
+
 def create_date_grid_for_fx_exposures(curve_date: pd.Timestamp, 
                                       delivery_dates: np.array, 
                                       sampling_freq: str=None,
@@ -540,3 +866,20 @@ def create_date_grid_for_fx_exposures(curve_date: pd.Timestamp,
     date_grid = date_grid.drop_duplicates().sort_values()
     return date_grid
 
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    start_dates = pd.DatetimeIndex(np.datetime64('2020-01-01') + rng.integers(0, 2000, 20_000))
+    end_dates = start_dates + pd.DateOffset(years=10)
+    t1 = time.time()
+    batch = get_schedules(start_dates, end_dates, PeriodFrequency.QUARTERLY)
+    t2 = time.time()
+    schedules = [get_schedule(start_dates[i], end_dates[i], PeriodFrequency.QUARTERLY) for i in range(1000)]
+    t3 = time.time()
+    assert all(batch.get_schedule(i).equals(schedules[i]) for i in range(1000))
+    print('Schedules of', batch.nb_trades, 'trades:', round(t2-t1, 4), 's vs', round(t3-t2, 4), 's for 1000 trades with get_schedule()')
+
+    t1 = time.time()
+    schedules = [get_schedule_cached(start_dates[i % 4], end_dates[i % 4], PeriodFrequency.QUARTERLY) for i in range(1000)]
+    t2 = time.time()
+    print('1000 trades with 4 distinct schedules with get_schedule_cached():', round(t2-t1, 4), 's')
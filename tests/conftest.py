@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+# Curve and instrument factories shared by the term structure and pricing engine tests. Each fixture returns the
+# factory, so that tests can build curves for several interpolation methods.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from frm.enums.utils import CompoundingFrequency
+from frm.term_structures.zero_curve import ZeroCurve
+from frm.term_structures.zero_curve_bootstrapper import Deposit, OISSwap
+
+
+@pytest.fixture
+def make_zero_curve():
+    # Pillars dated 1m to 50y, zero rates rising linearly from 3% to 4% (continuously compounded)
+    def make(interpolation_method: str, curve_date: pd.Timestamp=pd.Timestamp(2024, 1, 2)) -> ZeroCurve:
+        dates = pd.DatetimeIndex([curve_date + pd.DateOffset(months=m) for m in [1, 3, 6, 12, 24, 60, 120, 240, 360, 600]])
+        return ZeroCurve(curve_date=curve_date,
+                         data=pd.DataFrame({'date': dates, 'zero_rate': np.linspace(0.03, 0.04, len(dates))}),
+                         compounding_frequency=CompoundingFrequency.CONTINUOUS,
+                         interpolation_method=interpolation_method)
+    return make
+
+
+@pytest.fixture
+def make_hull_white_zero_curve():
+    # Pillars in years, 3m to 30y, on a smooth upward sloping curve, so the forward rate and its slope (θ) are smooth
+    def make(interpolation_method: str='cubic_spline_on_zero_rates') -> ZeroCurve:
+        years = np.array([0.25, 0.5, 1, 2, 3, 5, 7, 10, 15, 20, 30])
+        zero_rate = 0.03 + 0.01 * (1 - np.exp(-years / 5))
+        return ZeroCurve(curve_date=pd.Timestamp(2024, 1, 2),
+                         data=pd.DataFrame({'years': years, 'zero_rate': zero_rate}),
+                         compounding_frequency=CompoundingFrequency.CONTINUOUS,
+                         interpolation_method=interpolation_method)
+    return make
+
+
+@pytest.fixture
+def make_ois_instruments():
+    # The overnight deposit and 1m to 30y OIS swaps from the spot date, on a downward sloping curve
+    def make(curve_date: pd.Timestamp, spot_date: pd.Timestamp) -> list:
+        return [Deposit(curve_date, curve_date + pd.DateOffset(days=1), 0.0530)] \
+            + [OISSwap(spot_date, spot_date + pd.DateOffset(months=m), 0.0530 - 0.0004 * m ** 0.5, payment_delay=2) for m in [1, 3, 6]] \
+            + [OISSwap(spot_date, spot_date + pd.DateOffset(years=y), 0.0500 - 0.0010 * y ** 0.5, payment_delay=2) for y in [1, 2, 3, 5, 7, 10, 15, 20, 30]]
+    return make
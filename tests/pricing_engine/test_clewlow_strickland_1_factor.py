@@ -3,7 +3,7 @@ import os
 if __name__ == "__main__":
     os.chdir(os.environ.get('PROJECT_DIR_FRM')) 
 
-from frm.pricing_engine.clewlow_strickland_1_factor import clewlow_strickland_1_factor_simulate
+from frm.pricing_engine.clewlow_strickland_1_factor import clewlow_strickland_1_factor_simulate, clewlow_strickland_1_factor_simulate_exact
 
 import numpy as np
 from scipy.stats import norm
@@ -88,6 +88,62 @@ def test_cs1f_to_matlab_implementation(test_step_size=False):
             table.add_column("Put Error (%)", [round(p,2) for (c,p) in monte_carlo_errors])
             print(table)
                 
+
+
+def test_cs1f_exact_simulation_on_non_uniform_grid():
+    # The exact transition is unbiased for any step length, so simulate directly on a coarse, non-uniform grid
+    sigma = 0.04 # daily volatility
+    alpha = 0.06 # daily mean reversion
+    tau = np.array([0, 1, 2, 5, 10, 30, 61, 92, 183, 365, 730], dtype=np.float64)
+    forward_prices = np.array([53.5, 53.5, 50.5, 57.2, 61.9, 58.0, 55.8, 52.8, 59.0, 59.9, 57.5])
+    forward_curve = np.stack([tau, forward_prices], axis=1)
+    K = forward_prices[0]
+    nb_simulations = 100 * 1000
+
+    spot_px = clewlow_strickland_1_factor_simulate_exact(forward_curve=forward_curve,
+                                                         nb_simulations=nb_simulations,
+                                                         alpha=alpha,
+                                                         sigma=sigma)
+    assert spot_px.shape == (len(tau), nb_simulations)
+    assert (spot_px[0,:] == forward_prices[0]).all()
+
+    # E[S(t)] = F(0,t)
+    standard_error = spot_px.std(axis=1) / np.sqrt(nb_simulations)
+    assert (np.abs(spot_px.mean(axis=1) - forward_prices) <= 4 * standard_error + 1e-12).all()
+
+    # Var[ln S(t)] matches the Ornstein-Uhlenbeck variance
+    w = 0.5 * sigma**2 * (1 - np.exp(-2*alpha*tau)) / alpha
+    assert np.allclose(np.log(spot_px[1:]).var(axis=1), w[1:], rtol=0.02)
+
+    # (Undiscounted) European call prices vs analytical
+    h = (np.log(forward_prices[1:]) - np.log(K) + 0.5 * w[1:]) / np.sqrt(w[1:])
+    call_px_analytical = forward_prices[1:] * norm.cdf(h) - K * norm.cdf(h - np.sqrt(w[1:]))
+    payoff = np.maximum(0, spot_px[1:] - K)
+    call_px_mc = payoff.mean(axis=1)
+    assert (np.abs(call_px_mc - call_px_analytical) <= 4 * payoff.std(axis=1) / np.sqrt(nb_simulations)).all()
+
+    spot_px_T = clewlow_strickland_1_factor_simulate_exact(forward_curve, nb_simulations=10, alpha=alpha, sigma=sigma, T=100)
+    assert spot_px_T.shape == (8, 10)
+
+
+def test_cs1f_exact_simulation_without_mean_reversion():
+    # alpha=0 is the α→0 limit: ln S(t) has variance σ²t and E[S(t)] = F(0,t)
+    sigma = 0.3
+    tau = np.array([0, 0.25, 0.5, 1, 2], dtype=np.float64)
+    forward_prices = np.array([80.0, 81.0, 82.5, 83.0, 85.0])
+    forward_curve = np.stack([tau, forward_prices], axis=1)
+    nb_simulations = 100 * 1000
+
+    spot_px = clewlow_strickland_1_factor_simulate_exact(forward_curve, nb_simulations=nb_simulations, alpha=0.0, sigma=sigma)
+    assert np.isfinite(spot_px).all()
+    standard_error = spot_px.std(axis=1) / np.sqrt(nb_simulations)
+    assert (np.abs(spot_px.mean(axis=1) - forward_prices) <= 4 * standard_error + 1e-12).all()
+    assert np.allclose(np.log(spot_px[1:]).var(axis=1), sigma**2 * tau[1:], rtol=0.02)
+
+    # Continuous in alpha
+    spot_px_small_alpha = clewlow_strickland_1_factor_simulate_exact(forward_curve, nb_simulations=nb_simulations, alpha=1e-10, sigma=sigma)
+    assert np.allclose(spot_px, spot_px_small_alpha, rtol=1e-8)
+
         
 if __name__ == '__main__':
     print("Test includes impact of the step size on the accuracy - will take a couple minutes")
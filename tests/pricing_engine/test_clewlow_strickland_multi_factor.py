@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+
+from frm.pricing_engine.clewlow_strickland_multi_factor import forward_curve_pca, clewlow_strickland_multi_factor_simulate, \
+    clewlow_strickland_multi_factor_simulate_chunks
+
+
+def test_cs_multi_factor_simulation_one_factor_exponential_loading():
+    # With one factor σ(τ) = σ exp(-α τ), Var[ln F(t,T)] = σ² / (2α) * (exp(-2α(T-t)) - exp(-2αT)) for t <= T
+    sigma, alpha = 0.5, 1.5
+    maturities = np.array([0.25, 0.5, 1.0, 2.0])
+    forward_curve = np.stack([maturities, np.array([50.0, 52.0, 48.0, 45.0])], axis=1)
+    loading_times_to_maturity = np.linspace(0, 2, 201)
+    factor_loadings = sigma * np.exp(-alpha * loading_times_to_maturity)[:, np.newaxis]
+    simulation_times = np.array([0, 0.1, 0.25, 0.6, 1.0, 1.5])  # Non-uniform, with maturities between steps
+
+    nb_simulations = 100 * 1000
+    forward_px = clewlow_strickland_multi_factor_simulate(forward_curve=forward_curve,
+                                                          simulation_times=simulation_times,
+                                                          loading_times_to_maturity=loading_times_to_maturity,
+                                                          factor_loadings=factor_loadings,
+                                                          nb_simulations=nb_simulations,
+                                                          nb_simulations_per_chunk=30 * 1000)
+    assert forward_px.shape == (len(simulation_times), len(maturities), nb_simulations)
+
+    # Martingale
+    standard_error = forward_px.std(axis=2) / np.sqrt(nb_simulations)
+    assert (np.abs(forward_px.mean(axis=2) - forward_curve[:,1]) <= 4 * standard_error + 1e-12).all()
+
+    # Variance, with prices held constant after maturity
+    t = np.minimum(simulation_times[:, np.newaxis], maturities[np.newaxis, :])
+    variance = sigma ** 2 / (2 * alpha) * (np.exp(-2 * alpha * (maturities - t)) - np.exp(-2 * alpha * maturities))
+    assert np.allclose(np.log(forward_px[1:]).var(axis=2), variance[1:], rtol=0.02)
+
+    # Single factor, hence perfectly correlated log returns over the 1st step
+    log_returns = np.log(forward_px[1] / forward_px[0])
+    assert np.allclose(np.corrcoef(log_returns), 1.0, atol=1e-6)
+
+    # Streaming a selection of maturities gives the same result as the full simulation
+    for idx_start, idx_end, forward_px_chunk in clewlow_strickland_multi_factor_simulate_chunks(
+            forward_curve=forward_curve,
+            simulation_times=simulation_times,
+            loading_times_to_maturity=loading_times_to_maturity,
+            factor_loadings=factor_loadings,
+            nb_simulations=nb_simulations,
+            maturity_indices=[1, 3],
+            nb_simulations_per_chunk=30 * 1000):
+        assert forward_px_chunk.shape == (len(simulation_times), 2, idx_end - idx_start)
+        assert np.allclose(forward_px_chunk, forward_px[:, [1, 3], idx_start:idx_end], rtol=1e-12)
+
+
+def test_forward_curve_pca_recovers_factor_loadings():
+    tenors = np.linspace(0, 2, 9)
+    factor_loadings = np.stack([0.3 + 0.2 * np.exp(-tenors), 0.1 * (tenors - 1)], axis=1)
+    # Make the true loadings orthogonal, so they are the principal components up to sign
+    factor_loadings[:, 1] -= factor_loadings[:, 0] * (factor_loadings[:, 0] @ factor_loadings[:, 1]) / (factor_loadings[:, 0] @ factor_loadings[:, 0])
+
+    dt = 1 / 252
+    rng = np.random.default_rng(0)
+    log_returns = rng.standard_normal((200 * 1000, 2)) @ factor_loadings.T * np.sqrt(dt)
+
+    loadings, explained_variance_ratio = forward_curve_pca(log_returns, nb_factors=2, dt=dt)
+    assert loadings.shape == (9, 2)
+    assert np.isclose(explained_variance_ratio.sum(), 1.0)
+    assert explained_variance_ratio[0] > explained_variance_ratio[1]
+    sign = np.sign(loadings.sum(axis=0) * factor_loadings.sum(axis=0))
+    assert np.allclose(loadings, factor_loadings * sign, atol=0.01)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from frm.pricing_engine.clewlow_strickland_1_factor import clewlow_strickland_1_factor_simulate_exact
+from frm.pricing_engine.commodity_strip_option import AveragingPeriod, clewlow_strickland_1_factor_price_strip_option, \
+    price_strip_option
+
+
+sigma = 0.04 # daily volatility
+alpha = 0.06 # daily mean reversion
+tau = np.arange(0, 121, dtype=np.float64)
+forward_curve = np.stack([tau, 50 + 5 * np.sin(tau / 20)], axis=1)
+
+
+def test_strip_option_matches_payoffs_on_simulated_paths():
+    periods = [AveragingPeriod(start=1, end=30, strike=50.0, payoff_type='call', volume=2.0, discount_factor=0.99),
+               AveragingPeriod(start=31, end=60, strike=52.0, payoff_type='put'),
+               AveragingPeriod(start=20, end=90, strike=51.0, payoff_type='swap', discount_factor=0.98)]
+    nb_simulations = 50 * 1000 + 3
+
+    result = clewlow_strickland_1_factor_price_strip_option(forward_curve, alpha, sigma, periods,
+                                                            nb_simulations=nb_simulations,
+                                                            nb_simulations_per_chunk=7 * 1000,
+                                                            random_seed=2)
+
+    # Same paths, averaged with numpy
+    spot_px = clewlow_strickland_1_factor_simulate_exact(forward_curve, nb_simulations, alpha, sigma, T=90,
+                                                         nb_simulations_per_chunk=7 * 1000, random_seed=2)
+    payoffs = np.stack([2.0 * 0.99 * np.maximum(spot_px[1:31].mean(axis=0) - 50.0, 0),
+                        np.maximum(52.0 - spot_px[31:61].mean(axis=0), 0),
+                        0.98 * (spot_px[20:91].mean(axis=0) - 51.0)])
+
+    assert result['nb_simulations'] == nb_simulations
+    assert np.allclose(result['period_prices'], payoffs.mean(axis=1), rtol=1e-10)
+    assert np.allclose(result['period_standard_errors'], payoffs.std(axis=1, ddof=1) / np.sqrt(nb_simulations), rtol=1e-8)
+    assert np.isclose(result['price'], payoffs.sum(axis=0).mean(), rtol=1e-10)
+    assert np.isclose(result['standard_error'], payoffs.sum(axis=0).std(ddof=1) / np.sqrt(nb_simulations), rtol=1e-8)
+
+    # The swap is priced off the average forward price
+    swap_px = 0.98 * (forward_curve[20:91, 1].mean() - 51.0)
+    assert abs(result['period_prices'][2] - swap_px) < 4 * result['period_standard_errors'][2]
+
+
+def test_strip_option_single_fixing_is_european_option():
+    K = 50.0
+    result = clewlow_strickland_1_factor_price_strip_option(forward_curve, alpha, sigma,
+                                                            [AveragingPeriod(start=120, end=120, strike=K)],
+                                                            nb_simulations=100 * 1000)
+
+    F = forward_curve[120, 1]
+    w = 0.5 * sigma**2 * (1 - np.exp(-2*alpha*120)) / alpha
+    h = (np.log(F) - np.log(K) + 0.5 * w) / np.sqrt(w)
+    call_px_analytical = F * norm.cdf(h) - K * norm.cdf(h - np.sqrt(w))
+    assert abs(result['price'] - call_px_analytical) < 4 * result['standard_error']
+
+    with pytest.raises(ValueError):
+        AveragingPeriod(start=1, end=2, strike=K, payoff_type='digital')
+    with pytest.raises(ValueError):
+        clewlow_strickland_1_factor_price_strip_option(forward_curve, alpha, sigma,
+                                                       [AveragingPeriod(start=10.2, end=10.8, strike=K)],
+                                                       nb_simulations=10)
+    with pytest.raises(ValueError):
+        price_strip_option(iter([]), forward_curve[:, 0], [AveragingPeriod(start=120, end=120, strike=K)])
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import pytest
+
+from frm.pricing_engine.monte_carlo_generic import generate_rand_nbs
+from frm.pricing_engine.geometric_brownian_motion import simulate_gbm_path, simulate_gbm_path_log_space
+
+
+def test_log_space_simulation_aligns_with_simulate_gbm_path():
+    # The log space kernel should reproduce simulate_gbm_path() at the requested observation indices,
+    # given the same random numbers.
+
+    initial_px = np.array([0.6629])
+    drift = np.array([0.95*0.01, 0.55*0.01, -0.02*0.01, -0.34*0.01])
+    forward_volatility = np.array([9.73*0.01, 10.10*0.01, 9.75*0.01, 10.97*0.01])
+    timestep_length = np.array([0.512328767, 0.498630137, 0.501369863, 0.498630137])
+
+    rand_nbs = generate_rand_nbs(nb_steps=len(timestep_length), nb_rand_vars=1, nb_simulations=10 * 1000)
+
+    result = simulate_gbm_path(initial_px=initial_px,
+                               drift=drift,
+                               forward_volatility=forward_volatility,
+                               timestep_length=timestep_length,
+                               rand_nbs=rand_nbs)
+
+    observation_indices = np.array([0, 2, 4, 4])
+    for method in ['numba', 'cumsum']:
+        result_log_space = simulate_gbm_path_log_space(initial_px=initial_px,
+                                                       drift=drift,
+                                                       forward_volatility=forward_volatility,
+                                                       timestep_length=timestep_length,
+                                                       rand_nbs=rand_nbs,
+                                                       observation_indices=observation_indices,
+                                                       method=method)
+        assert result_log_space.shape == (4, 1, 10 * 1000)
+        assert np.allclose(result_log_space, result[observation_indices], rtol=1e-12, atol=0)
+
+    result_float32 = simulate_gbm_path_log_space(initial_px=initial_px,
+                                                 drift=drift,
+                                                 forward_volatility=forward_volatility,
+                                                 timestep_length=timestep_length,
+                                                 rand_nbs=rand_nbs,
+                                                 dtype=np.float32)
+    assert result_float32.dtype == np.float32
+    assert np.allclose(result_float32, result, rtol=1e-6)
+
+
+def test_log_space_simulation_multiple_rand_vars():
+    initial_px = np.array([100.0, 50.0])
+    drift = np.array([[0.02, 0.01], [0.03, 0.00]])
+    forward_volatility = np.array([[0.2, 0.3], [0.25, 0.35]])
+    timestep_length = np.array([0.25, 0.75])
+
+    rand_nbs = generate_rand_nbs(nb_steps=2, nb_rand_vars=2, nb_simulations=1000)
+
+    result_numba = simulate_gbm_path_log_space(initial_px, drift, forward_volatility, timestep_length, rand_nbs, method='numba')
+    result_cumsum = simulate_gbm_path_log_space(initial_px, drift, forward_volatility, timestep_length, rand_nbs, method='cumsum')
+    assert result_numba.shape == (3, 2, 1000)
+    assert np.allclose(result_numba, result_cumsum, rtol=1e-12, atol=0)
+    assert np.allclose(result_numba[0, 0, :], 100.0) and np.allclose(result_numba[0, 1, :], 50.0)
+
+    with pytest.raises(ValueError):
+        simulate_gbm_path_log_space(initial_px, drift, forward_volatility, timestep_length, rand_nbs, observation_indices=[3])
+
+    # dtype may be given by name or as a np.dtype, no observations give an empty array
+    for dtype in ['float32', np.dtype('float32')]:
+        assert simulate_gbm_path_log_space(initial_px, drift, forward_volatility, timestep_length, rand_nbs, dtype=dtype).dtype == np.float32
+    with pytest.raises(ValueError):
+        simulate_gbm_path_log_space(initial_px, drift, forward_volatility, timestep_length, rand_nbs, dtype='int64')
+    for method in ['numba', 'cumsum']:
+        result = simulate_gbm_path_log_space(initial_px, drift, forward_volatility, timestep_length, rand_nbs,
+                                             observation_indices=[], method=method)
+        assert result.shape == (0, 2, 1000)
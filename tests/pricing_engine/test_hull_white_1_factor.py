@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import pandas as pd
+import scipy
+
+from frm.pricing_engine.hull_white_1_factor import calc_theta, calc_A, calc_B, calc_discount_factor, calc_short_rate_mean, \
+    hull_white_1_factor_simulate
+
+
+def test_hull_white_discount_factor_fits_zero_curve(make_hull_white_zero_curve):
+    α, σ = 0.05, 0.01
+    T = np.array([0.5, 1.0, 4.0, 12.0, 25.0])
+    for interpolation_method in ['cubic_spline_on_zero_rates', 'linear_on_log_of_discount_factors']:
+        zero_curve = make_hull_white_zero_curve(interpolation_method)
+        r0 = zero_curve.instantaneous_forward_rate(years=np.array([0.0]))
+        assert np.allclose(calc_discount_factor(0.0, T, zero_curve, α, σ, r0), zero_curve.get_discount_factor(years=T), rtol=1e-12)
+
+
+def test_hull_white_closed_form_A_matches_integral_of_theta(make_hull_white_zero_curve):
+    # A(t,T) = ∫_t^T 0.5 σ² B(s,T)² - θ(s) B(s,T) ds for dr = (θ(t) - α r) dt + σ dW
+    α, σ = 0.05, 0.01
+    zero_curve = make_hull_white_zero_curve()
+    θ_spline_definition = calc_theta(zero_curve, α, σ, n=500)
+
+    for t, T in [(0.5, 1.0), (1.0, 5.0), (2.5, 20.0)]:
+        integrand = lambda s: 0.5 * σ**2 * calc_B(s, T, α)**2 - scipy.interpolate.splev(s, θ_spline_definition) * calc_B(s, T, α)
+        A_integral = scipy.integrate.quad(integrand, t, T, limit=200)[0]
+        assert abs(calc_A(t, T, zero_curve, α, σ) - A_integral) < 1e-6
+
+    # Vectorised over a grid of (t, T) and short rates
+    t = np.array([0.5, 1.0, 2.0])[:, np.newaxis, np.newaxis]
+    T = np.array([3.0, 5.0, 10.0, 20.0])[np.newaxis, :, np.newaxis]
+    r = np.linspace(0.0, 0.06, 7)[np.newaxis, np.newaxis, :]
+    P = calc_discount_factor(t, T, zero_curve, α, σ, r)
+    assert P.shape == (3, 4, 7)
+    assert np.isclose(P[1, 2, 3], calc_discount_factor(1.0, 10.0, zero_curve, α, σ, 0.03), rtol=1e-14)
+
+
+def test_hull_white_simulation_is_arbitrage_free(make_hull_white_zero_curve):
+    α, σ = 0.05, 0.01
+    zero_curve = make_hull_white_zero_curve()
+    years = np.array([0.1, 0.5, 1.0, 3.0, 7.0, 10.0])  # Non-uniform grid
+    bond_tenors = np.array([1.0, 5.0])
+
+    for kwargs in [dict(flag_apply_antithetic_variates=True), dict(flag_use_sobol=True, nb_simulations_per_chunk=2**14)]:
+        nb_simulations = 2**16
+        result = hull_white_1_factor_simulate(zero_curve, α, σ, nb_simulations=nb_simulations, years=years,
+                                              bond_tenors=bond_tenors, **kwargs)
+        assert result['short_rate'].shape == (len(years), nb_simulations)
+        assert result['bond_price'].shape == (len(years), len(bond_tenors), nb_simulations)
+        assert np.allclose(result['discount_factor'] * result['bank_account'], 1.0)
+
+        # E[D(0,t)] = P(0,t) and E[D(0,t) P(t,t+τ)] = P(0,t+τ)
+        D = result['discount_factor']
+        se = D.std(axis=1) / np.sqrt(nb_simulations)
+        assert (np.abs(D.mean(axis=1) - zero_curve.get_discount_factor(years=years)) < 4 * se + 1e-12).all()
+        deflated_bond_price = D[:, np.newaxis, :] * result['bond_price']
+        P_0_T = zero_curve.get_discount_factor(years=(years[:, np.newaxis] + bond_tenors).ravel()).reshape(len(years), -1)
+        se = deflated_bond_price.std(axis=2) / np.sqrt(nb_simulations)
+        assert (np.abs(deflated_bond_price.mean(axis=2) - P_0_T) < 4 * se + 1e-12).all()
+
+        # Moments of the short rate
+        r = result['short_rate']
+        assert np.allclose(r.mean(axis=1), calc_short_rate_mean(years, zero_curve, α, σ), atol=4 * np.sqrt(σ**2 / (2*α) / nb_simulations))
+        assert np.allclose(r.var(axis=1), σ**2 / (2*α) * (1 - np.exp(-2*α*years)), rtol=0.03)
+
+    # Dates are converted with the curve's day count basis
+    dates = pd.DatetimeIndex([pd.Timestamp(2024, 7, 2), pd.Timestamp(2025, 1, 2)])
+    result = hull_white_1_factor_simulate(zero_curve, α, σ, nb_simulations=100, dates=dates)
+    assert result['short_rate'].shape == (2, 100)
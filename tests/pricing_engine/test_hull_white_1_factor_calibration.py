@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+
+from frm.pricing_engine.hull_white_1_factor import calc_short_rate_variance, hull_white_1_factor_simulate
+from frm.pricing_engine.hull_white_1_factor_calibration import coterminal_swaption_strip, caplet_strip, \
+    black76_strip_price, hull_white_strip_price, hull_white_calibrate
+
+
+def test_jamshidian_swaption_price_matches_monte_carlo(make_hull_white_zero_curve):
+    # 2y into 3y annual payer & receiver swaptions, off the money
+    α, σ = 0.05, 0.012
+    zero_curve = make_hull_white_zero_curve()
+    for is_payer, strike_shift in [(True, 0.005), (False, -0.003)]:
+        strip = coterminal_swaption_strip(zero_curve, expiry_years=[2.0], maturity_years=5.0)
+        strip = coterminal_swaption_strip(zero_curve, expiry_years=[2.0], maturity_years=5.0,
+                                          strikes=strip['forward'] + strike_shift, is_payer=is_payer)
+        price, _ = hull_white_strip_price(strip, zero_curve, α, calc_short_rate_variance(strip['expiry_years'], α, σ))
+
+        results = hull_white_1_factor_simulate(zero_curve, α, σ, nb_simulations=200 * 1000, years=np.array([0.0, 2.0]),
+                                               bond_tenors=np.array([1.0, 2.0, 3.0]), flag_apply_antithetic_variates=True)
+        coupon_bond = (strip['coupons'][0][:, np.newaxis] * results['bond_price'][-1]).sum(axis=0)
+        omega = 1.0 if is_payer else -1.0
+        payoff = results['discount_factor'][-1] * np.maximum(omega * (1.0 - coupon_bond), 0.0)
+        payoff = 0.5 * (payoff[:len(payoff) // 2] + payoff[len(payoff) // 2:]) # Pairs of antithetic paths
+        assert abs(payoff.mean() - price[0]) < 4 * payoff.std() / np.sqrt(len(payoff))
+
+
+def test_analytic_vega_matches_finite_difference(make_hull_white_zero_curve):
+    α = 0.08
+    zero_curve = make_hull_white_zero_curve()
+    strips = [coterminal_swaption_strip(zero_curve, expiry_years=[1, 3, 5, 7], maturity_years=10.0, fixed_leg_frequency_years=0.5),
+              caplet_strip(zero_curve, start_years=[0.5, 1, 2, 4], end_years=[0.75, 1.25, 2.25, 4.25], strikes=0.035)]
+    for strip in strips:
+        v = calc_short_rate_variance(strip['expiry_years'], α, 0.01)
+        _, vega = hull_white_strip_price(strip, zero_curve, α, v)
+        h = 1e-4 * v
+        price_up, _ = hull_white_strip_price(strip, zero_curve, α, v + h)
+        price_down, _ = hull_white_strip_price(strip, zero_curve, α, v - h)
+        assert np.allclose(vega, (price_up - price_down) / (2 * h), rtol=1e-6)
+
+
+def test_calibration_recovers_piecewise_constant_volatility(make_hull_white_zero_curve):
+    α = 0.05
+    σ = np.array([0.012, 0.010, 0.011, 0.008, 0.009])
+    zero_curve = make_hull_white_zero_curve()
+
+    strip = coterminal_swaption_strip(zero_curve, expiry_years=[1, 2, 3, 4, 5], maturity_years=6.0)
+    v = calc_short_rate_variance(strip['expiry_years'], α, σ, volatility_grid_years=strip['expiry_years'])
+    market_prices, _ = hull_white_strip_price(strip, zero_curve, α, v)
+    result = hull_white_calibrate(strip, zero_curve, market_prices, α=α)
+    assert np.allclose(result['σ'], σ, rtol=1e-8)
+    assert np.allclose(result['volatility_grid_years'], strip['expiry_years'])
+
+    # Caplets from Black volatilities
+    strip = caplet_strip(zero_curve, start_years=np.arange(1, 6), end_years=np.arange(1, 6) + 0.25)
+    market_prices = black76_strip_price(strip, black_volatility=np.array([0.35, 0.32, 0.30, 0.29, 0.28]))
+    result = hull_white_calibrate(strip, zero_curve, market_prices, α=α)
+    assert np.abs(result['residuals']).max() < 1e-12
+
+
+def test_calibration_recovers_mean_reversion(make_hull_white_zero_curve):
+    # A constant σ and α are identified by swaptions on different tenors
+    α, σ = 0.10, 0.01
+    zero_curve = make_hull_white_zero_curve()
+    strip = coterminal_swaption_strip(zero_curve, expiry_years=[1, 2, 5, 10, 15, 19], maturity_years=20.0)
+    market_prices, _ = hull_white_strip_price(strip, zero_curve, α, calc_short_rate_variance(strip['expiry_years'], α, σ))
+    result = hull_white_calibrate(strip, zero_curve, market_prices, volatility_type='constant', flag_calibrate_α=True)
+    assert abs(result['α'] - α) < 1e-3
+    assert abs(result['σ'][0] - σ) < 1e-5
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+
+from frm.pricing_engine.hull_white_1_factor import calc_short_rate_variance
+from frm.pricing_engine.hull_white_1_factor_calibration import coterminal_swaption_strip, hull_white_strip_price
+from frm.pricing_engine.hull_white_1_factor_trinomial_tree import HullWhiteTrinomialTree, swap_leg_cashflows
+
+
+def test_tree_reprices_zero_curve(make_hull_white_zero_curve):
+    zero_curve = make_hull_white_zero_curve()
+    event_years = np.array([0.3, 1.0, 2.5, 7.0, 12.0])
+    for σ, volatility_grid_years in [(0.01, None), (np.array([0.012, 0.008, 0.01]), np.array([1.0, 4.0, 10.0]))]:
+        tree = HullWhiteTrinomialTree(zero_curve, α=0.05, σ=σ, event_years=event_years, max_time_step=0.1,
+                                      volatility_grid_years=volatility_grid_years)
+        for T in event_years:
+            assert np.isclose(tree.price(T, 1.0)['underlying'], zero_curve.get_discount_factor(years=np.array([T]))[0], rtol=1e-12)
+
+
+def test_tree_european_swaption_matches_jamshidian(make_hull_white_zero_curve):
+    α = 0.05
+    σ = np.array([0.012, 0.009])
+    volatility_grid_years = np.array([1.0, 2.0])
+    zero_curve = make_hull_white_zero_curve()
+    for is_payer in [True, False]:
+        strip = coterminal_swaption_strip(zero_curve, expiry_years=[2.0], maturity_years=7.0, is_payer=is_payer)
+        v = calc_short_rate_variance(strip['expiry_years'], α, σ, volatility_grid_years)
+        price, _ = hull_white_strip_price(strip, zero_curve, α, v)
+
+        cashflow_years, cashflow_amounts = strip['payment_years'][0], strip['coupons'][0]
+        tree = HullWhiteTrinomialTree(zero_curve, α=α, σ=σ, event_years=cashflow_years, max_time_step=1/100,
+                                      volatility_grid_years=volatility_grid_years)
+        result = tree.price(cashflow_years, cashflow_amounts, exercise_years=2.0, strike=1.0, is_call=not is_payer)
+        assert abs(result['option'] - price[0]) < 2e-3 * price[0]
+
+
+def test_tree_bermudan_swaption_and_swap_leg_cashflows(make_hull_white_zero_curve):
+    α, σ = 0.03, 0.01
+    zero_curve = make_hull_white_zero_curve()
+
+    # A fixed leg schedule as built by SwapLeg, receiving 4% annual coupons with the notional at the end
+    payment_date = pd.DatetimeIndex([pd.Timestamp(2024 + i, 1, 2) for i in range(1, 11)])
+    payment = np.full(10, 4.0)
+    payment[-1] += 100.0
+    leg = SimpleNamespace(schedule=pd.DataFrame({'payment_date': payment_date, 'payment': payment}), pay_rec=None)
+    cashflow_years, cashflow_amounts = swap_leg_cashflows(leg, zero_curve)
+    exercise_years = cashflow_years[:-1]
+
+    tree = HullWhiteTrinomialTree(zero_curve, α=α, σ=σ, event_years=cashflow_years, max_time_step=1/24)
+    bermudan = tree.price(cashflow_years, cashflow_amounts, exercise_years=exercise_years, strike=100.0)
+    assert np.isclose(bermudan['underlying'], (cashflow_amounts * zero_curve.get_discount_factor(years=cashflow_years)).sum(), rtol=1e-12)
+
+    europeans = [tree.price(cashflow_years, cashflow_amounts, exercise_years=T, strike=100.0)['option'] for T in exercise_years]
+    assert max(europeans) < bermudan['option'] < sum(europeans)
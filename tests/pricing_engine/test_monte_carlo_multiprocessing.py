@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+from scipy.stats import norm
+
+from frm.pricing_engine.monte_carlo_multiprocessing import run_monte_carlo, get_chunk_sizes
+
+
+def gbm_call_and_put_payoff(rng, nb_simulations, S0, mu, sigma, tau, K):
+    W = rng.standard_normal(nb_simulations)
+    S_T = S0 * np.exp((mu - 0.5 * sigma ** 2) * tau + sigma * np.sqrt(tau) * W)
+    return np.stack([np.maximum(S_T - K, 0), np.maximum(K - S_T, 0)], axis=1)
+
+
+def test_chunk_sizes():
+    assert (get_chunk_sizes(10, 3) == [3, 3, 3, 1]).all()
+    assert (get_chunk_sizes(9, 3) == [3, 3, 3]).all()
+    assert (get_chunk_sizes(2, 3) == [2]).all()
+
+
+def test_run_monte_carlo_is_identical_for_any_worker_count():
+    S0, mu, sigma, tau, K = 100.0, 0.05, 0.2, 1.0, 100.0
+    kwargs = dict(S0=S0, mu=mu, sigma=sigma, tau=tau, K=K)
+
+    results = [run_monte_carlo(gbm_call_and_put_payoff,
+                               nb_simulations=200 * 1000 + 7,
+                               payoff_shape=(2,),
+                               nb_simulations_per_chunk=25 * 1000,
+                               nb_workers=nb_workers,
+                               random_seed=1,
+                               **kwargs)
+               for nb_workers in [1, 2, 3]]
+
+    for result in results[1:]:
+        assert (result['mean'] == results[0]['mean']).all()
+        assert (result['standard_error'] == results[0]['standard_error']).all()
+
+    # Undiscounted Black-Scholes prices with drift mu
+    F = S0 * np.exp(mu * tau)
+    d1 = (np.log(F / K) + 0.5 * sigma ** 2 * tau) / (sigma * np.sqrt(tau))
+    d2 = d1 - sigma * np.sqrt(tau)
+    analytical = np.array([F * norm.cdf(d1) - K * norm.cdf(d2),
+                           K * norm.cdf(-d2) - F * norm.cdf(-d1)])
+
+    result = results[0]
+    assert result['nb_simulations'] == 200 * 1000 + 7
+    assert (np.abs(result['mean'] - analytical) < 4 * result['standard_error']).all()
+
+    # The chunked reduction matches the statistics of the concatenated payoffs
+    seed_sequences = np.random.SeedSequence(1).spawn(9)
+    payoffs = np.concatenate([gbm_call_and_put_payoff(np.random.default_rng(seed_sequences[i]), n, **kwargs)
+                              for i, n in enumerate(get_chunk_sizes(200 * 1000 + 7, 25 * 1000))])
+    assert np.allclose(result['mean'], payoffs.mean(axis=0), rtol=1e-12)
+    assert np.allclose(result['standard_error'], payoffs.std(axis=0, ddof=1) / np.sqrt(len(payoffs)), rtol=1e-10)
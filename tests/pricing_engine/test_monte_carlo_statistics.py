@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+from scipy.stats import norm
+
+from frm.pricing_engine.monte_carlo_statistics import MonteCarloStatistics
+
+
+def test_streaming_statistics_match_full_sample():
+    rng = np.random.default_rng(0)
+    nb_dates = 4
+    scale = np.array([0.5, 1.0, 2.0, 4.0])
+    loc = np.array([0.0, 1.0, -1.0, 0.5])
+    values = loc + scale * rng.standard_normal((200 * 1000, nb_dates))
+
+    stats = MonteCarloStatistics(nb_dates=nb_dates, quantiles=(0.05, 0.5, 0.95))
+    for chunk in np.array_split(values, [3, 7, 1000, 50 * 1000]):  # Includes chunks smaller than the P² initialisation
+        stats.update(chunk)
+
+    assert stats.nb_simulations == len(values)
+    assert np.allclose(stats.mean, values.mean(axis=0), rtol=1e-12)
+    assert np.allclose(stats.variance, values.var(axis=0, ddof=1), rtol=1e-10)
+    assert np.allclose(stats.standard_error, values.std(axis=0, ddof=1) / np.sqrt(len(values)), rtol=1e-10)
+    assert np.allclose(stats.expected_positive_exposure, np.maximum(values, 0).mean(axis=0), rtol=1e-12)
+    assert np.allclose(stats.expected_negative_exposure, np.minimum(values, 0).mean(axis=0), rtol=1e-12)
+
+    # P² quantile estimates vs the empirical quantiles
+    empirical = np.quantile(values, [0.05, 0.5, 0.95], axis=0)
+    assert stats.quantile().shape == (3, nb_dates)
+    assert np.allclose(stats.quantile(), empirical, atol=0.01 * scale)
+
+    pfe = stats.potential_future_exposure
+    assert np.allclose(pfe[2], np.maximum(loc + scale * norm.ppf(0.95), 0), atol=0.02 * scale)
+    assert (pfe >= 0).all()
+
+
+def test_streaming_statistics_few_simulations():
+    stats = MonteCarloStatistics(nb_dates=2, quantiles=0.5)
+    assert np.isnan(stats.quantile()).all()
+
+    stats.update(np.array([[1.0, -2.0], [3.0, 4.0], [2.0, 0.0]]))
+    assert np.allclose(stats.quantile(), [[2.0, 0.0]])
+    assert np.allclose(stats.mean, [2.0, 2 / 3])
+    assert np.allclose(stats.expected_negative_exposure, [0.0, -2 / 3])
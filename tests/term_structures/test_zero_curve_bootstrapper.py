@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from frm.term_structures.zero_curve_bootstrapper import ZeroCurveBootstrapper, Deposit, ForwardRateAgreement, \
+    InterestRateFuture, InterestRateSwap
+
+
+curve_date = pd.Timestamp(2024, 6, 3)
+spot_date = pd.Timestamp(2024, 6, 5)
+
+
+def get_projection_instruments():
+    return [Deposit(spot_date, spot_date + pd.DateOffset(months=3), 0.0560),
+            InterestRateFuture(pd.Timestamp(2024, 9, 18), pd.Timestamp(2024, 12, 18), 94.60, convexity_adjustment=0.0001),
+            ForwardRateAgreement(pd.Timestamp(2024, 12, 5), pd.Timestamp(2025, 3, 5), 0.0535)] \
+        + [InterestRateSwap(spot_date, spot_date + pd.DateOffset(years=y), 0.0520 - 0.0010 * y ** 0.5) for y in [2, 3, 5, 7, 10, 20, 30]]
+
+
+def par_residuals(instruments, projection_curve, discount_curve):
+    # Reprice the instruments from the ZeroCurve's, independently of the bootstrapper's compiled arrays
+    result = []
+    for instrument in instruments:
+        cf = instrument.cashflows()
+        rate = instrument.quote_to_rate(instrument.quote)
+        fixed = rate * (cf['fixed_accrual'] * discount_curve.get_discount_factor(dates=cf['fixed_pay'])).sum()
+        ratio = projection_curve.get_discount_factor(dates=cf['float_start']) / projection_curve.get_discount_factor(dates=cf['float_end'])
+        float_ = ((ratio - 1) * discount_curve.get_discount_factor(dates=cf['float_pay'])).sum()
+        result.append(fixed - float_)
+    return np.array(result)
+
+
+def test_single_curve_bootstrap(make_ois_instruments):
+    instruments = make_ois_instruments(curve_date, spot_date)
+    curves = {}
+    for interpolation_method, solve_method in [('linear_on_log_of_discount_factors', 'newton'),
+                                               ('linear_on_log_of_discount_factors', 'sequential'),
+                                               ('cubic_spline_on_zero_rates', 'newton')]:
+        bootstrapper = ZeroCurveBootstrapper(curve_date, instruments, interpolation_method=interpolation_method, solve_method=solve_method)
+        zero_curve = bootstrapper.bootstrap()
+        assert np.abs(par_residuals(instruments, zero_curve, zero_curve)).max() < 1e-12
+        curves[(interpolation_method, solve_method)] = zero_curve
+
+    dates = pd.date_range(curve_date, curve_date + pd.DateOffset(years=30), freq='MS')
+    assert np.allclose(curves[('linear_on_log_of_discount_factors', 'newton')].get_discount_factor(dates=dates),
+                       curves[('linear_on_log_of_discount_factors', 'sequential')].get_discount_factor(dates=dates), rtol=1e-12)
+
+    with pytest.raises(ValueError):
+        ZeroCurveBootstrapper(curve_date, instruments, interpolation_method='cubic_spline_on_zero_rates', solve_method='sequential')
+
+
+def test_dual_curve_bootstrap_and_quote_update(make_ois_instruments):
+    ois_curve = ZeroCurveBootstrapper(curve_date, make_ois_instruments(curve_date, spot_date)).bootstrap()
+    instruments = get_projection_instruments()
+    bootstrapper = ZeroCurveBootstrapper(curve_date, instruments, discount_curve=ois_curve)
+    projection_curve = bootstrapper.bootstrap()
+    assert np.abs(par_residuals(instruments, projection_curve, ois_curve)).max() < 1e-12
+
+    # The projection curve is above the OIS curve, as the term rates are above the OIS rates
+    dates = pd.date_range(spot_date, spot_date + pd.DateOffset(years=20), freq='YS')
+    assert (projection_curve.get_discount_factor(dates=dates[1:]) < ois_curve.get_discount_factor(dates=dates[1:])).all()
+
+    # Re-bootstrapping on new quotes reprices the new quotes
+    quotes = np.array([instrument.quote for instrument in instruments])
+    quotes[-3] += 0.0005
+    projection_curve = bootstrapper.bootstrap(quotes)
+    instruments[-3].fixed_rate += 0.0005
+    assert np.abs(par_residuals(instruments, projection_curve, ois_curve)).max() < 1e-12
+
+
+def test_incremental_update_matches_full_bootstrap(make_ois_instruments):
+    instruments = make_ois_instruments(curve_date, spot_date)
+    dates = pd.date_range(curve_date, curve_date + pd.DateOffset(years=30), freq='MS')
+    for interpolation_method in ['linear_on_log_of_discount_factors', 'cubic_spline_on_zero_rates']:
+        bootstrapper = ZeroCurveBootstrapper(curve_date, instruments, interpolation_method=interpolation_method)
+        zero_curve = bootstrapper.bootstrap()
+        discount_factor_before = zero_curve.get_discount_factor(dates=dates)
+        pillar_discount_factor_before = zero_curve.data['discount_factor'].values.copy()
+
+        # The 7y OIS quote ticks up, the curve is updated in place
+        i = 8
+        quotes = bootstrapper.quotes.copy()
+        quotes[i] += 0.0010
+        updated_curve = bootstrapper.update_quote(i, quotes[i])
+        assert updated_curve is zero_curve
+
+        full_curve = ZeroCurveBootstrapper(curve_date, instruments, interpolation_method=interpolation_method).bootstrap(quotes)
+        assert np.allclose(zero_curve.get_discount_factor(dates=dates), full_curve.get_discount_factor(dates=dates), rtol=1e-12)
+        assert not np.allclose(zero_curve.get_discount_factor(dates=dates), discount_factor_before)
+        if interpolation_method == 'linear_on_log_of_discount_factors':
+            # The pillars before the 7y are not re-solved
+            nb_unchanged = 1 + bootstrapper._pillar_position[i] # Including the t=0 pillar
+            assert (zero_curve.data['discount_factor'].values[:nb_unchanged] == pillar_discount_factor_before[:nb_unchanged]).all()
+
+
+def test_projection_curve_update_after_discount_curve_update(make_ois_instruments):
+    ois_bootstrapper = ZeroCurveBootstrapper(curve_date, make_ois_instruments(curve_date, spot_date))
+    ois_curve = ois_bootstrapper.bootstrap()
+    instruments = get_projection_instruments()
+    dates = pd.date_range(curve_date, curve_date + pd.DateOffset(years=30), freq='MS')
+    for interpolation_method in ['linear_on_log_of_discount_factors', 'cubic_spline_on_zero_rates']:
+        bootstrapper = ZeroCurveBootstrapper(curve_date, instruments, discount_curve=ois_curve, interpolation_method=interpolation_method)
+        projection_curve = bootstrapper.bootstrap()
+
+        # The 3y OIS quote ticks up, the OIS curve is updated in place, then the 10y swap quote ticks up
+        ois_bootstrapper.update_quote(6, ois_bootstrapper.quotes[6] + 0.0010)
+        quotes = bootstrapper.quotes.copy()
+        quotes[-3] += 0.0005
+        bootstrapper.update_quote(len(instruments) - 3, quotes[-3])
+
+        full_curve = ZeroCurveBootstrapper(curve_date, instruments, discount_curve=ois_curve,
+                                           interpolation_method=interpolation_method).bootstrap(quotes)
+        assert np.allclose(projection_curve.get_discount_factor(dates=dates), full_curve.get_discount_factor(dates=dates), rtol=1e-12)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import warnings
+import pandas as pd
+
+from frm.term_structures.zero_curve import ZeroCurve
+from frm.enums.utils import CompoundingFrequency, DayCountBasis
+from frm.enums.term_structures import OISCouponCalcMethod
+from frm.utils.daycount import year_fraction
+
+
+def test_interpolation_from_pillars(make_zero_curve):
+    for interpolation_method in ['cubic_spline_on_zero_rates', 'linear_on_log_of_discount_factors']:
+        zc = make_zero_curve(interpolation_method)
+        pillars = zc.data.loc[zc.data['years'] > 0]
+        assert np.allclose(zc.get_discount_factor(dates=pd.DatetimeIndex(pillars['date'])), pillars['discount_factor'], rtol=1e-14)
+        assert np.allclose(zc.get_zero_rate(CompoundingFrequency.CONTINUOUS, dates=pd.DatetimeIndex(pillars['date'])), 0.03 + np.arange(10) / 900)
+
+        # Dates, days and years give the same results, in the input order
+        dates = pd.DatetimeIndex([pd.Timestamp(2050, 3, 1), pd.Timestamp(2024, 1, 2), pd.Timestamp(2031, 7, 15)])
+        days = (dates - zc.curve_date).days.values
+        years = year_fraction(zc.curve_date, dates, zc.day_count_basis)
+        df_dates = zc.get_discount_factor(dates=dates)
+        assert np.allclose(df_dates, zc.get_discount_factor(days=days), rtol=1e-14)
+        assert np.allclose(df_dates, zc.get_discount_factor(years=years), rtol=1e-14)
+        assert df_dates[1] == 1.0 and df_dates[0] < df_dates[2]
+
+
+def test_dates_outside_curve(make_zero_curve):
+    zc = make_zero_curve('linear_on_log_of_discount_factors')
+    dates = pd.DatetimeIndex([pd.Timestamp(2023, 12, 1), pd.Timestamp(2030, 1, 2), pd.Timestamp(2100, 1, 1),
+                              pd.Timestamp(2023, 1, 1), pd.Timestamp(2025, 1, 2)])
+    with warnings.catch_warnings(record=True) as w:
+        warnings.simplefilter('always')
+        discount_factor = zc.get_discount_factor(dates=dates)
+    assert len(w) == 1 and '2 date(s) below' in str(w[0].message) and '1 date(s) above' in str(w[0].message)
+    assert np.isnan(discount_factor[[0, 2, 3]]).all()
+    assert np.allclose(discount_factor[[1, 4]], zc.get_discount_factor(dates=dates[[1, 4]])) # Input order is kept
+
+    zc.extrapolation_method = 'flat'
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        discount_factor = zc.get_discount_factor(dates=dates)
+    assert discount_factor[0] == 1.0 and discount_factor[3] == 1.0
+    assert discount_factor[2] == zc.get_discount_factor(dates=zc.max_date)[0]
+
+
+def test_ois_average_forward_rates():
+    curve_date = pd.Timestamp(2024, 1, 2)
+    zc = ZeroCurve(curve_date=curve_date,
+                   data=pd.DataFrame({'years': [0.5, 1, 2, 5, 10], 'zero_rate': [0.030, 0.032, 0.035, 0.037, 0.038]}),
+                   compounding_frequency=CompoundingFrequency.CONTINUOUS,
+                   day_count_basis=DayCountBasis.ACT_365)
+    period_start = pd.DatetimeIndex([curve_date + pd.DateOffset(months=3*i) for i in range(20)] + [pd.Timestamp(2025, 1, 4)])
+    period_end = pd.DatetimeIndex([curve_date + pd.DateOffset(months=3*(i+1)) for i in range(20)] + [pd.Timestamp(2025, 1, 6)])
+
+    for method in [OISCouponCalcMethod.WEIGHTED_AVERAGE, OISCouponCalcMethod.SIMPLE_AVERAGE]:
+        result = zc.forward_rate(period_start, period_end, method)
+        for i, (start, end) in enumerate(zip(period_start, period_end)):
+            dates = pd.date_range(start, end, freq='D')
+            discount_factor = zc.get_discount_factor(dates=dates)
+            daily_rate = (discount_factor[:-1] / discount_factor[1:] - 1) * 365
+            if method == OISCouponCalcMethod.SIMPLE_AVERAGE:
+                daily_rate = daily_rate[np.is_busday(dates[:-1].values.astype('datetime64[D]'))]
+            if len(daily_rate) == 0:
+                assert np.isnan(result[i]) # 2025-01-04 to 2025-01-06 is a weekend
+            else:
+                assert np.isclose(result[i], daily_rate.mean(), rtol=1e-10)
+
+
+def test_local_interpolators():
+    curve_date = pd.Timestamp(2024, 1, 2)
+    dates = pd.DatetimeIndex([curve_date + pd.DateOffset(months=m) for m in [1, 3, 6, 12, 24, 60, 120, 240, 360, 600]])
+    years = year_fraction(curve_date, dates, DayCountBasis.ACT_ACT).values
+    zero_rate = 0.03 + 0.01 * (1 - np.exp(-years / 5)) # Curved, as PCHIP is not differentiable where the slopes change sign
+    for interpolation_method in ['linear_on_zero_rates', 'pchip_on_zero_rates', 'monotone_convex']:
+        zc = ZeroCurve(curve_date=curve_date,
+                       data=pd.DataFrame({'date': dates, 'zero_rate': zero_rate}),
+                       compounding_frequency=CompoundingFrequency.CONTINUOUS,
+                       interpolation_method=interpolation_method)
+        pillars = zc.data.loc[zc.data['years'] > 0]
+        assert np.allclose(zc.get_discount_factor(dates=pd.DatetimeIndex(pillars['date'])), pillars['discount_factor'], rtol=1e-14)
+
+        # The instantaneous forward rate is -d ln P / dt, and the Hull-White θ uses its slope F''(t)
+        years = np.linspace(0.05, 49.0, 200)
+        h = 1e-6
+        ln_df = lambda t: np.log(zc.get_discount_factor(years=t))
+        forward_rate = zc.instantaneous_forward_rate(years)
+        assert np.allclose(forward_rate, -1 * (ln_df(years + h) - ln_df(years - h)) / (2 * h), atol=1e-8)
+        assert np.allclose(zc.piecewise_definition(years, der=2),
+                           (zc.instantaneous_forward_rate(years + h) - zc.instantaneous_forward_rate(years - h)) / (2 * h), atol=1e-6)
+
+        # The Jacobian matches a re-built curve with a bumped pillar, and is local
+        jacobian = zc.discount_factor_jacobian(years=years)
+        k = 4
+        bumped_discount_factor = []
+        for bump in [h, -h]:
+            data = pd.DataFrame({'date': pillars['date'].values, 'zero_rate': pillars['nacc'].values + bump * (np.arange(len(pillars)) == k)})
+            bumped = ZeroCurve(curve_date=zc.curve_date, data=data, compounding_frequency=CompoundingFrequency.CONTINUOUS,
+                               interpolation_method=interpolation_method)
+            bumped_discount_factor.append(bumped.get_discount_factor(years=years))
+        assert np.allclose(jacobian[:, k], (bumped_discount_factor[0] - bumped_discount_factor[1]) / (2 * h), atol=1e-6)
+        assert (jacobian[years > 15, k] == 0).all()
+
+    # Monotone convex keeps the forward rate continuous, and monotone where the discrete forward rates are
+    zc = ZeroCurve(curve_date=pd.Timestamp(2024, 1, 2),
+                   data=pd.DataFrame({'years': [1, 2, 3, 4, 5], 'zero_rate': [0.010, 0.015, 0.020, 0.025, 0.030]}),
+                   compounding_frequency=CompoundingFrequency.CONTINUOUS,
+                   interpolation_method='monotone_convex')
+    forward_rate = zc.instantaneous_forward_rate(np.linspace(0, 5, 5001))
+    assert (np.diff(forward_rate) >= -1e-15).all() and np.abs(np.diff(forward_rate)).max() < 1e-4
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import pandas as pd
+from types import SimpleNamespace
+
+from frm.enums.utils import CompoundingFrequency, DayCountBasis
+from frm.term_structures.zero_curve import ZeroCurve
+from frm.term_structures.zero_curve_bootstrapper import ZeroCurveBootstrapper, Deposit, InterestRateSwap
+from frm.term_structures.zero_curve_risk import swap_leg_discount_factor_sensitivity, bucketed_pv01, fx_forward_bucketed_delta
+from frm.utils.daycount import year_fraction
+
+
+curve_date = pd.Timestamp(2024, 6, 3)
+spot_date = pd.Timestamp(2024, 6, 5)
+
+
+def get_swap_legs(maturity_years: int, fixed_rate: float, notional: float=1e6):
+    # Receive fixed annual vs pay float annual, as SwapLeg-style schedules
+    period_start = pd.DatetimeIndex([spot_date + pd.DateOffset(years=y) for y in range(maturity_years)])
+    period_end = pd.DatetimeIndex([spot_date + pd.DateOffset(years=y) for y in range(1, maturity_years + 1)])
+    years = np.atleast_1d(year_fraction(period_start, period_end, DayCountBasis.ACT_360)).astype(np.float64)
+    fixed = SimpleNamespace(schedule=pd.DataFrame({'payment_date': period_end, 'payment': notional * fixed_rate * years}))
+    float_ = SimpleNamespace(schedule=pd.DataFrame({'period_start': period_start, 'period_end': period_end, 'payment_date': period_end,
+                                                    'notional': notional, 'years': years, 'spread': 0.001, 'payment': np.nan}),
+                             pay_rec=SimpleNamespace(multiplier=-1))
+    return fixed, float_
+
+
+def book_pv_and_sensitivities(zero_curve):
+    legs = [leg for maturity, rate in [(3, 0.045), (7, 0.047), (12, 0.044)] for leg in get_swap_legs(maturity, rate)]
+    pv, dates, sensitivity = 0.0, [], []
+    for leg in legs:
+        result = swap_leg_discount_factor_sensitivity(leg, zero_curve)
+        pv += result['present_value']
+        dates += [result['discount_dates'], result['projection_dates']]
+        sensitivity += [result['discount_sensitivity'], result['projection_sensitivity']]
+    return pv, dates[0].append(dates[1:]), np.concatenate(sensitivity)
+
+
+def test_pillar_pv01_matches_bumped_curves(make_ois_instruments):
+    for interpolation_method in ['linear_on_log_of_discount_factors', 'cubic_spline_on_zero_rates']:
+        bootstrapper = ZeroCurveBootstrapper(curve_date, make_ois_instruments(curve_date, spot_date), interpolation_method=interpolation_method)
+        zero_curve = bootstrapper.bootstrap()
+        pv, dates, sensitivity = book_pv_and_sensitivities(zero_curve)
+        pv01 = bucketed_pv01(zero_curve, dates, sensitivity)
+
+        pillars = zero_curve.data.loc[zero_curve.data['years'] > 0]
+        assert pv01.shape == (len(pillars),)
+        h = 1e-6
+        for k in range(len(pillars)):
+            pv_bumped = []
+            for bump in [h, -h]:
+                bumped_curve = bootstrapper.zero_curve()
+                nacc = pillars['nacc'].values.copy()
+                nacc[k] += bump
+                bumped_curve.update_pillar_discount_factors(np.exp(-nacc * pillars['years'].values))
+                pv_bumped.append(book_pv_and_sensitivities(bumped_curve)[0])
+            assert np.isclose(pv01[k], (pv_bumped[0] - pv_bumped[1]) / (2 * h) * 1e-4, rtol=1e-6, atol=1e-6)
+
+        # A parallel shift of the pillars is a parallel shift of the curve, the sum of the bucketed PV01
+        assert np.isclose(pv01.sum(), (book_pv_and_sensitivities(zero_curve.flat_shift(0.01))[0]
+                                       - book_pv_and_sensitivities(zero_curve.flat_shift(-0.01))[0]) / 2 * 100, rtol=1e-6)
+
+
+def test_instrument_pv01_matches_rebootstrap(make_ois_instruments):
+    ois_curve = ZeroCurveBootstrapper(curve_date, make_ois_instruments(curve_date, spot_date)).bootstrap()
+    instruments = [Deposit(spot_date, spot_date + pd.DateOffset(months=3), 0.0560)] \
+        + [InterestRateSwap(spot_date, spot_date + pd.DateOffset(years=y), 0.0520 - 0.0010 * y ** 0.5) for y in [2, 5, 10, 15]]
+    bootstrapper = ZeroCurveBootstrapper(curve_date, instruments, discount_curve=ois_curve)
+    projection_curve = bootstrapper.bootstrap()
+
+    legs = get_swap_legs(8, 0.05)
+    result = [swap_leg_discount_factor_sensitivity(leg, ois_curve, projection_curve) for leg in legs]
+    pv01 = bucketed_pv01(projection_curve, result[1]['projection_dates'], result[1]['projection_sensitivity'], bootstrapper=bootstrapper)
+
+    quotes = bootstrapper.quotes.copy()
+    h = 1e-6
+    for i in range(len(instruments)):
+        pv_bumped = []
+        for bump in [h, -h]:
+            bumped_quotes = quotes.copy()
+            bumped_quotes[i] += bump
+            bumped_curve = ZeroCurveBootstrapper(curve_date, instruments, discount_curve=ois_curve).bootstrap(bumped_quotes)
+            pv_bumped.append(swap_leg_discount_factor_sensitivity(legs[1], ois_curve, bumped_curve)['present_value'])
+        assert np.isclose(pv01[i], (pv_bumped[0] - pv_bumped[1]) / (2 * h) * 1e-4, rtol=1e-5, atol=1e-6)
+
+
+def test_flat_shift_and_fx_forward_delta():
+    years = np.array([0.5, 1, 2, 5, 10])
+    for interpolation_method in ['linear_on_log_of_discount_factors', 'cubic_spline_on_zero_rates']:
+        zc = ZeroCurve(curve_date=curve_date,
+                       data=pd.DataFrame({'years': years, 'zero_rate': [0.030, 0.032, 0.035, 0.037, 0.038]}),
+                       compounding_frequency=CompoundingFrequency.CONTINUOUS,
+                       interpolation_method=interpolation_method)
+        shifted = zc.flat_shift(basis_points=25)
+        dates = pd.date_range(curve_date + pd.DateOffset(days=1), curve_date + pd.DateOffset(years=10), freq='MS')
+        assert np.allclose(shifted.get_zero_rate(CompoundingFrequency.CONTINUOUS, dates=dates)
+                           - zc.get_zero_rate(CompoundingFrequency.CONTINUOUS, dates=dates), 0.0025)
+
+    domestic = ZeroCurve(curve_date=curve_date, data=pd.DataFrame({'years': years, 'zero_rate': [0.050, 0.049, 0.046, 0.043, 0.042]}),
+                         compounding_frequency=CompoundingFrequency.CONTINUOUS)
+    foreign = ZeroCurve(curve_date=curve_date, data=pd.DataFrame({'years': years, 'zero_rate': [0.030, 0.032, 0.035, 0.037, 0.038]}),
+                        compounding_frequency=CompoundingFrequency.CONTINUOUS)
+    delivery_dates = pd.DatetimeIndex([pd.Timestamp(2025, 6, 5), pd.Timestamp(2029, 6, 5)])
+    result = fx_forward_bucketed_delta(1.10, domestic, foreign, delivery_dates, spot_date=spot_date)
+    assert np.allclose(result['domestic'].sum(axis=1),
+                       fx_forward_bucketed_delta(1.10, domestic.flat_shift(1), foreign, delivery_dates, spot_date)['fx_forward_rate']
+                       - result['fx_forward_rate'], rtol=1e-3)
+    assert np.allclose(result['foreign'].sum(axis=1),
+                       fx_forward_bucketed_delta(1.10, domestic, foreign.flat_shift(1), delivery_dates, spot_date)['fx_forward_rate']
+                       - result['fx_forward_rate'], rtol=1e-3)
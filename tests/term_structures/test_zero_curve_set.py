@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from frm.enums.utils import CompoundingFrequency
+from frm.term_structures.zero_curve_set import ZeroCurveSet
+
+
+curve_date = pd.Timestamp(2024, 1, 2)
+
+
+def test_scenarios_match_individual_curves(make_zero_curve):
+    rng = np.random.default_rng(0)
+    dates = pd.DatetimeIndex([curve_date, pd.Timestamp(2024, 1, 20), pd.Timestamp(2026, 7, 1), pd.Timestamp(2053, 12, 31)])
+    for interpolation_method in ['linear_on_log_of_discount_factors', 'cubic_spline_on_zero_rates']:
+        base_curve = make_zero_curve(interpolation_method)
+        nb_pillars = (base_curve.data['years'] > 0).sum()
+        curve_set = ZeroCurveSet.from_shifts(base_curve, rng.normal(0.0, 0.001, size=(50, nb_pillars)))
+        discount_factor = curve_set.get_discount_factor(dates=dates)
+        zero_rate = curve_set.get_zero_rate(CompoundingFrequency.ANNUAL, dates=dates[1:])
+        assert discount_factor.shape == (50, len(dates)) and zero_rate.shape == (50, len(dates) - 1)
+        for s in [0, 17, 49]:
+            scenario_curve = curve_set.scenario_curve(s)
+            assert np.allclose(discount_factor[s], scenario_curve.get_discount_factor(dates=dates), rtol=1e-12)
+            assert np.allclose(zero_rate[s], scenario_curve.get_zero_rate(CompoundingFrequency.ANNUAL, dates=dates[1:]), rtol=1e-12)
+
+        # Zero shifts reproduce the base curve, a parallel shift shifts the zero rates
+        curve_set = ZeroCurveSet.from_shifts(base_curve, np.array([0.0, 0.01]))
+        nacc = curve_set.get_zero_rate(CompoundingFrequency.CONTINUOUS, dates=dates[1:])
+        assert np.allclose(nacc[0], base_curve.get_zero_rate(CompoundingFrequency.CONTINUOUS, dates=dates[1:]), rtol=1e-12)
+        assert np.allclose(nacc[1] - nacc[0], 0.01)
+
+
+def test_dates_outside_curve_and_invalid_shape(make_zero_curve):
+    curve_set = ZeroCurveSet.from_shifts(make_zero_curve('linear_on_log_of_discount_factors'), np.zeros(3))
+    with pytest.warns(UserWarning):
+        discount_factor = curve_set.get_discount_factor(dates=pd.DatetimeIndex([pd.Timestamp(2023, 1, 1), pd.Timestamp(2025, 1, 1)]))
+    assert np.isnan(discount_factor[:, 0]).all() and not np.isnan(discount_factor[:, 1]).any()
+    with pytest.raises(ValueError):
+        ZeroCurveSet(curve_set.base_curve, np.zeros((3, 5)))
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM')) # PROJECT_DIR_FRM set to environmental variable of root path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from frm.utils.business_day_calendar import get_busdaycal
+from frm.utils.business_day_index import get_business_day_index
+from frm.utils.day_number import to_day_number
+from frm.term_structures.fx_volatility_surface_helpers import calc_implied_spot_offset
+
+
+def test_matches_numpy_busday_functions():
+    rng = np.random.default_rng(0)
+    dates = (np.datetime64('1995-01-01') + rng.integers(0, 30_000, 10_000)).astype('datetime64[D]')
+    offsets = rng.integers(-30, 30, 10_000)
+    for busdaycal in [np.busdaycalendar(), get_busdaycal('ILS'), get_busdaycal(['USD', 'GBP'])]:
+        index = get_business_day_index(busdaycal)
+        assert get_business_day_index(busdaycal) is index
+        for roll in ['following', 'preceding', 'modifiedfollowing', 'modifiedpreceding']:
+            expected = np.busday_offset(dates, offsets, roll=roll, busdaycal=busdaycal)
+            assert (index.busday_offset(dates, offsets, roll) == expected).all()
+            assert [index.offset_day(int(d), int(n), roll) for d, n in zip(dates[:100].astype(np.int64), offsets[:100])] \
+                == list(expected[:100].astype(np.int64))
+
+        end_dates = dates + rng.integers(-400, 400, 10_000)
+        assert (index.count(to_day_number(dates), to_day_number(end_dates)) == np.busday_count(dates, end_dates, busdaycal=busdaycal)).all()
+        assert (index.is_busday(to_day_number(dates)) == np.is_busday(dates, busdaycal=busdaycal)).all()
+
+    with pytest.raises(ValueError):
+        index.busday_offset(np.datetime64('2024-06-01'), 1) # A Saturday, with roll='raise'
+
+
+def test_calc_implied_spot_offset():
+    busdaycal = get_busdaycal(['USD', 'GBP'])
+    curve_date = pd.Timestamp(2024, 12, 20) # Friday, with Christmas and Boxing Day after
+    for spot_date, spot_offset in [(pd.Timestamp(2024, 12, 20), 0), (pd.Timestamp(2024, 12, 23), 1), (pd.Timestamp(2024, 12, 24), 2),
+                                   (pd.Timestamp(2024, 12, 25), 3), (pd.Timestamp(2024, 12, 27), 3), (pd.Timestamp(2024, 12, 28), 4)]:
+        assert calc_implied_spot_offset(curve_date, spot_date, busdaycal) == spot_offset
+
+
+if __name__ == "__main__":
+    test_matches_numpy_busday_functions()
+    test_calc_implied_spot_offset()
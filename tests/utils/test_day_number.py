@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM')) # PROJECT_DIR_FRM set to environmental variable of root path
+
+import datetime as dt
+import numpy as np
+import pandas as pd
+
+from frm.utils.day_number import to_day_number, day_number_to_datetimeindex, year_month_day, is_last_day_of_month, add_months
+
+
+def test_to_day_number():
+    assert to_day_number(pd.Timestamp(1970, 1, 2))[0] == 1
+    assert to_day_number(dt.date(1969, 12, 31))[0] == -1
+    assert to_day_number(dt.datetime(2000, 1, 1, 15, 30))[0] == 10957
+    assert to_day_number(np.datetime64('2000-01-01'))[0] == 10957
+    assert to_day_number(pd.Timestamp(2000, 1, 1, 23, 59))[0] == 10957
+
+    dates = pd.date_range('1700-01-01', '2262-04-11', freq='7D')
+    day_number = to_day_number(dates)
+    assert day_number.dtype == np.int32
+    for date_object in [pd.Series(dates), dates.values.astype('datetime64[D]'), list(dates)]:
+        assert (to_day_number(date_object) == day_number).all()
+    assert (day_number_to_datetimeindex(day_number) == dates).all()
+
+    year, month, day = year_month_day(day_number)
+    assert (year == dates.year).all() and (month == dates.month).all() and (day == dates.day).all()
+    assert (is_last_day_of_month(day_number) == dates.is_month_end).all()
+
+
+def test_add_months():
+    dates = pd.date_range('1990-01-01', '2060-12-31', freq='D')
+    day_number = to_day_number(dates)
+    for months in [-13, -1, 1, 3, 12, 25]:
+        assert (day_number_to_datetimeindex(add_months(day_number, months)) == dates + pd.DateOffset(months=months)).all()
+    assert (day_number_to_datetimeindex(add_months(day_number, 0, 31)) == dates + pd.offsets.MonthEnd(0)).all()
+
+
+if __name__ == "__main__":
+    test_to_day_number()
+    test_add_months()
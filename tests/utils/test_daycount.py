@@ -3,6 +3,7 @@ import os
 if __name__ == "__main__":
     os.chdir(os.environ.get('PROJECT_DIR_FRM')) # PROJECT_DIR_FRM set to environmental variable of root path
 
+import calendar
 import datetime as dt
 import pandas as pd
 import numpy as np
@@ -190,6 +191,12 @@ def test_30360E_ISDA():
     assert isclose_custom(year_fraction(start_date, start_date, day_count_basis), 0.0)
     assert isclose_custom(year_fraction(start_date, end_date, day_count_basis), 179/360.)
 
+    # Termination date flag per period, e.g. for the end dates of a batch of trades
+    start_dates = pd.DatetimeIndex(['2011-08-31', '2011-08-31', '2012-02-29', '2012-02-29'])
+    end_dates = pd.DatetimeIndex(['2012-02-29', '2012-02-29', '2013-02-28', '2013-02-28'])
+    days = day_count(start_dates, end_dates, day_count_basis, np.array([True, False, False, True]))
+    assert (days == [179, 180, 360, 358]).all()
+
 
 def test_act360():
     start_date = dt.date(2010, 1, 13)
@@ -225,6 +232,30 @@ def test_actact():
     assert isclose_custom(year_fraction(start_date, end_date, day_count_basis), 1461 / ((365*3 + 366) / 4))
 
 
+def test_actact_multi_year_spans():
+    # Reference: for each calendar year overlapped, the days in the year divided by the days in that year
+    def reference(start, end):
+        result = 0.0
+        for year in range(start.year, end.year + 1):
+            period_start = max(start, dt.date(year, 1, 1))
+            period_end = min(end, dt.date(year + 1, 1, 1))
+            result += (period_end - period_start).days / (366 if calendar.isleap(year) else 365)
+        return result
+
+    rng = np.random.default_rng(0)
+    start_dates = pd.DatetimeIndex(np.datetime64('1890-01-01') + rng.integers(0, 80_000, 500))
+    end_dates = start_dates + pd.to_timedelta(rng.integers(0, 20_000, 500), unit='D')
+    start_dates = start_dates.append(pd.DatetimeIndex(['1899-12-31', '2000-02-28', '2024-12-31', '2100-02-28']))
+    end_dates = end_dates.append(pd.DatetimeIndex(['1900-03-01', '2000-03-01', '2025-01-01', '2100-03-01']))
+
+    day_count_basis = DayCountBasis.from_value('act/act')
+    years = year_fraction(start_dates, end_dates, day_count_basis)
+    expected = [reference(s.date(), e.date()) for s, e in zip(start_dates, end_dates)]
+    assert np.allclose(years, expected, rtol=0, atol=1e-12)
+    assert isclose_custom(year_fraction(pd.Timestamp('2024-01-02'), pd.Timestamp('2054-01-02'), day_count_basis),
+                          reference(dt.date(2024, 1, 2), dt.date(2054, 1, 2)))
+
+
 if __name__ == "__main__":
     test_to_datetimeindex()
     test_multiple_type()
@@ -234,6 +265,7 @@ if __name__ == "__main__":
     test_act360()
     test_act365()
     test_actact()
+    test_actact_multi_year_spans()
     
     
     
@@ -5,7 +5,9 @@ if __name__ == "__main__":
 
 import numpy as np
 import datetime as dt
-from frm.utils.business_day_calendar import get_busdaycal
+import pytest
+import frm.utils.business_day_calendar as business_day_calendar
+from frm.utils.business_day_calendar import get_busdaycal, get_holidays_object, convert_weekend_to_weekmask
 
 
 def test_busdaycal():
@@ -23,6 +25,33 @@ def test_busdaycal():
     busdaycal = get_busdaycal(keys=['ILS','usd'])
     assert (busdaycal.weekmask == np.array([ True,  True,  True,  True,  False, False, False])).all()  
     
+    # Joint calendars are memoised by the set of keys, in any order or case
+    assert get_busdaycal(['usd', 'ILS']) is busdaycal
+    
+
+def test_busdaycal_matches_holidays_objects():
+    # The precomputed holiday arrays match the pickled holidays objects
+    for key in ['USD', 'EUR', 'UK-LONDON', 'European_Central_Bank']:
+        holiday_object = get_holidays_object(key)
+        busdaycal = get_busdaycal(key)
+        assert (busdaycal.weekmask == np.array([c == '1' for c in convert_weekend_to_weekmask(holiday_object.weekend)])).all()
+        expected = np.busdaycalendar(weekmask=busdaycal.weekmask, holidays=list(holiday_object)).holidays
+        assert np.array_equal(busdaycal.holidays, expected)
+
+
+def test_busdaycal_recompiles_when_holiday_years_change(monkeypatch):
+    # HOLIDAY.npz is compiled over HOLIDAY_YEARS, another range is compiled from the pickles
+    monkeypatch.setattr(business_day_calendar, 'HOLIDAY_YEARS', range(2020, 2030))
+    business_day_calendar._holiday_arrays.cache_clear()
+    business_day_calendar._get_joint_busdaycal.cache_clear()
+    try:
+        with pytest.warns(UserWarning, match='HOLIDAY_YEARS'):
+            holidays = get_busdaycal('USD').holidays
+        assert holidays.min() >= np.datetime64('2020-01-01') and holidays.max() <= np.datetime64('2029-12-31')
+    finally:
+        business_day_calendar._holiday_arrays.cache_clear()
+        business_day_calendar._get_joint_busdaycal.cache_clear()
+
     
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM')) # PROJECT_DIR_FRM set to environmental variable of root path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from frm.enums.utils import RollConvention, StubType, PeriodFrequency, DayRoll
+from frm.utils.business_day_calendar import get_busdaycal
+from frm.utils.schedule import get_schedule, get_schedules
+
+
+def test_get_schedules_matches_get_schedule():
+    rng = np.random.default_rng(0)
+    nb_trades = 500
+    busdaycal = get_busdaycal(['USD', 'GBP'])
+    frequencies = [f for f in PeriodFrequency if f != PeriodFrequency.DAILY]
+    roll_conventions = [RollConvention.FOLLOWING, RollConvention.PRECEDING, RollConvention.MODIFIED_FOLLOWING, RollConvention.MODIFIED_PRECEDING]
+    day_rolls = [DayRoll.NONE, DayRoll._1, DayRoll._15, DayRoll._30, DayRoll._31, DayRoll.EOM]
+    stub_types = [StubType.DEFAULT, StubType.DEFAULT, StubType.SHORT, StubType.LONG, StubType.NONE]
+
+    start_dates = pd.DatetimeIndex(np.datetime64('2000-01-01') + rng.integers(0, 9000, nb_trades))
+    end_dates = start_dates + pd.to_timedelta(rng.integers(1, 3000, nb_trades), 'D')
+    params = [dict(start_date=start_dates[i],
+                   end_date=end_dates[i],
+                   frequency=frequencies[rng.integers(len(frequencies))],
+                   roll_convention=roll_conventions[rng.integers(len(roll_conventions))],
+                   day_roll=day_rolls[rng.integers(len(day_rolls))],
+                   first_stub_type=stub_types[rng.integers(len(stub_types))],
+                   last_stub_type=stub_types[rng.integers(len(stub_types))]) for i in range(nb_trades)]
+    params += [dict(start_date=pd.Timestamp(2024, 1, 15), end_date=pd.Timestamp(2029, 1, 15), frequency=PeriodFrequency.QUARTERLY,
+                    first_cpn_end_date=pd.Timestamp(2024, 3, 1)),
+               dict(start_date=pd.Timestamp(2024, 1, 15), end_date=pd.Timestamp(2029, 1, 15), frequency=PeriodFrequency.QUARTERLY,
+                    last_cpn_start_date=pd.Timestamp(2028, 10, 1))]
+
+    for roll_user_specified_dates in [False, True]:
+        expected = []
+        for p in params:
+            try:
+                expected.append(get_schedule(**p, roll_user_specified_dates=roll_user_specified_dates, busdaycal=busdaycal))
+            except ValueError:
+                expected.append(None)
+        valid = [p for p, schedule in zip(params, expected) if schedule is not None]
+        expected = [schedule for schedule in expected if schedule is not None]
+
+        def column(name, default=None):
+            return [p.get(name, default) for p in valid]
+
+        batch = get_schedules(start_dates=column('start_date'),
+                              end_dates=column('end_date'),
+                              frequencies=column('frequency'),
+                              roll_conventions=column('roll_convention', RollConvention.MODIFIED_FOLLOWING),
+                              day_rolls=column('day_roll', DayRoll.NONE),
+                              first_cpn_end_dates=column('first_cpn_end_date'),
+                              last_cpn_start_dates=column('last_cpn_start_date'),
+                              first_stub_types=column('first_stub_type', StubType.DEFAULT),
+                              last_stub_types=column('last_stub_type', StubType.DEFAULT),
+                              roll_user_specified_dates=roll_user_specified_dates,
+                              busdaycal=busdaycal)
+        assert batch.nb_trades == len(valid)
+        for i, schedule in enumerate(expected):
+            # The batch dates are datetime64[ns], get_schedule() keeps the resolution of its inputs
+            assert (batch.get_schedule(i).dtypes == 'datetime64[ns]').all()
+            pd.testing.assert_frame_equal(batch.get_schedule(i), schedule.astype('datetime64[ns]'))
+        assert (batch.to_frame()['trade'].value_counts().sort_index().values == [len(s) for s in expected]).all()
+
+
+def test_get_schedules_errors():
+    start_date, end_date = pd.Timestamp(2024, 1, 15), pd.Timestamp(2029, 1, 15)
+    with pytest.raises(ValueError):
+        get_schedules([start_date, end_date], [end_date, start_date], PeriodFrequency.QUARTERLY)
+    with pytest.raises(ValueError):
+        get_schedules([start_date], [end_date], PeriodFrequency.QUARTERLY, first_stub_types=StubType.SHORT, last_stub_types=StubType.SHORT)
+    with pytest.raises(ValueError):
+        get_schedules([start_date, start_date], [end_date, end_date], [PeriodFrequency.QUARTERLY])
+
+
+if __name__ == "__main__":
+    test_get_schedules_matches_get_schedule()
+    test_get_schedules_errors()
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import os
+if __name__ == "__main__":
+    os.chdir(os.environ.get('PROJECT_DIR_FRM')) # PROJECT_DIR_FRM set to environmental variable of root path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from frm.enums.utils import PeriodFrequency, StubType
+from frm.utils.business_day_calendar import get_busdaycal
+from frm.utils.schedule import get_schedule, get_schedule_cached, get_schedule_day_numbers
+
+
+def test_get_schedule_cached():
+    start_date, end_date = pd.Timestamp(2025, 3, 19), pd.Timestamp(2030, 3, 19)
+    busdaycal = get_busdaycal(['USD', 'GBP'])
+    for frequency, first_stub_type in [(PeriodFrequency.QUARTERLY, StubType.DEFAULT), (PeriodFrequency.SEMIANNUAL, StubType.LONG)]:
+        expected = get_schedule(start_date, end_date, frequency, first_stub_type=first_stub_type, busdaycal=busdaycal)
+        pd.testing.assert_frame_equal(get_schedule_cached(start_date, end_date, frequency, first_stub_type=first_stub_type, busdaycal=busdaycal), expected)
+
+    # A calendar with the same weekmask and holidays shares the cached schedule
+    busdaycal_copy = np.busdaycalendar(weekmask=busdaycal.weekmask, holidays=busdaycal.holidays)
+    period_start, period_end = get_schedule_day_numbers(start_date, end_date, PeriodFrequency.QUARTERLY, busdaycal=busdaycal)
+    assert get_schedule_day_numbers(start_date, end_date, PeriodFrequency.QUARTERLY, busdaycal=busdaycal_copy)[0] is period_start
+    assert get_schedule_day_numbers(start_date, end_date, PeriodFrequency.QUARTERLY)[0] is not period_start
+    with pytest.raises(ValueError):
+        period_start[0] = 0
+
+    # Changes to a returned schedule don't change the cached schedule
+    schedule = get_schedule_cached(start_date, end_date, PeriodFrequency.QUARTERLY, busdaycal=busdaycal)
+    schedule.loc[0, 'period_start'] = pd.Timestamp(2000, 1, 1)
+    assert get_schedule_cached(start_date, end_date, PeriodFrequency.QUARTERLY, busdaycal=busdaycal).loc[0, 'period_start'] == start_date
+
+    with pytest.raises(ValueError):
+        get_schedule_cached(end_date, start_date, PeriodFrequency.QUARTERLY)
+
+
+if __name__ == "__main__":
+    test_get_schedule_cached()